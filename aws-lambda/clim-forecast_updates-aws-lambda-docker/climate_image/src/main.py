@@ -1,28 +1,33 @@
 # ------------------ Importing Libraries ------------------ #
 
-import boto3
+import os
 import pandas as pd
+import numpy as np
 import geopandas as gpd
+import shapely
 import json
 import sys
-import os
 import io
 import requests
 import zipfile
 import janitor
+from fiona.io import ZipMemoryFile
 from datetime import datetime
 from io import BytesIO
-from botocore.exceptions import NoCredentialsError
+from storage import create_s3_client
 
 # ------------------ AWS S3 parameters ------------------ #
 
-s3 = boto3.client('s3')  # Initializing Amazon S3 client
+s3 = create_s3_client()  # Initializing Amazon S3 client (or a local folder with FOODSIGHT_STORAGE=local)
 bucket_name = 'foodsight-lambda'
 key_path_grasscast_grid_read = 'spatial_data/grasscast_aoi_grid.geojson'
 key_path_overlapping_gridids_read = 'spatial_data/overlapping_gridids.json'
 key_path_seasprcp_data_read = 'spatial_data/seasprcp_data'
 key_path_seasprcp_grid_read = 'spatial_data/seasprcp_grid.csv'
 
+# NOAA CPC server (NOAA_CPC_URL points to a fake server serving recorded files)
+noaa_cpc_url = os.environ.get('NOAA_CPC_URL', 'https://ftp.cpc.ncep.noaa.gov')
+
 
 # ------------------ Define functions ------------------#
 print("Defining helper functions...")
@@ -40,33 +45,18 @@ def read_geojson_from_s3(bucket, key):
     geojson_obj = s3.get_object(Bucket=bucket, Key=key)
     return gpd.read_file(BytesIO(geojson_obj['Body'].read()))
 
-# Function to read a shapefile from S3 into a GeoPandas DataFrame
-def read_shapefile_from_s3(bucket_name, folder_path):
-    # Create a temporary directory to store files
-    local_dir = '/tmp/shp_folder/'
-    if not os.path.exists(local_dir):
-        os.makedirs(local_dir)
-
-    # List all files in the S3 folder
+# Function to read the lead-1 shapefile straight from an in-memory NOAA zip archive
+def read_shapefile_from_zip(zip_content, prefix='lead1_'):
     try:
-        files = s3.list_objects_v2(Bucket=bucket_name, Prefix=folder_path)['Contents']
-    except NoCredentialsError:
-        return "Error: No AWS credentials found."
-    except KeyError:
-        return "Error: No files found in the specified bucket/folder."
-
-    # Download each file in the folder to the local directory
-    for file in files:
-        file_name = file['Key'].split('/')[-1]
-        if file_name.endswith('.shp') or file_name.endswith('.shx') or file_name.endswith('.dbf'):
-            s3.download_file(bucket_name, file['Key'], local_dir + file_name)
-
-    # Read the shapefile into a geopandas dataframe
-    try:
-        shp_files = [os.path.join(local_dir, f) for f in os.listdir(local_dir) if f.endswith('.shp')]
+        with zipfile.ZipFile(BytesIO(zip_content)) as zip_ref:
+            shp_files = [f for f in zip_ref.namelist() if f.startswith(prefix) and f.endswith('.shp')]
         if len(shp_files) == 0:
-            return "Error: No .shp file found in the specified folder."
-        gdf = gpd.read_file(shp_files[0])
+            return "Error: No " + prefix + "*.shp file found in the zip archive."
+
+        # Open the .shp/.shx/.dbf members through GDAL's virtual filesystem, no /tmp extraction
+        with ZipMemoryFile(zip_content) as zip_mem:
+            with zip_mem.open(shp_files[0]) as src:
+                gdf = gpd.GeoDataFrame.from_features(src, crs=src.crs)
 
         # Check if the CRS is set, if not, set it to a default (assuming WGS 84)
         if gdf.crs is None:
@@ -76,15 +66,11 @@ def read_shapefile_from_s3(bucket_name, folder_path):
             gdf.to_crs(epsg=4326, inplace=True)
         return gdf
 
+    except zipfile.BadZipFile:
+        return "Error: The downloaded file is not a zip file."
     except Exception as e:
         return "Error: " + str(e)
 
-    finally:
-        # Clean up the temporary directory
-        for f in os.listdir(local_dir):
-            os.remove(os.path.join(local_dir, f))
-        os.rmdir(local_dir)
-        
 # Function to save dataframe into S3
 def df_to_s3_csv(df, bucket, key):
     # Convert DataFrame to CSV in-memory
@@ -100,81 +86,92 @@ def df_to_s3_csv(df, bucket, key):
 
 # Function to access Climate Outlook files from NOAA Climate Prediction Center
 # More information at: https://www.cpc.ncep.noaa.gov/products/predictions/long_range/interactive/index.php
-def download_and_extract_seasprcp_files(year, month, s3_bucket, s3_folder):
+# The zip is kept in memory and archived to S3 as a single object
+def download_seasprcp_zip(year, month, s3_bucket, s3_folder):
     # Check if the month is between April and July
     if month < 3 or month > 7:
         return False
 
-    base_url = 'https://ftp.cpc.ncep.noaa.gov/GIS/us_tempprcpfcst/'
+    base_url = noaa_cpc_url + '/GIS/us_tempprcpfcst/'
     filename = 'seasprcp_{0:04d}{1:02d}.zip'.format(year, month)
     url = base_url + filename
 
     try:
-        # Check and delete existing files in the S3 folder
-        response = s3.list_objects_v2(Bucket=s3_bucket, Prefix=s3_folder)
-        if 'Contents' in response:
-            for obj in response['Contents']:
-                s3.delete_object(Bucket=s3_bucket, Key=obj['Key'])
         # Download the ZIP file
-        response = requests.get(url)
+        response = requests.get(url, timeout=60)
         response.raise_for_status()
-        # Create a temporary file for the ZIP
-        temp_zip_path = '/tmp/' + filename
-        with open(temp_zip_path, 'wb') as f:
-            f.write(response.content)
-        # Extract files and upload to S3
-        with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-            for file in zip_ref.namelist():
-                if file.startswith('lead1_'):
-                    zip_ref.extract(file, '/tmp/')
-                    # Splitting the file name and extension
-                    file_name, file_extension = os.path.splitext(file)
-                    # Renaming file with _prcp and year, preserving the original extension
-                    new_filename = f"{file_name}_{month}_{year}{file_extension}"
-                    os.rename('/tmp/' + file, '/tmp/' + new_filename)
-                    s3.upload_file('/tmp/' + new_filename, s3_bucket, s3_folder + '/' + new_filename)
-                    os.remove('/tmp/' + new_filename)
-        # Remove the ZIP file after extraction
-        os.remove(temp_zip_path)
-        return "Files starting with 'lead1' extracted and uploaded to S3 successfully."
+        # Check and delete existing files in the S3 folder
+        listing = s3.list_objects_v2(Bucket=s3_bucket, Prefix=s3_folder)
+        if 'Contents' in listing:
+            for obj in listing['Contents']:
+                s3.delete_object(Bucket=s3_bucket, Key=obj['Key'])
+        # Archive the raw ZIP
+        s3.put_object(Bucket=s3_bucket, Body=response.content, Key=s3_folder + '/' + filename)
+        return response.content
 
     except requests.exceptions.HTTPError as err:
         return "HTTP Error: " + str(err)
-    except zipfile.BadZipFile:
-        return "Error: The downloaded file is not a zip file."
     except Exception as e:
         return "Error: " + str(e)
 
 
 # Function to associate each grid cell to the climate outlook
-def join_attributes_by_largest_overlap(seasprcp_raw, precip_grid_raw):
-    
+# Cells lying entirely inside one outlook polygon are assigned with a cheap `within` test
+# on an STRtree; only cells on a polygon boundary are intersected, and the overlapping areas
+# are measured in an equal-area CRS (CONUS Albers) instead of EPSG:4326 degrees.
+def join_attributes_by_largest_overlap(grid_raw, seasprcp_raw, equal_area_epsg=5070):
+
+    grid_projected = grid_raw.to_crs(epsg=4326)
     seasprcp_projected = seasprcp_raw.to_crs(epsg=4326)
-    precip_grid_projected = precip_grid_raw.to_crs(epsg=4326)
-    intersection = gpd.overlay(seasprcp_projected, precip_grid_projected, how='intersection')
-    intersection['area'] = intersection.geometry.area
-    intersection.sort_values(by='area', inplace=True)
-    intersection.drop_duplicates(subset='gridid', keep='last', inplace=True)
-    intersection = intersection.to_crs(epsg=4326)
-    joined = seasprcp_raw.merge(intersection[['gridid','Cat','Prob']], left_on='gridid', right_on='gridid').clean_names()
-    
+    cells = np.asarray(grid_projected.geometry)
+    outlooks = np.asarray(seasprcp_projected.geometry)
+    tree = shapely.STRtree(outlooks)
+
+    # Cells fully contained in exactly one outlook polygon
+    cell_idx, outlook_idx = tree.query(cells, predicate='within')
+    containing = np.bincount(cell_idx, minlength=len(cells))
+    inside = containing[cell_idx] == 1
+    assigned = pd.Series(outlook_idx[inside], index=cell_idx[inside])
+
+    # Boundary cells: exact intersection against the candidate polygons only
+    boundary = np.flatnonzero(containing != 1)
+    cell_idx, outlook_idx = tree.query(cells[boundary], predicate='intersects')
+    cell_idx = boundary[cell_idx]
+    overlap = pd.DataFrame({
+        'cell': cell_idx,
+        'outlook': outlook_idx,
+        'area': gpd.GeoSeries(shapely.intersection(cells[cell_idx], outlooks[outlook_idx]), crs=4326).to_crs(epsg=equal_area_epsg).area.values
+    })
+    overlap = overlap[overlap['area'] > 0].sort_values(by='area', kind='stable')
+    overlap = overlap.drop_duplicates(subset='cell', keep='last')
+    assigned = pd.concat([assigned, pd.Series(overlap['outlook'].values, index=overlap['cell'].values)])
+
+    attributes = seasprcp_raw[['Cat','Prob']].iloc[assigned.values].reset_index(drop=True)
+    attributes['gridid'] = grid_raw['gridid'].iloc[assigned.index.values].values
+    joined = grid_raw.merge(attributes[['gridid','Cat','Prob']], left_on='gridid', right_on='gridid').clean_names()
+
     return joined
 
 # ------------------ Process and store updated Spatial Data ------------------#
 def handler(event, context):
 
     print("Downloading spatial data from NOAA CPC...")
-    download_result = download_and_extract_seasprcp_files(datetime.now().year, datetime.now().month, bucket_name, key_path_seasprcp_data_read)
-    if download_result is False:
+    zip_content = download_seasprcp_zip(datetime.now().year, datetime.now().month, bucket_name, key_path_seasprcp_data_read)
+    if zip_content is False:
         print("     No download required. Month is not between April and July.")
         sys.exit() 
+    if isinstance(zip_content, str):
+        print("         ",zip_content)
+        sys.exit()
+    print("     Climate outlook archived to S3.")
 
     print("Preparing spatial data...")
     # Reference forecast to climate outlooks
-    print("     Read climate data from S3...")
-    seasprcp_raw = read_shapefile_from_s3(bucket_name, key_path_seasprcp_data_read)
+    print("     Read climate data from the downloaded archive...")
+    seasprcp_raw = read_shapefile_from_zip(zip_content)
     if isinstance(seasprcp_raw, str):
         print("         ",seasprcp_raw)
+        sys.exit()
     else:
         print("         Climate data read successfully.")
 
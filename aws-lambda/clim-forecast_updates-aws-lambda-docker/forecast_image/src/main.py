@@ -8,12 +8,13 @@ import requests
 import janitor
 import json
 import io
+import os
 from io import BytesIO
-import boto3 
+from storage import create_s3_client
 
 # ------------------ AWS S3 parameters ------------------ #
 
-s3 = boto3.client('s3')  # Initializing Amazon S3 client
+s3 = create_s3_client()  # Initializing Amazon S3 client (or a local folder with FOODSIGHT_STORAGE=local)
 bucket_name = 'foodsight-lambda'  # Name of the S3 bucket
 
 key_path_all_hist_read = 'hist_data/hist_data_grasscast_gp_sw.csv'
@@ -27,6 +28,9 @@ key_path_sw_forecast_read = 'forecast_data/forecast_data_grasscast_sw_clim.csv'
 key_path_seasprcp_grid_read = 'spatial_data/seasprcp_grid.csv'
 key_path_overlapping_gridids_read = 'spatial_data/overlapping_gridids.json'
 
+# Grass-Cast website (GRASSCAST_URL points to a fake server serving recorded files)
+grasscast_url = os.environ.get('GRASSCAST_URL', 'https://grasscast.unl.edu')
+
 # S3 loading functions
 def read_csv_from_s3(bucket, key):
     csv_obj = s3.get_object(Bucket=bucket, Key=key)
@@ -54,7 +58,7 @@ def df_to_s3_csv(df, bucket, key):
 
 # Function to pull the latest forecast data from the Grass-Cast website
 def download_forecast_lambda(year=date.today().year, region_code='gp', existing_df=None):
-    base_url = "https://grasscast.unl.edu/data/csv/{year}/ANPP_forecast_summary_{region_code}_{year}_{month}_{day}.csv"
+    base_url = grasscast_url + "/data/csv/{year}/ANPP_forecast_summary_{region_code}_{year}_{month}_{day}.csv"
     month_names = {4: "April", 5: "May", 6: "June", 7: "July", 8: "August", 9: "September"}
 
     # List of shared columns
@@ -1,25 +1,100 @@
+import os  # For reading the fetcher configuration
+import time  # For rate limiting and deadlines
+import threading  # For sharing the rate limiter between workers
 import requests  # For making HTTP requests
 import json  # For handling JSON data
-import boto3  # AWS SDK for Python, allows Python scripts to use services like Amazon S3 and Amazon EC2
-from concurrent.futures import ThreadPoolExecutor  # For parallel execution
+import gzip  # For compressing the output
+from datetime import datetime  # For parsing report dates
+from urllib.parse import urlparse  # For keying the rate limit per host
+from requests.adapters import HTTPAdapter  # For pooled connections
+from urllib3.util.retry import Retry  # For retrying transient errors
+from storage import create_s3_client  # Amazon S3 client, or a local folder with FOODSIGHT_STORAGE=local
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError  # For parallel execution
 
 # Constants
-base_url = "https://marsapi.ams.usda.gov"  # Base URL for the marsapi
-api_key = open("../foodsight-app/.mmn_api_token").read()   # API key for authentication with marsapi (type yours)
-s3 = boto3.client('s3')  # Initializing Amazon S3 client
+base_url = os.environ.get('MMN_BASE_URL', "https://marsapi.ams.usda.gov")  # Base URL for the marsapi (or the fake MMN server)
+api_key = os.environ.get('MMN_API_KEY') or open("../foodsight-app/.mmn_api_token").read()   # API key for authentication with marsapi (type yours)
+s3 = create_s3_client()  # Initializing Amazon S3 client
 bucket_name = 'foodsight-lambda'  # Name of the S3 bucket
 key_path_read = 'market_data/markets_data_final.json'  # Path to the JSON file in the S3 bucket
+key_path_write = 'market_data/last_market_data.json.gz'  # Path to the compact output in the S3 bucket
+
+# Columns used by the app (econ page) and their types
+text_columns = ['market_location_name', 'market_location_state', 'class']
+numeric_columns = ['avg_price', 'avg_price_min', 'avg_price_max', 'avg_weight_min', 'avg_weight_max']
+
+# Fetcher configuration (Lambda environment variables)
+max_workers = int(os.environ.get('MMN_MAX_WORKERS', 8))  # Concurrency cap
+requests_per_second = float(os.environ.get('MMN_REQUESTS_PER_SECOND', 5))  # Per-host rate limit
+max_retries = int(os.environ.get('MMN_MAX_RETRIES', 3))  # Retries on transient errors
+request_timeout = float(os.environ.get('MMN_TIMEOUT', 30))  # Seconds per request
+deadline_margin = float(os.environ.get('MMN_DEADLINE_MARGIN', 30))  # Seconds kept to write the output
+
+# Rate limiter spacing requests to the same host across all worker threads
+class HostRateLimiter:
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.next_slot = {}
+        self.lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot.get(host, now))
+            self.next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+# Pooled session shared by the workers, retrying throttling and server errors with backoff
+def create_session():
+    session = requests.Session()
+    retries = Retry(total=max_retries, backoff_factor=1, status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=['GET'], respect_retry_after_header=True)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.auth = (api_key, '')
+    return session
+
+session = create_session()
+rate_limiter = HostRateLimiter(requests_per_second)
 
 # Function to fetch data from marsapi
 def get_data_from_marsapi(endpoint):
-    with requests.Session() as session:  # Creates a session to manage connections
-        response = session.get(base_url + endpoint, auth=(api_key, ''))  # Sends GET request
-        
-        # Checks if the response status is 200 (OK)
-        if response.status_code == 200:
-            return response.json()  # Returns JSON content of the response
+    url = base_url + endpoint
+    rate_limiter.wait(url)  # Waits for a free slot on the host
+    response = session.get(url, timeout=request_timeout)  # Sends GET request
+
+    # Checks if the response status is 200 (OK)
+    if response.status_code == 200:
+        return response.json()  # Returns JSON content of the response
+    else:
+        response.raise_for_status()  # Raises an exception if the response contains an error
+
+# Function to parse the report_date of a Details result (MMN returns MM/DD/YYYY)
+def parse_report_date(value):
+    for date_format in ("%m/%d/%Y", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(str(value)[:10], date_format)
+        except ValueError:
+            continue
+    return None
+
+# Function to find the smallest lastDays window with results (bounded binary search)
+def search_latest_window(slug_id, upper_bound):
+    low, high = 1, upper_bound
+    latest_results = None
+    while low <= high:
+        mid = (low + high) // 2
+        endpoint = f"/services/v1.2/reports/{slug_id}/Details?lastDays={mid}&market_type=Auction Livestock"
+        data = get_data_from_marsapi(endpoint)
+        if data and 'results' in data and data['results']:
+            latest_results = data['results']
+            high = mid - 1
         else:
-            response.raise_for_status()  # Raises an exception if the response contains an error
+            low = mid + 1
+    return latest_results
 
 # Function to fetch market data
 def fetch_data_for_market(market):
@@ -28,58 +103,115 @@ def fetch_data_for_market(market):
     print(f"Fetching data for {market_name} (Slug ID: {slug_id})...")
 
     # Endpoint to check data availability for the last 15 days
-    endpoint_limit = f"/services/v1.2/reports/{slug_id}/Details?lastDays=15&market_type=Auction Livestock"
+    last_days = 15
+    endpoint_limit = f"/services/v1.2/reports/{slug_id}/Details?lastDays={last_days}&market_type=Auction Livestock"
     data_limit = get_data_from_marsapi(endpoint_limit)
 
-    # Checks if there's data for the last 30 days
     if data_limit and 'results' in data_limit and data_limit['results']:
-        lastDay = 1  # Initializes day counter
-        while lastDay <= 30:  # Loop to search data day-by-day for the last 30 days
-            endpoint = f"/services/v1.2/reports/{slug_id}/Details?lastDays={lastDay}&market_type=Auction Livestock"
-            data = get_data_from_marsapi(endpoint)
-
-            # Checks if data is available for the day
-            if data and 'results' in data and data['results']:
-                print(f"Data found for {slug_id} at lastDay={lastDay}")
-                return data['results']
-
-            # If no data found for the day, print a message and check the next day
-            print(f"No data found for {slug_id} at lastDay={lastDay}. Trying next day...")
-            lastDay += 1
-
-    # If no data found for the last 30 days, print a message and move to the next market
-    print(f"No data found for {slug_id} within the last 30 days. Moving to the next slug_id.")
+        results = data_limit['results']
+        report_dates = [parse_report_date(result.get('report_date')) for result in results]
+
+        # Keeps the results of the latest report date already present in the response
+        if all(report_dates):
+            latest_date = max(report_dates)
+            print(f"Data found for {slug_id} at {latest_date:%m/%d/%Y}")
+            return [result for result, date in zip(results, report_dates) if date == latest_date]
+
+        # Falls back to a binary search over lastDays when dates can't be parsed
+        print(f"Unparseable report dates for {slug_id}. Searching lastDays=1..{last_days}...")
+        latest_results = search_latest_window(slug_id, last_days)
+        if latest_results:
+            return latest_results
+
+    # If no data found for the last 15 days, print a message and move to the next market
+    print(f"No data found for {slug_id} within the last {last_days} days. Moving to the next slug_id.")
     return []
 
 # Function to fetch data for all markets
-def fetch_all_data(markets_list):
+# Results are appended as each market completes; markets still pending at the deadline are skipped
+def fetch_all_data(markets_list, deadline=None):
     all_data = []
+    failed = 0
+
+    # Parallel execution with a bounded pool of workers
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = {executor.submit(fetch_data_for_market, market): market for market in markets_list}
+    timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            market = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Error fetching {market['slug_id']}: {e}")
+                continue
+            # Aggregates the data as soon as it arrives
+            if data:
+                all_data.extend(data)
+    except TimeoutError:
+        pending = sum(1 for future in futures if not future.done())
+        print(f"Deadline reached. Skipping {pending} pending markets.")
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    print(f"Fetched {len(all_data)} records from {len(markets_list)} markets ({failed} failed).")
+    return all_data
 
-    # Parallel execution using ThreadPoolExecutor
-    with ThreadPoolExecutor() as executor:
-        results = list(executor.map(fetch_data_for_market, markets_list))
-
-    # Aggregates all data
-    for data in results:
-        if data:
-            all_data.extend(data)
+# Function to cast an API value to float (None when missing or not numeric)
+def to_number(value):
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return None
+
+# Function to project the results to the app columns and store them column by column
+# The rows are sorted by market, class and date, and an index points to the latest-day rows of
+# each market and class: {market: {class: {report_date, start, stop}}}
+def build_columnar_output(records):
+    rows = []
+    for record in records:
+        report_date = parse_report_date(record.get('report_date'))
+        if report_date is None:
+            continue
+        row = {column: record.get(column) for column in text_columns}
+        row.update({column: to_number(record.get(column)) for column in numeric_columns})
+        row['report_date'] = report_date.strftime('%Y-%m-%d')
+        rows.append(row)
+    rows.sort(key=lambda row: (str(row['market_location_name']), str(row['class']), row['report_date']))
+
+    columns = ['report_date'] + text_columns + numeric_columns
+    latest_day_index = {}
+    for position, row in enumerate(rows):
+        market_index = latest_day_index.setdefault(row['market_location_name'], {})
+        entry = market_index.get(row['class'])
+        # Rows are sorted by date within a market and class, so a newer date restarts the range
+        if entry is None or entry['report_date'] != row['report_date']:
+            market_index[row['class']] = {'report_date': row['report_date'], 'start': position, 'stop': position + 1}
+        else:
+            entry['stop'] = position + 1
 
-    return all_data
+    return {
+        'columns': {column: [row[column] for row in rows] for column in columns},
+        'latest_day_index': latest_day_index
+    }
 
 def lambda_handler(event, context):
     # Fetching market list from S3
     response = s3.get_object(Bucket=bucket_name, Key=key_path_read)  # Fetches the object from the S3 bucket
     markets_list = json.loads(response['Body'].read().decode('utf-8'))  # Decodes and loads the JSON data
 
-    # Fetches data for all markets
-    last_market_data = fetch_all_data(markets_list)
+    # Fetches data for all markets, keeping enough time to store the output
+    deadline = None
+    if context is not None:
+        deadline = time.monotonic() + context.get_remaining_time_in_millis() / 1000 - deadline_margin
+    last_market_data = fetch_all_data(markets_list, deadline)
+
+    # Converts the aggregated data to a compressed columnar JSON and uploads to S3
+    json_content = json.dumps(build_columnar_output(last_market_data), separators=(',', ':'))
+    json_bytes = gzip.compress(json_content.encode('utf-8'))
 
-    # Converts the aggregated data to JSON and uploads to S3
-    json_content = json.dumps(last_market_data)
-    json_bytes = json_content.encode('utf-8')
-    
-    key_path_write = 'market_data/last_market_data.json'
-    s3.put_object(Bucket=bucket_name, Key=key_path_write, Body=json_bytes)
+    s3.put_object(Bucket=bucket_name, Key=key_path_write, Body=json_bytes, ContentType='application/gzip')
     print(f"Store data at: bucket {bucket_name}, key {key_path_write}")
 
     return {
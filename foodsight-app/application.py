@@ -1,11 +1,14 @@
 # ------------------------------------------------------------------------------
 # Libraries
 import dash
-from dash import dcc, html, Input, Output, callback
-import geopandas as gpd
+from dash import dcc, html, Input, Output, State, callback, ClientsideFunction
+from dash.exceptions import PreventUpdate
 from shapely.geometry import Point
 import dash_bootstrap_components as dbc
 
+# Background callbacks (slow spatial plots), see utils/background.py
+from utils.background import manager as background_manager, celery_app
+
 # ------------------------------------------------------------------------------
 # App configuration
 external_styles = [
@@ -17,7 +20,8 @@ app = dash.Dash(__name__, #use_pages=True,
                 external_stylesheets= external_styles,
                 # suppress_callback_exceptions=True,
                 assets_folder ="static",
-                assets_url_path="static"
+                assets_url_path="static",
+                background_callback_manager=background_manager
                 )
 app.title = 'FoodSight'
 app.scripts.config.serve_locally = True
@@ -25,6 +29,11 @@ app.css.config.serve_locally = True
 
 application = app.server
 
+# Opt-in callback latency metrics on /metrics and profiling (FOODSIGHT_METRICS=1, FOODSIGHT_PROFILE=1,
+# see utils/metrics.py)
+from utils.metrics import instrument
+instrument(application)
+
 
 # ------------------------------------------------------------------------------
 # Reference pages
@@ -36,18 +45,13 @@ from pages.resources import layout as resources_layout
 
 # ------------------------------------------------------------------------------
 # Import data 
-
-## AOI Grid
-grid_geojson_path = 'static/grasscast_aoi_grid.geojson'
-aoi_grid = gpd.read_file(grid_geojson_path).to_crs(epsg=4326)
-
-## Counties
-counties_geojson_path = 'static/grasscast_counties.geojson'
-counties_gpd = gpd.read_file(counties_geojson_path).to_crs(epsg=4326)
-counties_list = counties_gpd['name'].tolist()
+# Datasets are loaded on first use from the data registry (utils/datasets.py). The warm-up
+# thread started below loads them in the background while the server answers requests.
+from utils.registry import registry
 
 # Counties dropdown options
 def get_dropdown_options():
+    counties_gpd = registry.get('counties_gpd')
     return [{'label': f"{county['name']}, {county['state_usps']}", 'value': county['name']} for county in counties_gpd.to_dict('records')]
 
 
@@ -133,7 +137,7 @@ app.layout = html.Div(
                                                         dcc.Dropdown(
                                                             id='autocomplete-input',
                                                             className='location-dropdown',
-                                                            options=get_dropdown_options(),
+                                                            options=[],  # Filled on page load (update_dropdown_options)
                                                             value='none',
                                                             multi=False,
                                                             placeholder='Select County...',
@@ -213,21 +217,31 @@ app.layout = html.Div(
 
 # --------------------------
 # Closing the modal 
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='close_modal'),
     Output("welcome-modal", "is_open"),
     [Input("modal-close-button", "n_clicks")],
     [dash.dependencies.State("welcome-modal", "is_open")]
 )
-def closing_modal(n_clicks, is_open):
-    if n_clicks:
-        return not is_open
-    return is_open
 
 # --------------------------
 # Activate Geolocation
-@app.callback(Output("geolocation", "update_now"), Input("update_btn", "n_clicks"))
-def activate_geolocation(click):
-    return True if click and click > 0 else False
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='activate_geolocation'),
+    Output("geolocation", "update_now"), Input("update_btn", "n_clicks")
+)
+
+# --------------------------
+# Fill the counties dropdown once the page is loaded
+@app.callback(
+    Output('autocomplete-input', 'options'),
+    [Input('url', 'pathname')],
+    [State('autocomplete-input', 'options')]
+)
+def update_dropdown_options(pathname, options):
+    if options:
+        raise PreventUpdate
+    return get_dropdown_options()
 
 # --------------------------
 # Update dropdown input based on user location
@@ -241,7 +255,7 @@ def update_dropdown_input(position):
     print("location browser",position)
     if position and 'lat' in position and 'lon' in position:
         point = Point(position['lat'], position['lon'])
-        if aoi_grid.contains(point).any():
+        if registry.get('aoi_grid').contains(point).any():
             coordinates = [position['lat'], position['lon']]
         else:
             coordinates = default_coordinates
@@ -250,6 +264,7 @@ def update_dropdown_input(position):
         coordinates = default_coordinates
 
     point = Point(coordinates[1], coordinates[0])
+    counties_gpd = registry.get('counties_gpd')
     polygon = counties_gpd.loc[counties_gpd.geometry.contains(point)]
     
     if not polygon.empty:
@@ -267,7 +282,7 @@ def update_dropdown_input(position):
               [Input('url', 'pathname')])
 def display_page(pathname):
     if pathname in (None, '/', '/forecast'):
-        return forecast_layout
+        return forecast_layout()
     elif pathname == '/econ':
         return econ_layout
     elif pathname == '/decision': 
@@ -275,11 +290,12 @@ def display_page(pathname):
     elif pathname == '/resources': 
         return resources_layout
     else:
-        return forecast_layout  # This is the default page
+        return forecast_layout()  # This is the default page
 
 # --------------------------
 # Callback to set the active page button style
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='page_button_styles'),
     [Output('forecast-button', 'style'), 
      Output('econ-button', 'style'),
      Output('decision-button', 'style'),
@@ -287,41 +303,19 @@ def display_page(pathname):
      Output('resources-button-hidden', 'style')],
     [Input('url', 'pathname')]
 )
-def update_button_style(pathname):
-    default_style = {}
-    dark_forecast = {'background-color': '#dbe5f3', 'border': 'none'}
-    dark_econ = {'background-color': '#282b3f', 'color':'white', 'border': 'none'}
-    dark_decision = {'background-color': '#efb750', 'border': 'none'}
-    dark_resources = {'background-color': '#e3dfd8', 'border': 'none'}
-
-    
-    if pathname in (None, '/', '/forecast'):
-        return dark_forecast, default_style, default_style, default_style, default_style
-    elif pathname == '/econ':
-        return default_style, dark_econ, default_style, default_style, default_style
-    elif pathname == '/decision':
-        return default_style, default_style, dark_decision, default_style, default_style
-    elif pathname == '/resources':
-        return default_style, default_style, default_style, dark_resources, dark_resources
-    else:
-        return default_style, default_style, default_style, default_style  # default style for all buttons
 
 # --------------------------
 # Callback to update page description
-@app.callback(
+app.clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='page_description'),
     Output('info-tooltip', 'children'),
     [Input('url', 'pathname')]
 )
-def update_tooltip_message(pathname):
-    if pathname in (None, '/', '/forecast'):
-        return "This section presents the Grassland Productivity Forecast generated by Grasscast from the National Drought Mitigation Center at the University of Nebraska-Lincoln. The forecast is summarized based on county or map selection. Expected production is correlated with anticipated climate scenarios from the NOAA Climate Prediction Center. Users can access the most recent forecast value released and track forecast trends until the end of each season. Additionally, one can navigate through historical data to view past productivity. The platform also enables users to spatially identify areas with higher productivity in comparison to a current location or a selected location on the map. This feature is particularly useful for exploring productivity across the southwest plains. Ranchers and land managers should use this information in combination with their local knowledge of soils, plant communities, topography, and management to help with decision-making."
-    elif pathname == '/econ':
-        return "This section provides access to nominal data from several cattle and hay market auctions. The data is sourced from the MyMarketNews API, a USDA service that offers unbiased, timely, and accurate market information for hundreds of agricultural commodities and their related products. This interface features multiple tabs, enabling users to select a specific time range, cattle or hay type, state, and auction market. For cattle, users can choose between viewing daily average prices or monthly aggregated prices. Furthermore, users can visualize the relationship between prices and weight based on the most recent auction data. For hay, the platform showcases daily average price trends across various markets."
-    elif pathname == '/decision':
-        return "This section integrates the 'Strategies for Beef Cattle Herds During Times of Drought,' designed by Jeffrey E. Tranel, Rod Sharp, & John Deering from the Department of Agriculture and Business Management at Colorado State University. This decision tool aims to assist cow-calf producers in comparing the financial implications of various management strategies during droughts when grazing forage becomes scarce. It serves as a guide only. Producers should consult with their lenders, tax practitioners, and/or other professionals before making any final decisions.",
-    elif pathname == '/resources':
-        return "Details and links to the resources used in this application."
-        return ""
+
+
+# ------------------------------------------------------------------------------
+# Load the datasets in the background
+registry.warm_up()
 
 
 # ------------------------------------------------------------------------------
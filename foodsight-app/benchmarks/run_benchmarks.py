@@ -0,0 +1,205 @@
+# ------------------------------------------------------------------------------
+# Benchmarks of the forecast page hot paths
+#
+# Times the data wrangling helpers, the county spatial joins and the polar, forecast (lasso
+# selection) and choropleth callbacks of pages/forecast.py on synthetic data at production scale
+# (benchmarks/synthetic_data.py), so no S3, MMN or Mapbox access is needed. Run from the
+# foodsight-app folder:
+#   python benchmarks/run_benchmarks.py --rounds 5
+# Results are saved in benchmarks/results/ (one JSON file per run, named after the commit) and
+# compared with the previous run of the same scale. Exits with status 1 when a benchmark is
+# slower than --threshold times its previous best time (min of the rounds, the least noisy).
+
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import warnings
+from datetime import datetime
+
+import dash
+from dash._callback_context import context_value
+from dash._utils import AttributeDict
+from geopandas.tools import sjoin
+import numpy as np
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, APP_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from synthetic_data import build_datasets
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Columns kept by the forecast page before the county joins
+COLUMNS_FORECAST = ['gridid', 'report_date', 'npp_predict_below', 'npp_predict_avg', 'npp_predict_above',
+                    'cat', 'prob', 'year', 'npp_predict_clim', 'meananppgrid', 'geometry']
+COLUMNS_HIST = ['gridid', 'year', 'predicted_spring_anpp_lbs_ac', 'predicted_summer_anpp_lbs_ac', 'anpp_lbs_ac', 'geometry']
+
+
+# ------------------------------------------------------------------------------
+# Setup
+
+# Forecast page with the registry datasets replaced by the synthetic ones
+def load_forecast_page(datasets):
+    # Pages register themselves in the Dash app
+    dash.Dash(__name__)
+    from pages import forecast
+    from utils.registry import registry
+    for name, value in datasets.items():
+        registry.register(name, lambda value=value: value)
+    return forecast
+
+
+# Call a callback outside of a request, as if it had been triggered by prop_id
+def call_callback(function, prop_id, *args):
+    context_value.set(AttributeDict(triggered_inputs=[{'prop_id': prop_id, 'value': None}]))
+    return getattr(function, '__wrapped__', function)(*args)
+
+
+# Benchmark cases: name -> function without arguments
+def build_cases(forecast, datasets):
+    current_year = datasets['current_year']
+    gdf_hist, gdf_forecast = datasets['gdf_hist'], datasets['gdf_forecast']
+    counties_gpd = datasets['counties_gpd']
+
+    # A Great Plains county and a lasso selection of ~2,000 cells
+    county = counties_gpd.loc[counties_gpd['aoi'] == 'gp', 'name'].iloc[len(counties_gpd) // 4]
+    polygon = counties_gpd.loc[counties_gpd['name'] == county]
+    selection = datasets['aoi_gridids'][0]['gridid'][:2000]
+    selection_store = json.dumps(selection)  # As stored by store_selected_map_data
+
+    forecast_county = sjoin(gdf_forecast[COLUMNS_FORECAST], polygon, how='inner', predicate='intersects')
+    forecast_selection = gdf_forecast[gdf_forecast['gridid'].isin(selection)]
+    hist_past = gdf_hist[gdf_hist['year'] != current_year]
+    hist_selection = hist_past[hist_past['gridid'].isin(selection)]
+
+    hist_series = gdf_hist.assign(predicted_anpp=np.where(
+        gdf_hist['anpp_lbs_ac'].notna(), gdf_hist['anpp_lbs_ac'], gdf_hist['predicted_summer_anpp_lbs_ac']))
+    hist_series_county = sjoin(hist_series[['gridid', 'year', 'predicted_anpp', 'geometry']], polygon,
+                               how='inner', predicate='intersects')
+    hist_series_selection = hist_series[hist_series['gridid'].isin(selection)]
+
+    return {
+        'sjoin_county_forecast': lambda: sjoin(gdf_forecast[COLUMNS_FORECAST], polygon, how='inner', predicate='intersects'),
+        'sjoin_county_hist': lambda: sjoin(hist_past[COLUMNS_HIST], polygon, how='inner', predicate='intersects'),
+        'create_forecast_summaries_county': lambda: forecast.create_forecast_summaries(forecast_county.copy(), current_year),
+        'create_forecast_summaries_selection': lambda: forecast.create_forecast_summaries(forecast_selection.copy(), current_year),
+        'create_hist_summaries_county': lambda: forecast.create_hist_summaries(hist_past, COLUMNS_HIST, spatial_join=True, polygon=polygon),
+        'create_hist_summaries_selection': lambda: forecast.create_hist_summaries(hist_selection, COLUMNS_HIST),
+        'process_hist_series_data_county': lambda: forecast.process_hist_series_data(hist_series_county),
+        'process_hist_series_data_selection': lambda: forecast.process_hist_series_data(hist_series_selection),
+        'update_polar': lambda: call_callback(forecast.update_polar, 'miles-input.value',
+                                              county, 100, None, current_year - 1, None),
+        'update_polar_selection': lambda: call_callback(forecast.update_polar, 'selected-data-store.children',
+                                                        None, 100, None, current_year - 1, selection_store),
+        'update_forecast_plot_selection': lambda: call_callback(forecast.update_forecast_plot, 'selected-data-store.children',
+                                                                None, False, None, selection_store),
+        'update_choropleth_map': lambda: call_callback(forecast.update_choropleth_map, 'slct_year.value',
+                                                       current_year - 1, county, ['gp', 'sw'], None, None, None),
+        'update_choropleth_map_sw': lambda: call_callback(forecast.update_choropleth_map, 'checkboxes-map.value',
+                                                          current_year - 1, county, ['sw'], None, None, None)
+    }
+
+
+# ------------------------------------------------------------------------------
+# Timing and results
+
+def run(cases, rounds):
+    results = {}
+    for name, case in cases.items():
+        case()  # Warm-up
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            case()
+            times.append(time.perf_counter() - start)
+        results[name] = {'min': min(times), 'median': statistics.median(times),
+                         'mean': statistics.mean(times), 'rounds': rounds}
+        print(f"{name:40s} {results[name]['median'] * 1000:10.1f} ms")
+    return results
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown', False
+    return commit, dirty
+
+
+# Most recent saved run with the same scale
+def previous_run(scale, results_dir):
+    for path in sorted(glob.glob(os.path.join(results_dir, '*.json')), reverse=True):
+        with open(path) as file:
+            run = json.load(file)
+        if run.get('scale') == scale:
+            return path, run
+    return None, None
+
+
+# Benchmarks slower than threshold x their previous best time
+def compare(results, previous, threshold):
+    regressions = []
+    print(f"\n{'Benchmark':40s} {'Min (ms)':>12s} {'Previous':>12s} {'Ratio':>8s}")
+    for name, result in results.items():
+        if name not in previous['results']:
+            continue
+        before = previous['results'][name]['min']
+        ratio = result['min'] / before if before else float('inf')
+        flag = '  slower' if ratio > threshold else ''
+        print(f"{name:40s} {result['min'] * 1000:12.1f} {before * 1000:12.1f} {ratio:8.2f}{flag}")
+        if ratio > threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the forecast page hot paths on synthetic data")
+    parser.add_argument('--scale', type=float, default=1.0, help="fraction of the production grid size")
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--filter', default='', help="only run benchmarks whose name contains this text")
+    parser.add_argument('--threshold', type=float, default=1.2, help="slowdown ratio (min time) reported as a regression")
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    parser.add_argument('--no-save', action='store_true', help="do not save the results")
+    args = parser.parse_args()
+
+    # Relative paths of the page (static/, data/) are resolved from the app folder
+    os.chdir(APP_DIR)
+    datasets = build_datasets(scale=args.scale)
+    forecast = load_forecast_page(datasets)
+    # Pandas/shapely warnings raised by the page code are not relevant here
+    warnings.filterwarnings('ignore')
+    cases = {name: case for name, case in build_cases(forecast, datasets).items() if args.filter in name}
+
+    results = run(cases, args.rounds)
+    commit, dirty = git_commit()
+    current = {
+        'commit': commit, 'dirty': dirty, 'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(), 'machine': platform.machine(), 'scale': args.scale,
+        'results': results
+    }
+
+    path, previous = previous_run(args.scale, args.results_dir)
+    regressions = []
+    if previous:
+        print(f"\nCompared with {os.path.basename(path)}")
+        regressions = compare(results, previous, args.threshold)
+
+    if not args.no_save:
+        os.makedirs(args.results_dir, exist_ok=True)
+        name = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{commit}{'-dirty' if dirty else ''}.json"
+        with open(os.path.join(args.results_dir, name), 'w') as file:
+            json.dump(current, file, indent=2)
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
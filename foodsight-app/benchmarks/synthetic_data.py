@@ -0,0 +1,151 @@
+# ------------------------------------------------------------------------------
+# Synthetic ANPP datasets for the benchmarks
+#
+# Same columns and scale as the files written by the forecast Lambda and read by the app, so the
+# benchmarks run offline (no S3 or MMN access):
+#   - AOI grid: ~18,000 square cells split into a Great Plains (gp) and a Southwest (sw) block
+#   - Historical data: one row per cell and year (40 years). gp cells have anpp_lbs_ac, sw cells
+#     the spring and summer predictions
+#   - Forecast data: one row per cell and biweekly report (April to September) of the current year
+#   - Counties: rectangles of 6 x 6 cells covering both blocks
+
+from datetime import datetime
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+from utils.aoi import AoiIndex
+from utils.selection import GridIndex
+
+# ------------------------------------------------------------------------------
+# Constants
+
+# Number of cells of each AOI in the Grass-Cast grid (static/aoi_gridids.json)
+AOI_CELLS = {'gp': 11924, 'sw': 6107}
+# Lower left corner (lon, lat) of each AOI block and cell size in degrees
+AOI_ORIGINS = {'gp': (-105.0, 36.0), 'sw': (-113.0, 31.0)}
+CELL_SIZE = 0.1
+COUNTY_CELLS = 6
+AOI_STATES = {'gp': ['NE', 'KS', 'CO', 'WY', 'SD'], 'sw': ['AZ', 'NM']}
+CATEGORIES = ['Below', 'EC', 'Above']
+
+
+# ------------------------------------------------------------------------------
+# Grid and counties
+
+# Cells of one AOI block, as (gridid, column, row) arrays
+def _block_cells(n, first_gridid):
+    width = int(np.ceil(np.sqrt(n)))
+    index = np.arange(n)
+    return first_gridid + index, index % width, index // width
+
+
+def build_grid(scale=1.0):
+    frames = []
+    first_gridid = 1000
+    for aoi, n in AOI_CELLS.items():
+        gridid, col, row = _block_cells(max(int(n * scale), 1), first_gridid)
+        x0, y0 = AOI_ORIGINS[aoi]
+        x, y = x0 + col * CELL_SIZE, y0 + row * CELL_SIZE
+        frames.append(gpd.GeoDataFrame({
+            'gridid': gridid,
+            'aoi': aoi,
+            'geometry': shapely.box(x, y, x + CELL_SIZE, y + CELL_SIZE)
+        }, crs='EPSG:4326'))
+        first_gridid = gridid[-1] + 1000
+    return pd.concat(frames, ignore_index=True)
+
+
+def build_counties(aoi_grid):
+    frames = []
+    for aoi, cells in aoi_grid.groupby('aoi', sort=False):
+        x0, y0 = AOI_ORIGINS[aoi]
+        bounds = cells.total_bounds
+        size = COUNTY_CELLS * CELL_SIZE
+        xs = np.arange(x0, bounds[2], size)
+        ys = np.arange(y0, bounds[3], size)
+        x, y = [values.ravel() for values in np.meshgrid(xs, ys)]
+        states = AOI_STATES[aoi]
+        frames.append(gpd.GeoDataFrame({
+            'name': [f"County {aoi.upper()} {i}" for i in range(len(x))],
+            'state_usps': [states[i % len(states)] for i in range(len(x))],
+            'aoi': aoi,
+            'geometry': shapely.box(x, y, x + size, y + size)
+        }, crs='EPSG:4326'))
+    return pd.concat(frames, ignore_index=True)
+
+
+# ------------------------------------------------------------------------------
+# ANPP data
+
+def build_hist(aoi_grid, current_year, n_years, rng):
+    years = np.arange(current_year - n_years + 1, current_year + 1)
+    gridid = np.repeat(aoi_grid['gridid'].values, len(years))
+    is_sw = np.repeat(aoi_grid['aoi'].values == 'sw', len(years))
+    year = np.tile(years, len(aoi_grid))
+    # Productivity of each cell with yearly variability
+    cell_mean = np.repeat(rng.uniform(300, 2500, len(aoi_grid)), len(years))
+    anpp = cell_mean * rng.lognormal(0, 0.25, len(gridid))
+    return pd.DataFrame({
+        'gridid': gridid,
+        'year': year,
+        'predicted_spring_anpp_lbs_ac': np.where(is_sw, anpp * rng.uniform(0.3, 0.6, len(gridid)), np.nan),
+        'predicted_summer_anpp_lbs_ac': np.where(is_sw, anpp, np.nan),
+        'anpp_lbs_ac': np.where(is_sw, np.nan, anpp)
+    })
+
+
+def build_forecast(aoi_grid, current_year, rng):
+    report_dates = pd.date_range(f"{current_year}-04-01", f"{current_year}-09-30", freq='14D').strftime('%Y-%m-%d')
+    n = len(aoi_grid) * len(report_dates)
+    meananppgrid = np.repeat(rng.uniform(300, 2500, len(aoi_grid)), len(report_dates))
+    change = rng.normal(0, 0.15, n)
+    return pd.DataFrame({
+        'gridid': np.repeat(aoi_grid['gridid'].values, len(report_dates)),
+        'year': current_year,
+        'report_date': np.tile(report_dates, len(aoi_grid)),
+        'meananppgrid': meananppgrid,
+        'npp_predict_below': meananppgrid * (0.8 + change),
+        'npp_predict_avg': meananppgrid * (1 + change),
+        'npp_predict_above': meananppgrid * (1.2 + change),
+        'cat': rng.choice(CATEGORIES, n),
+        'prob': rng.choice([33, 40, 50, 60], n),
+        'npp_predict_clim': meananppgrid * (1 + change + rng.normal(0, 0.05, n))
+    })
+
+
+# ------------------------------------------------------------------------------
+# Datasets
+
+# Every dataset of the data registry used by the forecast page (see utils/datasets.py)
+def build_datasets(scale=1.0, n_years=40, seed=0, current_year=None):
+    rng = np.random.default_rng(seed)
+    current_year = current_year or datetime.now().year
+
+    aoi_grid = build_grid(scale)
+    counties_gpd = build_counties(aoi_grid)
+    df_hist = build_hist(aoi_grid, current_year, n_years, rng)
+    df_forecast = build_forecast(aoi_grid, current_year, rng)
+    aoi_gridids = [{'aoi': aoi, 'gridid': cells['gridid'].tolist()} for aoi, cells in aoi_grid.groupby('aoi', sort=False)]
+    aoi_index = AoiIndex(aoi_gridids)
+    grid_index = GridIndex.from_grid(aoi_grid, aoi_index)
+    grid = aoi_grid[['gridid', 'geometry']].assign(cell=grid_index.offsets(aoi_grid['gridid']))
+
+    gdf_hist = grid.merge(df_hist, left_on='gridid', right_on='gridid')
+    return {
+        'df_hist': df_hist,
+        'df_forecast': df_forecast,
+        'current_year': current_year,
+        'aoi_grid': aoi_grid[['gridid', 'geometry']],
+        'gdf_hist': gdf_hist,
+        'gdf_forecast': grid.merge(df_forecast, left_on='gridid', right_on='gridid'),
+        'years': gdf_hist['year'].unique().tolist(),
+        'aoi_gridids': aoi_gridids,
+        'aoi_index': aoi_index,
+        'grid_index': grid_index,
+        'counties_gpd': counties_gpd,
+        'counties_geojson': counties_gpd.__geo_interface__,
+        'mapbox_token': 'offline-benchmark-token'
+    }
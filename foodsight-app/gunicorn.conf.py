@@ -0,0 +1,57 @@
+# ------------------------------------------------------------------------------
+# Gunicorn configuration (used by the Procfile on Elastic Beanstalk)
+#
+# FOODSIGHT_WORKER_CLASS selects how a worker serves concurrent requests:
+#   - gthread (default): FOODSIGHT_THREADS threads per worker. A callback waiting on the MMN API
+#     releases the GIL, so the other threads keep answering.
+#   - gevent: FOODSIGHT_WORKER_CONNECTIONS greenlets per worker, the network calls are made
+#     cooperative by gevent. Suited to MMN-heavy traffic; CPU-bound callbacks block the worker
+#     loop while they run, so keep the heavy ones in the process pool (utils/workers.py).
+#     The background callbacks (utils/background.py) fork a process per job with diskcache:
+#     use FOODSIGHT_BACKGROUND=celery with gevent workers.
+#   - sync: one request at a time per worker (previous deployment).
+# The MMN requests are bounded by timeouts and a concurrency limit (utils/mmn.py) in every mode.
+#
+# Run locally from the foodsight-app folder:
+#   FOODSIGHT_WORKER_CLASS=gevent gunicorn --config gunicorn.conf.py application:application
+
+import multiprocessing
+import os
+
+# ------------------------------------------------------------------------------
+# Settings
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 8000)}"
+worker_class = os.environ.get('FOODSIGHT_WORKER_CLASS', 'gthread')
+# Every worker holds its own copy of the datasets: keep the count low and add threads instead
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count(), 4)))
+threads = int(os.environ.get('FOODSIGHT_THREADS', 8))  # gthread only
+worker_connections = int(os.environ.get('FOODSIGHT_WORKER_CONNECTIONS', 200))  # gevent only
+timeout = int(os.environ.get('FOODSIGHT_WORKER_TIMEOUT', 120))  # Seconds
+graceful_timeout = 30
+keepalive = 5
+# Restart the workers from time to time (memory growth of the plotting libraries)
+max_requests = int(os.environ.get('FOODSIGHT_MAX_REQUESTS', 5000))
+max_requests_jitter = max_requests // 10
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('FOODSIGHT_LOG_LEVEL', 'info')
+
+if worker_class not in ('gthread', 'gevent', 'sync'):
+    raise ValueError(f"Error: unsupported worker class '{worker_class}' (gthread, gevent or sync)")
+
+
+# ------------------------------------------------------------------------------
+# Hooks
+
+# Start the callback metrics of the workers from zero (shared folder, see utils/metrics.py)
+def on_starting(server):
+    from utils.metrics import clear_shared_metrics
+    clear_shared_metrics()
+
+
+# Stop the process pool of the worker with it
+def worker_exit(server, worker):
+    from utils import workers as process_pool
+    process_pool.shutdown()
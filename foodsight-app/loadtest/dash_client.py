@@ -0,0 +1,347 @@
+# ------------------------------------------------------------------------------
+# Dash client for the load tests
+#
+# Replays user sessions against the Dash callback endpoint (/_dash-update-component) the way the
+# Dash renderer does: it loads the layout and the callback graph (/_dash-dependencies), keeps the
+# props of every component in the page, builds the callback payloads from them and chains the
+# callbacks whose inputs were updated by a response (including the initial callbacks of the
+# components added by a page change). Clientside callbacks run in the browser and are skipped.
+# Background callbacks answer with a job that is polled until its result is ready: the polls are
+# reported as "<callback> [poll]" and the time to the result as a JOB request of the callback.
+#
+# Sessions are scenario files (loadtest/scenarios/*.json), run by locust (loadtest/locustfile.py)
+# or replayed once from the command line to check them, from the foodsight-app folder:
+#   python loadtest/dash_client.py --host http://localhost:8080 --scenario loadtest/scenarios/forecast_county.json
+
+import argparse
+import glob
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+import requests
+
+LOADTEST_DIR = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS_DIR = os.path.join(LOADTEST_DIR, 'scenarios')
+# Grid IDs of each AOI, used to build the lasso selections of the scenarios
+GRIDIDS_PATH = os.environ.get('LOADTEST_GRIDIDS', os.path.join(LOADTEST_DIR, '..', 'static', 'aoi_gridids.json'))
+
+CALLBACK_PATH = '/_dash-update-component'
+# Chained callbacks run after one interaction (guards against callback loops)
+MAX_CALLBACKS = 50
+# Seconds before giving up on the result of a background callback
+JOB_TIMEOUT = 300
+
+
+# ------------------------------------------------------------------------------
+# Layout and callback graph
+
+def is_component(value):
+    return isinstance(value, dict) and 'props' in value and 'type' in value and 'namespace' in value
+
+
+# Components (with an id) in a layout value, nested children included
+def iter_components(value):
+    if isinstance(value, list):
+        for item in value:
+            yield from iter_components(item)
+    elif is_component(value):
+        if 'id' in value['props']:
+            yield value
+        for prop_value in value['props'].values():
+            yield from iter_components(prop_value)
+
+
+# "id.prop" or "..id1.prop1...id2.prop2.." -> [(id, prop)]
+def split_outputs(output):
+    if output.startswith('..'):
+        return [tuple(item.rsplit('.', 1)) for item in output[2:-2].split('...')]
+    return [tuple(output.rsplit('.', 1))]
+
+
+# Callback name in the reports (same as the server metrics, see utils/metrics.py)
+def callback_name(callback):
+    return callback['output'].strip('.')
+
+
+class CallbackGraph:
+    def __init__(self, dependencies):
+        # Clientside callbacks never reach the server
+        self.callbacks = [callback for callback in dependencies if not callback.get('clientside_function')]
+        self.by_input = {}
+        for callback in self.callbacks:
+            callback['outputs_list'] = split_outputs(callback['output'])
+            for item in callback['inputs']:
+                self.by_input.setdefault((item['id'], item['property']), []).append(callback)
+
+    def triggered_by(self, props):
+        callbacks = []
+        for key in props:
+            for callback in self.by_input.get(key, []):
+                if callback not in callbacks:
+                    callbacks.append(callback)
+        return callbacks
+
+
+# ------------------------------------------------------------------------------
+# Session
+
+class DashSession:
+    # client: locust HttpSession, or TimedClient to replay without locust
+    # record(name, seconds): reports the time to the result of a background callback
+    def __init__(self, client, graph=None, think=True, sleep=time.sleep, record=None):
+        self.client = client
+        self.graph = graph
+        self.think = think
+        self.sleep = sleep
+        self.record = record
+        # Component id -> props
+        self.props = {}
+
+    # Browser page load: index, layout and callback graph, then the initial callbacks
+    def open(self, pathname):
+        self.client.get(pathname, name='page')
+        layout = self.client.get('/_dash-layout', name='_dash-layout').json()
+        dependencies = self.client.get('/_dash-dependencies', name='_dash-dependencies').json()
+        if self.graph is None:
+            self.graph = CallbackGraph(dependencies)
+        self.props = {}
+        added = self.add_components(layout)
+        # dcc.Location reports the browser path when it mounts
+        for component in iter_components(layout):
+            if component['type'] == 'Location':
+                self.props[component['props']['id']]['pathname'] = pathname
+        self.run_callbacks(self.initial_callbacks(added))
+
+    # User interaction: new prop value, then every callback it triggers
+    def set_prop(self, component_id, prop, value):
+        if component_id not in self.props:
+            raise KeyError(f"Error: component '{component_id}' is not in the page")
+        self.props[component_id][prop] = value
+        self.run_callbacks(self.graph.triggered_by([(component_id, prop)]), changed=[(component_id, prop)])
+
+    def add_components(self, value):
+        added = []
+        for component in iter_components(value):
+            component_id = component['props']['id']
+            self.props[component_id] = {k: v for k, v in component['props'].items()}
+            added.append(component_id)
+        return added
+
+    def remove_components(self, value):
+        for component in iter_components(value):
+            self.props.pop(component['props']['id'], None)
+
+    # Callbacks fired when components are added: all their inputs are in the page
+    def initial_callbacks(self, added):
+        added = set(added)
+        return [callback for callback in self.graph.callbacks
+                if not callback.get('prevent_initial_call')
+                and any(item['id'] in added for item in callback['inputs'])
+                and all(item['id'] in self.props for item in callback['inputs'] + callback['state'])]
+
+    def run_callbacks(self, pending, changed=()):
+        # Props changed by the interaction or the previous responses, per callback
+        changed_by = {id(callback): [f"{i}.{p}" for i, p in changed] for callback in pending}
+        count = 0
+        while pending and count < MAX_CALLBACKS:
+            # Callbacks waiting for the outputs of another pending callback run later
+            callback = next((callback for callback in pending if not self.waits_for(callback, pending)), pending[0])
+            pending.remove(callback)
+            count += 1
+            if not all(item['id'] in self.props for item in callback['inputs'] + callback['state']):
+                continue
+            updated, added = self.call(callback, changed_by.pop(id(callback), []))
+            for next_callback in self.graph.triggered_by(updated) + self.initial_callbacks(added):
+                # A callback is not triggered by its own outputs
+                if next_callback is callback:
+                    continue
+                if next_callback not in pending:
+                    pending.append(next_callback)
+                changed_by.setdefault(id(next_callback), []).extend(f"{i}.{p}" for i, p in updated)
+
+    @staticmethod
+    def waits_for(callback, pending):
+        inputs = {(item['id'], item['property']) for item in callback['inputs']}
+        return any(inputs.intersection(other['outputs_list']) for other in pending if other is not callback)
+
+    def payload(self, callback, changed):
+        def value(item):
+            entry = {'id': item['id'], 'property': item['property']}
+            if item['property'] in self.props[item['id']]:
+                entry['value'] = self.props[item['id']][item['property']]
+            return entry
+
+        inputs = {f"{item['id']}.{item['property']}" for item in callback['inputs']}
+        outputs = [{'id': i, 'property': p} for i, p in callback['outputs_list']]
+        return {
+            'output': callback['output'],
+            'outputs': outputs if callback['output'].startswith('..') else outputs[0],
+            'inputs': [value(item) for item in callback['inputs']],
+            'state': [value(item) for item in callback['state']],
+            'changedPropIds': [prop_id for prop_id in dict.fromkeys(changed) if prop_id in inputs]
+        }
+
+    # One callback request. Returns the updated props and the components added to the page.
+    def call(self, callback, changed):
+        payload = self.payload(callback, changed)
+        start = time.perf_counter()
+        response = self.client.post(CALLBACK_PATH, json=payload, name=callback_name(callback))
+        if callback.get('long') and response.status_code == 200 and 'cacheKey' in response.json():
+            response = self.poll(callback, payload, response.json())
+            if self.record:
+                self.record(callback_name(callback), time.perf_counter() - start)
+        # 204: PreventUpdate
+        if response.status_code != 200:
+            return [], []
+        updated, added = [], []
+        for component_id, props in response.json().get('response', {}).items():
+            if component_id not in self.props:
+                continue
+            for prop, value in props.items():
+                self.remove_components(self.props[component_id].get(prop))
+                self.props[component_id][prop] = value
+                added += self.add_components(value)
+                updated.append((component_id, prop))
+        return updated, added
+
+    # Background callback: poll the job until the server answers with its result (or no update)
+    def poll(self, callback, payload, job):
+        path = f"{CALLBACK_PATH}?cacheKey={job['cacheKey']}&job={job['job']}"
+        deadline = time.monotonic() + JOB_TIMEOUT
+        while time.monotonic() < deadline:
+            self.sleep(callback['long']['interval'] / 1000)
+            response = self.client.post(path, json=payload, name=f"{callback_name(callback)} [poll]")
+            if response.status_code != 200 or 'response' in response.json():
+                return response
+        raise TimeoutError(f"Error: no result for {callback_name(callback)} after {JOB_TIMEOUT} s")
+
+    # Scenario steps (format in the Scenarios section below)
+    def run(self, scenario):
+        for step in scenario['steps']:
+            if 'open' in step:
+                self.open(step['open'])
+            elif 'navigate' in step:
+                location = next(component_id for component_id, props in self.props.items() if 'pathname' in props)
+                self.set_prop(location, 'pathname', step['navigate'])
+            elif 'set' in step:
+                component_id, prop = step['set'].rsplit('.', 1)
+                values = step['values'] if 'values' in step else [step['value']]
+                for i, value in enumerate(values):
+                    if i and self.think:
+                        self.sleep(step.get('interval', 0.5))
+                    self.set_prop(component_id, prop, resolve(value))
+            elif 'think' in step and self.think:
+                self.sleep(random.uniform(*step['think']))
+
+
+# ------------------------------------------------------------------------------
+# Scenarios
+#
+# A scenario is a recorded user session: {"name", "weight" (relative frequency), "steps"}, steps being
+#   {"open": "/forecast"}                               page load (first step)
+#   {"navigate": "/econ"}                               link to another page
+#   {"set": "miles-input.value", "value": 100}          new prop value (one interaction)
+#   {"set": "slct_year.value", "values": [2015, 2012], "interval": 0.5}   several ones (slider drag)
+#   {"think": [2, 6]}                                   pause of 2 to 6 seconds
+
+_gridids = None
+
+def load_gridids():
+    global _gridids
+    if _gridids is None:
+        with open(GRIDIDS_PATH) as file:
+            _gridids = {entry['aoi']: entry['gridid'] for entry in json.load(file)}
+    return _gridids
+
+
+# Scenario values: {"$lasso": {"aoi": "gp", "count": 600}} is a map selection of contiguous cells
+def resolve(value):
+    if isinstance(value, dict) and '$lasso' in value:
+        gridids = load_gridids()[value['$lasso']['aoi']]
+        count = value['$lasso']['count']
+        start = random.randrange(max(len(gridids) - count, 1))
+        return {'points': [{'customdata': [gridid]} for gridid in gridids[start:start + count]],
+                'lassoPoints': {'mapbox': []}}
+    return value
+
+
+def load_scenarios(pattern=os.path.join(SCENARIOS_DIR, '*.json')):
+    scenarios = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path) as file:
+            scenario = json.load(file)
+        scenario.setdefault('name', os.path.splitext(os.path.basename(path))[0])
+        scenario.setdefault('weight', 1)
+        scenarios.append(scenario)
+    if not scenarios:
+        raise FileNotFoundError(f"Error: no scenario matches {pattern}")
+    return scenarios
+
+
+# ------------------------------------------------------------------------------
+# Replay without locust
+
+# requests session recording the time of each request by name
+class TimedClient:
+    def __init__(self, host):
+        self.host = host.rstrip('/')
+        self.session = requests.Session()
+        self.times = {}
+        self.failures = {}
+
+    def request(self, method, path, name, **kwargs):
+        start = time.perf_counter()
+        response = self.session.request(method, self.host + path, timeout=300, **kwargs)
+        self.times.setdefault(name, []).append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.failures[name] = self.failures.get(name, 0) + 1
+            print(f"Error: {name} returned {response.status_code}")
+        return response
+
+    def get(self, path, name=None, **kwargs):
+        return self.request('GET', path, name or path, **kwargs)
+
+    def post(self, path, name=None, **kwargs):
+        return self.request('POST', path, name or path, **kwargs)
+
+    # Time to the result of a background callback
+    def record(self, name, seconds):
+        self.times.setdefault(f"{name} [job]", []).append(seconds)
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[min(int(len(values) * percent), len(values) - 1)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay load test scenarios once, without locust")
+    parser.add_argument('--host', default='http://localhost:8080')
+    parser.add_argument('--scenario', default=os.path.join(SCENARIOS_DIR, '*.json'), help="scenario file(s), glob patterns allowed")
+    parser.add_argument('--sessions', type=int, default=1, help="sessions replayed per scenario")
+    parser.add_argument('--think', action='store_true', help="keep the think times of the scenarios")
+    args = parser.parse_args()
+
+    client = TimedClient(args.host)
+    graph = None
+    for scenario in load_scenarios(args.scenario):
+        for _ in range(args.sessions):
+            start = time.perf_counter()
+            session = DashSession(client, graph, think=args.think, record=client.record)
+            session.run(scenario)
+            graph = session.graph
+            print(f"Scenario {scenario['name']}: {time.perf_counter() - start:.2f} s")
+
+    print(f"\n{'Request':70s} {'Calls':>6s} {'p50 (ms)':>9s} {'p95 (ms)':>9s} {'p99 (ms)':>9s}")
+    for name, times in sorted(client.times.items(), key=lambda item: -statistics.median(item[1])):
+        print(f"{name[:70]:70s} {len(times):6d} {percentile(times, 0.5) * 1000:9.0f} "
+              f"{percentile(times, 0.95) * 1000:9.0f} {percentile(times, 0.99) * 1000:9.0f}")
+    sys.exit(1 if client.failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# ------------------------------------------------------------------------------
+# Load test of the Dash app
+#
+# Each simulated user replays recorded sessions (loadtest/scenarios/*.json, picked by weight)
+# against the callback endpoint, under a step load (loadtest/shapes.py). Requests are reported by
+# callback (its outputs) and the report (loadtest/report.py) gives p50/p95/p99 per callback and
+# the load at which the workers saturate. Start the app (e.g. with gunicorn) and run from the
+# foodsight-app folder:
+#   pip install -r loadtest/requirements.txt
+#   LOADTEST_STEP_USERS=10 LOADTEST_STEPS=8 locust -f loadtest/locustfile.py --headless --host http://localhost:8080
+#
+# LOADTEST_SCENARIOS selects the scenario files (glob, default all of them) and LOADTEST_GRIDIDS the
+# grid IDs used for the lasso selections (static/aoi_gridids.json; with the offline data of
+# tools/seed_local_storage.py, the spatial_data/aoi_gridids.json file of the local storage).
+
+import os
+import random
+
+from locust import HttpUser, between, events, task
+
+from dash_client import DashSession, SCENARIOS_DIR, load_scenarios
+from report import StepReport
+from shapes import StepLoadShape  # Load shape used by locust
+
+scenarios = load_scenarios(os.environ.get('LOADTEST_SCENARIOS', os.path.join(SCENARIOS_DIR, '*.json')))
+weights = [scenario['weight'] for scenario in scenarios]
+
+
+# Time to the result of a background callback, reported as a JOB request of the callback
+def record_job(name, seconds):
+    events.request.fire(request_type='JOB', name=name, response_time=seconds * 1000, response_length=0,
+                        exception=None, context={})
+
+
+class DashUser(HttpUser):
+    # Pause between two sessions of the same user
+    wait_time = between(10, 30)
+    # Callback graph shared by the users (same app for all of them)
+    graph = None
+
+    @task
+    def session(self):
+        scenario = random.choices(scenarios, weights=weights)[0]
+        session = DashSession(self.client, DashUser.graph, record=record_job)
+        session.run(scenario)
+        DashUser.graph = session.graph
+
+
+# ------------------------------------------------------------------------------
+# Report
+
+report = None
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    global report
+    # Workers only send their stats to the master
+    if environment.parsed_options and getattr(environment.parsed_options, 'worker', False):
+        return
+    report = StepReport(environment)
+    report.start()
+
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    if report is None:
+        return
+    report.stop()
+    saturation = report.saturation()
+    report.print(saturation)
+    print(f"Report saved at {report.save(saturation)}")
@@ -0,0 +1,143 @@
+# ------------------------------------------------------------------------------
+# Load test report
+#
+# At the end of every load step the throughput, failure ratio and latency percentiles of the step
+# are sampled from the locust stats (on the master in distributed runs). At the end of the test the
+# report prints p50/p95/p99 per callback and the step at which the workers saturated: the first
+# step where adding users no longer adds throughput, the failures go over 1% or the p95 latency
+# triples. The report is saved in loadtest/results/ (one JSON file per run).
+
+import json
+import os
+import time
+from datetime import datetime
+
+import gevent
+
+import shapes
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Saturation criteria
+MIN_THROUGHPUT_GAIN = 0.25  # Fraction of the expected gain when users are added
+MAX_FAILURE_RATIO = 0.01
+MAX_P95_RATIO = 3  # p95 of a step / p95 of the first step
+
+
+# Percentile of a locust response time histogram ({rounded ms: count})
+def histogram_percentile(response_times, percent):
+    total = sum(response_times.values())
+    if total == 0:
+        return 0
+    target = total * percent
+    count = 0
+    for response_time in sorted(response_times):
+        count += response_times[response_time]
+        if count >= target:
+            return response_time
+    return max(response_times)
+
+
+class StepReport:
+    def __init__(self, environment):
+        self.environment = environment
+        self.steps = []
+        self._greenlet = None
+        self._last_snapshot = None
+
+    def start(self):
+        self.steps = []
+        self._last_snapshot = self._snapshot()
+        self._greenlet = gevent.spawn(self._sample_steps)
+
+    def stop(self):
+        if self._greenlet is not None:
+            self._greenlet.kill(block=False)
+        # Partial last step
+        if self._last_snapshot is not None:
+            self._sample(self._last_snapshot, final=True)
+
+    def _snapshot(self):
+        total = self.environment.stats.total
+        return {'time': time.monotonic(), 'requests': total.num_requests,
+                'failures': total.num_failures, 'response_times': dict(total.response_times)}
+
+    def _sample_steps(self):
+        while True:
+            gevent.sleep(shapes.step_time)
+            self._sample(self._last_snapshot)
+
+    def _sample(self, previous, final=False):
+        current = self._snapshot()
+        duration = current['time'] - previous['time']
+        requests = current['requests'] - previous['requests']
+        if duration <= 0 or (final and requests == 0):
+            return
+        response_times = {k: v - previous['response_times'].get(k, 0) for k, v in current['response_times'].items()}
+        self.steps.append({
+            'step': len(self.steps) + 1,
+            'users': self.environment.runner.user_count if self.environment.runner else None,
+            'duration': duration,
+            'requests': requests,
+            'throughput': requests / duration,
+            'failure_ratio': (current['failures'] - previous['failures']) / requests if requests else 0,
+            'p50': histogram_percentile(response_times, 0.5),
+            'p95': histogram_percentile(response_times, 0.95),
+            'p99': histogram_percentile(response_times, 0.99)
+        })
+        self._last_snapshot = current
+
+    # First saturated step (None when the workers kept up)
+    def saturation(self):
+        for previous, step in zip(self.steps, self.steps[1:]):
+            reasons = []
+            if previous['users'] and step['users'] and step['users'] > previous['users'] and previous['throughput'] > 0:
+                expected_gain = step['users'] / previous['users'] - 1
+                gain = step['throughput'] / previous['throughput'] - 1
+                if gain < MIN_THROUGHPUT_GAIN * expected_gain:
+                    reasons.append(f"throughput +{gain:.0%} for +{expected_gain:.0%} users")
+            if step['failure_ratio'] > MAX_FAILURE_RATIO:
+                reasons.append(f"{step['failure_ratio']:.1%} failures")
+            if self.steps[0]['p95'] and step['p95'] > MAX_P95_RATIO * self.steps[0]['p95']:
+                reasons.append(f"p95 {step['p95']} ms vs {self.steps[0]['p95']} ms")
+            if reasons:
+                return dict(step, reasons=reasons, max_throughput=max(s['throughput'] for s in self.steps[:step['step'] - 1]))
+        return None
+
+    def callbacks(self):
+        rows = []
+        for (name, method), entry in self.environment.stats.entries.items():
+            rows.append({
+                'name': name, 'method': method, 'requests': entry.num_requests, 'failures': entry.num_failures,
+                'p50': entry.get_response_time_percentile(0.5), 'p95': entry.get_response_time_percentile(0.95),
+                'p99': entry.get_response_time_percentile(0.99), 'max': entry.max_response_time
+            })
+        return sorted(rows, key=lambda row: row['p95'], reverse=True)
+
+    def print(self, saturation):
+        print(f"\n{'Request':70s} {'Calls':>7s} {'Fail':>5s} {'p50 (ms)':>9s} {'p95 (ms)':>9s} {'p99 (ms)':>9s}")
+        for row in self.callbacks():
+            print(f"{row['name'][:70]:70s} {row['requests']:7d} {row['failures']:5d} {row['p50']:9.0f} {row['p95']:9.0f} {row['p99']:9.0f}")
+
+        print(f"\n{'Step':>4s} {'Users':>6s} {'Req/s':>8s} {'Fail':>6s} {'p50 (ms)':>9s} {'p95 (ms)':>9s} {'p99 (ms)':>9s}")
+        for step in self.steps:
+            print(f"{step['step']:4d} {step['users'] or 0:6d} {step['throughput']:8.1f} {step['failure_ratio']:6.1%} "
+                  f"{step['p50']:9.0f} {step['p95']:9.0f} {step['p99']:9.0f}")
+
+        if saturation:
+            print(f"\nSaturated at step {saturation['step']} ({saturation['users']} users): {', '.join(saturation['reasons'])}. "
+                  f"Max throughput before saturation: {saturation['max_throughput']:.1f} req/s")
+        else:
+            print("\nNo saturation: every step added throughput without failures")
+
+    def save(self, saturation, results_dir=RESULTS_DIR):
+        os.makedirs(results_dir, exist_ok=True)
+        path = os.path.join(results_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+        with open(path, 'w') as file:
+            json.dump({
+                'date': datetime.now().isoformat(timespec='seconds'),
+                'host': self.environment.host,
+                'step_users': shapes.step_users, 'step_time': shapes.step_time,
+                'callbacks': self.callbacks(), 'steps': self.steps, 'saturation': saturation
+            }, file, indent=2)
+        return path
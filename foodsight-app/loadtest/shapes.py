@@ -0,0 +1,23 @@
+# ------------------------------------------------------------------------------
+# Step load shape
+#
+# Adds LOADTEST_STEP_USERS users every LOADTEST_STEP_TIME seconds, for LOADTEST_STEPS steps, so
+# the report (loadtest/report.py) can compare the throughput and latency of each step and find
+# the number of users at which the workers saturate.
+
+import os
+
+from locust import LoadTestShape
+
+step_users = int(os.environ.get('LOADTEST_STEP_USERS', 10))  # Users added at each step
+step_time = float(os.environ.get('LOADTEST_STEP_TIME', 120))  # Seconds
+steps = int(os.environ.get('LOADTEST_STEPS', 10))
+spawn_rate = float(os.environ.get('LOADTEST_SPAWN_RATE', 2))  # Users started per second
+
+
+class StepLoadShape(LoadTestShape):
+    def tick(self):
+        run_time = self.get_run_time()
+        if run_time >= step_time * steps:
+            return None
+        return (int(run_time // step_time) + 1) * step_users, spawn_rate
@@ -1,14 +1,26 @@
 # ------------------------------------------------------------------------------
 # Libraries
 import dash
-from dash import  dcc, html, Input, Output, State, callback
+from dash import  dcc, html, Input, Output, State, callback, clientside_callback, ClientsideFunction
 from dash import dash_table 
 from dash_table.Format import Format, Scheme
 import dash_bootstrap_components as dbc
 from datetime import datetime
+import os
+import threading
+import time
 import plotly.graph_objects as go
-import math
+import numpy as np
 import pandas as pd
+from dash.exceptions import PreventUpdate
+
+from utils.herd_model import HerdParameters, DROUGHT_STRATEGIES, STRATEGIES, YEARS
+from utils.herd_sweep import sensitivity, best_strategy_surface
+from utils.herd_montecarlo import UncertaintySettings, annual_log_changes, simulate, summarize
+from utils.registry import registry
+from utils import workers
+import utils.datasets  # Registers the datasets shared by the pages
+from utils.mmn import get_data_from_mmnapi
 
 dash.register_page(__name__)
 
@@ -20,6 +32,46 @@ now = datetime.now()
 current_month = now.month
 current_year = now.year
 
+# Inputs available in the sensitivity heatmap (e.g. hay_per_ton -> 'Hay per ton')
+sensitivity_options = [{'label': name.replace('_', ' ').capitalize(), 'value': name} for name in HerdParameters.names()]
+# One color per strategy, in the order of STRATEGIES
+strategy_colors = ['#8f8d89', '#efb750', '#cf8b0e', '#6a994e', '#386641']
+
+# --------------------------
+# Market data (calf price history for the simulation)
+
+## Cattle markets
+cattle_markets_list = registry.get('cattle_markets')
+
+# Year-over-year calf price changes of a market (empty when the API is unavailable).
+# Kept CALF_PRICES_TTL seconds per market, for the last CALF_PRICES_CACHE_SIZE markets. Failures
+# are kept CALF_PRICES_FAILURE_TTL seconds, so the runs do not wait for a down API every time.
+CALF_PRICES_TTL = int(os.environ.get('FOODSIGHT_CALF_PRICES_TTL', 6 * 3600))  # Seconds
+CALF_PRICES_FAILURE_TTL = int(os.environ.get('FOODSIGHT_CALF_PRICES_FAILURE_TTL', 60))  # Seconds
+CALF_PRICES_CACHE_SIZE = 64
+calf_price_changes = {}  # slug_id -> (expiry time, changes), oldest first
+calf_price_lock = threading.Lock()
+
+def get_calf_price_changes(slug_id):
+    cached = calf_price_changes.get(slug_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+    endpoint = f"/services/v1.2/reports/{slug_id}?q=commodity=Feeder Cattle;class=Heifers,Steers"
+    data = get_data_from_mmnapi(registry.get('mmn_api_key'), endpoint)
+    if not isinstance(data, dict) or not data.get("results"):
+        changes, ttl = np.array([]), CALF_PRICES_FAILURE_TTL
+    else:
+        df = pd.DataFrame(data["results"])[['report_date', 'avg_price']]
+        df['report_date'] = pd.to_datetime(df['report_date'])
+        df['avg_price'] = pd.to_numeric(df['avg_price'], errors='coerce')
+        changes, ttl = annual_log_changes(df.dropna()), CALF_PRICES_TTL
+    with calf_price_lock:
+        calf_price_changes.pop(slug_id, None)
+        calf_price_changes[slug_id] = (time.monotonic() + ttl, changes)
+        while len(calf_price_changes) > CALF_PRICES_CACHE_SIZE:
+            del calf_price_changes[next(iter(calf_price_changes))]
+    return changes
+
 # ------------------------------------------------------------------------------
 # Layout
 
@@ -170,7 +222,6 @@ layout = html.Div(
                                                     html.Td(''),
                                                     html.Td(html.Div(id='additional-cost-option1'))
                                                 ]),
-                                                dcc.Store(id='additional-cost-option1-stored'),
                                             ])
                                         ]),
                                         html.Div(className='graph-container', children=[
@@ -299,8 +350,6 @@ layout = html.Div(
                                             ],
 
                                         ),
-                                        dcc.Store(id='total-per-herd-option2'),
-
                                     ]
                                 ),
                                 html.Div(id='summary-option2', children=[
@@ -416,48 +465,6 @@ layout = html.Div(
                                            className= "option-decision-description",),
                                 ])
                             ]),
-
-                            # Hidden option 2
-                            dcc.Store(id='actual-calves-sold'),
-                            dcc.Store(id='actual-selling-weight'),
-                            dcc.Store(id='expected-calf-sales'),
-                            dcc.Store(id='actual-calf-sales'),
-                            dcc.Store(id='difference-sales'),
-                            dcc.Store(id='pairs-per-truck'),
-                            dcc.Store(id='cows-per-truck'),
-                            dcc.Store(id='trucks-needed-pairs'),
-                            dcc.Store(id='trucks-needed-cows'),
-                            dcc.Store(id='calves-to-sell'),
-                       
-                            # Hidden option 3
-                            dcc.Store(id='store-expected-calf-sales-current-year'),
-                            dcc.Store(id='store-actual-calf-sales'),
-                            dcc.Store(id='store-difference'),
-                            dcc.Store(id='store-expected-calf-sales-year2'),
-                            dcc.Store(id='store-expected-calf-sales-year3'),
-                            dcc.Store(id='store-cow-sales'),
-                            dcc.Store(id='store-interest-income-year1'),
-                            dcc.Store(id='store-interest-income-year2'),
-                            dcc.Store(id='store-interest-income-year3'),
-
-                            # Hidden drought times
-                            dcc.Store(id='hidden-time-table-store'),
-                            dcc.Store(id='drought-months-store'),
-                            dcc.Store(id='drought-days-store'),
-                            dcc.Store(id='drought-months-store2'),
-                            dcc.Store(id='drought-days-store2'),
-                            dcc.Store(id='drought-months-store3'),
-                            dcc.Store(id='drought-days-store3'),
-                            dcc.Store(id='drought-months-store4'),
-                            dcc.Store(id='drought-days-store4'),
-
-                            dcc.Store(id='output-comparison-tablesummary-data-store'),
-
-                            html.Div(children=[
-                                dcc.Graph(id='truck-table-container'),
-                                dcc.Graph(id='hidden3-table-container'),
-                                dcc.Graph(id='drought-table-container'),
-                            ], style={'display': 'none'}),
                         ])
                     ],className="row-decision"
                 ),
@@ -1331,6 +1338,69 @@ layout = html.Div(
                                                 )
                                             ], style={'display': 'flex','flex-direction': 'column', 'justifyContent': 'center', 'width': '100%'}
                                         ),
+                                            html.Div(children=[
+                                                dbc.Button(
+                                                    "Explore what changes the best strategy +",
+                                                    id='sensitivity-section-button',
+                                                    color="primary",
+                                                    size="lg",
+                                                    className="mb-3"
+                                                ),
+                                                dbc.Collapse(
+                                                id='collapse-sensitivity-section',
+                                                is_open=False,
+                                                    children=[
+                                                        html.H4("Sensitivity to each input", className='decision-collapse-button'),
+                                                        html.Hr(),
+                                                        html.P('Each bar shows the 5-year net worth change of the best strategy when an input is moved 20% below and above its current value (one month or year for dates). Red bars mark the inputs that change which strategy is best. Press Update after changing the inputs above.',
+                                                            className= "option-decision-description"),
+                                                        dcc.Graph(id='sensitivity-tornado-graph', config={'displayModeBar': False}),
+                                                        html.H4("Best strategy by pair of inputs", className='decision-collapse-button'),
+                                                        html.Hr(),
+                                                        html.Div(children=[
+                                                            dcc.Dropdown(id='sensitivity-x-dropdown', options=sensitivity_options,
+                                                                         value='hay_per_ton', clearable=False, style={'width': '100%'}),
+                                                            dcc.Dropdown(id='sensitivity-y-dropdown', options=sensitivity_options,
+                                                                         value='price_weaning_year1', clearable=False, style={'width': '100%'}),
+                                                            dbc.Button("Update", id='sensitivity-update-button', color="primary"),
+                                                        ], style={'display': 'flex', 'gap': '10px'}),
+                                                        dcc.Graph(id='sensitivity-heatmap-graph', config={'displayModeBar': False}),
+                                                    ]
+                                                )
+                                            ], style={'display': 'flex','flex-direction': 'column', 'justifyContent': 'center', 'width': '100%'}
+                                        ),
+                                            html.Div(children=[
+                                                dbc.Button(
+                                                    "Simulate uncertain prices and drought length +",
+                                                    id='simulation-section-button',
+                                                    color="primary",
+                                                    size="lg",
+                                                    className="mb-3"
+                                                ),
+                                                dbc.Collapse(
+                                                id='collapse-simulation-section',
+                                                is_open=False,
+                                                    children=[
+                                                        html.P('Runs thousands of scenarios around the values entered above: calf prices vary as in the historical sales of the selected market, and the drought length and the hay price are drawn at random. The chart shows the range of 5-year net worth changes of each strategy and how often it is the best one.',
+                                                            className= "option-decision-description"),
+                                                        html.Div(children=[
+                                                            dcc.Dropdown(id='simulation-market-dropdown',
+                                                                         options=[{'label': f"{item['market_location_name']} ({item['market_location_state']})", 'value': item['slug_id']}
+                                                                                  for item in cattle_markets_list],
+                                                                         value=cattle_markets_list[0]['slug_id'], clearable=False, style={'width': '100%'}),
+                                                            dcc.Dropdown(id='simulation-size-dropdown',
+                                                                         options=[{'label': f"{n:,} scenarios", 'value': n} for n in [10000, 50000, 200000]],
+                                                                         value=10000, clearable=False, style={'width': '50%'}),
+                                                            dbc.Button("Run", id='simulation-run-button', color="primary"),
+                                                        ], style={'display': 'flex', 'gap': '10px'}),
+                                                        dcc.Loading(children=[
+                                                            html.Div(id='simulation-summary'),
+                                                            dcc.Graph(id='simulation-graph', config={'displayModeBar': False}),
+                                                        ]),
+                                                    ]
+                                                )
+                                            ], style={'display': 'flex','flex-direction': 'column', 'justifyContent': 'center', 'width': '100%'}
+                                        ),
                                     ]
                                 )
                             ]
@@ -1346,7 +1416,8 @@ layout = html.Div(
 # ------------------------------------------------------------------------------
 # Callbacks
 
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='decision_option_toggles'),
     [
         Output('collapse-content1', 'is_open'),
         Output('summary-option1', 'style'),
@@ -1362,29 +1433,18 @@ layout = html.Div(
     ],
     prevent_initial_call=True
 )
-def combined_toggle(n1, n2, n3):
-    def toggle_logic(n):
-        is_open = n is not None and n % 2 == 1
-        return (True, {"display": "none"}) if is_open else (False, {"display": "block"})
-    
-    return toggle_logic(n1) + toggle_logic(n2) + toggle_logic(n3)
 
 
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='decision_input_toggle'),
     [Output("collapse-input", "is_open"), Output("unfold-button", "children")],
     [Input("unfold-button", "n_clicks")],
     [dash.dependencies.State("collapse-input", "is_open")]
 )
-def toggle_collapse(n, is_open):
-    if n:
-        if is_open:
-            return not is_open, "Input information +"
-        else:
-            return not is_open, "Input information -"
-    return is_open, "Input information +"
 
 
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='decision_compare_toggles'),
     [
         Output("compare-collapse1", "is_open"),
         Output("compare-collapse2", "is_open"),
@@ -1406,32 +1466,19 @@ def toggle_collapse(n, is_open):
     ],
     prevent_initial_call=True
 )
-def toggle_collapses(n1, n2, n3, n4, n5):
-    # Determine visibility based on clicks
-    is_open = [(n % 2 == 1) if n else False for n in [n1, n2, n3, n4, n5]]
 
-    # Determine button text based on visibility
-    labels = ["- Details" if open else "+ Details" for open in is_open]
 
-    return is_open + labels
 
-
-
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='decision_comparison_toggle'),
     [Output('collapse-comparison-section', 'is_open'),
      Output('dropdown-icon', 'className')],
     [Input('comparison-section-button', 'n_clicks')],
     [State('collapse-comparison-section', 'is_open')]
 )
-def toggle_collapse(n, is_open):
-    if n:
-        if is_open:
-            return not is_open, 'fas fa-chevron-down ml-2'  # Close and show the down icon
-        else:
-            return not is_open, 'fas fa-chevron-up ml-2'  # Open and show the up icon
-    return is_open, 'fas fa-chevron-down ml-2'  # Default state
 
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='decision_details_toggle'),
     [
         Output("collapse-comparison-details-section", "is_open"),
         Output("comparison-details-section-button", "children")
@@ -1439,566 +1486,55 @@ def toggle_collapse(n, is_open):
     [Input("comparison-details-section-button", "n_clicks")],
     prevent_initial_call=True
 )
-def toggle_collapse(n):
-    if n:
-        is_open = n % 2 == 1  # Opens on odd number of clicks, closes on even number
-        label = "Explore net worth changes by year -" if is_open else "Explore net worth changes by year +"
-        return is_open, label
-    return False, "Explore net worth changes by year +"
-
-
-
-@callback(
-    Output('compare-label', 'children'),
-    Output('compare-label2', 'children'),
-    Output('compare-label3', 'children'),
-    Output('compare-label4', 'children'),
-    Output('compare-label5', 'children'),
-
-    [Input('current-year', 'value')]
-)
-def update_cows_label(current_year):
-    return current_year, current_year+1, current_year+2, current_year+3, current_year+4
-
-
-@callback(
-    [Output('additional-cost-option1', 'children'),
-     Output('additional-cost-option1-stored', 'data'),
-     Output('option1-table-container', 'data')],
-    [Input('hay-lbs-day', 'value'),
-     Input('hay-per-ton', 'value'),
-     Input('other-lbs-day', 'value'),
-     Input('other-per-ton', 'value'),
-     Input('hidden-time-table-store', 'data'),
-     Input('herd-size', 'value')]
-)
-def update_additional_cost(hay_lbs_day, hay_per_ton, other_lbs_day, other_per_ton,
-                           stored_data, herd_size):
-    hay_cost_per_day = hay_lbs_day * (hay_per_ton / 2000)
-    other_cost_per_day = other_lbs_day * (other_per_ton / 2000)
-    
-    additional_cost = hay_cost_per_day + other_cost_per_day
-
-    # Convert stored data back to figure
-    days_data = stored_data['data'][0]['cells']['values'][2]
-
-    # M28, M29, M30 calculations
-    M28 = days_data[0]
-    M30 = days_data[-1]
-    M29 = (M30 + M28) / 2
-
-    M_values = [M28, M29, M30]
-
-    # Q and R calculations
-    Q_values = [additional_cost * val for val in M_values]
-    R_values = [q_val * herd_size for q_val in Q_values]
-
-    # Create DataFrame
-    df = pd.DataFrame({
-        "Add'l Feed": M_values,
-        "Per Cow": Q_values,
-        "Per Herd": R_values
-    })
-
-    return f"{additional_cost:.2f}", additional_cost, df.to_dict('records')
-
-
-
-@callback(
-    Output('option2-table-container', 'data'),
-    Output('total-per-herd-option2', 'data'),
-    [
-        Input('distance-to-pasture', 'value'),
-        Input('trucking-cost', 'value'),
-        Input('trucks-needed-pairs', 'data'),
-        Input('trucks-needed-cows', 'data'),
-        Input('pasture-rent', 'value'),
-        Input('days-rented-pasture', 'value'),
-        Input('herd-size', 'value'),
-        Input('total-other-costs', 'value'),
-        Input('difference-sales', 'data'),
-        Input('interest-borrowed-money', 'value')
-    ]
-)
-def update_table(distance_to_pasture, trucking_cost, trucks_needed_pairs, trucks_needed_cows, pasture_rent, days_rented_pasture, herd_size, total_other_costs, difference_sales, interest_rate):
-    # Calculations
-    trucking_pairs_to_pasture_per_herd = distance_to_pasture * trucking_cost * trucks_needed_pairs
-    trucking_pairs_to_pasture_per_cow = trucking_pairs_to_pasture_per_herd / herd_size
 
-    trucking_cows_to_home_per_herd = distance_to_pasture * trucking_cost * trucks_needed_cows
-    trucking_cows_to_home_per_cow = trucking_cows_to_home_per_herd / herd_size
-
-    pasture_rent_per_herd = (pasture_rent / 30) * days_rented_pasture * herd_size
-    pasture_rent_per_cow = pasture_rent_per_herd / herd_size
-
-    other_costs_per_herd = total_other_costs
-    other_costs_per_cow = other_costs_per_herd / herd_size
-
-    lost_revenues_per_herd = difference_sales
-    lost_revenues_per_cow = lost_revenues_per_herd / herd_size
-
-    interest_per_herd = (trucking_pairs_to_pasture_per_herd + trucking_cows_to_home_per_herd + pasture_rent_per_herd + other_costs_per_herd) * (((interest_rate/100) / 360) * days_rented_pasture)
-    interest_per_cow = interest_per_herd / herd_size
-
-    total_per_herd = trucking_pairs_to_pasture_per_herd + trucking_cows_to_home_per_herd + pasture_rent_per_herd + other_costs_per_herd + lost_revenues_per_herd + interest_per_herd
-    total_per_cow = total_per_herd / herd_size
-
-    per_cow = [trucking_pairs_to_pasture_per_cow, trucking_cows_to_home_per_cow, pasture_rent_per_cow, other_costs_per_cow, lost_revenues_per_cow, interest_per_cow, total_per_cow]
-    per_herd = [trucking_pairs_to_pasture_per_herd, trucking_cows_to_home_per_herd, pasture_rent_per_herd, other_costs_per_herd, lost_revenues_per_herd, interest_per_herd, total_per_herd]
-    
-    df = pd.DataFrame({
-        '': ['Trucking Pairs to Pasture', 'Trucking Cows to Home', 'Pasture Rent', 'Other Costs', 'Lost Revenues', 'Interest', 'Total'],
-        'Per Cow': per_cow,
-        'Per Herd': per_herd
-    })
-
-
-    return df.to_dict('records'), total_per_herd
-
-
-@callback(
-    Output('option3-table-container', 'data'),
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='decision_sensitivity_toggle'),
     [
-        Input('store-difference', 'data'),
-        Input('reduced-operating-costs-year1', 'value'),
-        Input('selling-costs', 'value'),
-        Input('store-cow-sales', 'data'),
-        Input('hidden-time-table-store', 'data'),
-        Input('interest-invested-money', 'value'),
-        Input('herd-size', 'value'),
-        Input('cows-culled', 'value'),
-        Input('current-value-cow', 'value'),
-        Input('store-interest-income-year1', 'data'),
-        Input('store-interest-income-year2', 'data'),
-        Input('store-interest-income-year3', 'data'),
-        Input('store-expected-calf-sales-year2', 'data'),
-        Input('store-expected-calf-sales-year3', 'data'),
-        Input('operating-costs-year2', 'value'),
-        Input('operating-costs-years3-5', 'value'),
-        Input('annual-cow-costs', 'value'),
-        Input('cost-replacement-animals', 'value')
-    ]
-)
-def update_table(store_difference, reduced_operating_costs_year1, selling_costs, store_cow_sales, stored_data, 
-                 interest_invested_money, herd_size, cows_culled, current_value_cow, 
-                 store_interest_income_year1, store_interest_income_year2, store_interest_income_year3, 
-                 store_expected_calf_sales_year2, store_expected_calf_sales_year3, 
-                 operating_costs_year2, operating_costs_year3_5, annual_cow_costs, cost_replacement_animals):
-
-    days_data = stored_data['data'][0]['cells']['values'][2]
-    days_interest = days_data[0]
-
-    # Formulas for Additional Costs Per Herd
-    reduced_calf_sales_herd = store_difference
-    reduced_op_costs_this_year_herd = reduced_operating_costs_year1 * herd_size
-    additional_costs_selling_cows_herd = selling_costs * herd_size
-    interest_cow_sales_herd = -1 * (store_cow_sales * days_interest * ((interest_invested_money/100) / 360))
-    total_year1_herd = sum([reduced_calf_sales_herd, reduced_op_costs_this_year_herd, additional_costs_selling_cows_herd, interest_cow_sales_herd])
-    revenues_from_cow_sales_herd = -1 * ((herd_size - cows_culled) * current_value_cow)
-    interest_income_years_2_3_herd = -1 * (store_interest_income_year1 + store_interest_income_year2 + store_interest_income_year3)
-    expected_calf_sales_years_2_3_herd = store_expected_calf_sales_year2 + store_expected_calf_sales_year3
-    reduced_op_expenses_years_2_3_herd = -1 * ((2 * (herd_size * annual_cow_costs)) - (operating_costs_year2 + operating_costs_year3_5))
-    replacement_cows_herd = cost_replacement_animals * herd_size
-    total_years_2_3_herd = sum([revenues_from_cow_sales_herd, interest_income_years_2_3_herd, expected_calf_sales_years_2_3_herd, reduced_op_expenses_years_2_3_herd, replacement_cows_herd])
-
-    # Formulas for Additional Costs Per Cow
-    reduced_calf_sales_cow = reduced_calf_sales_herd / herd_size
-    reduced_op_costs_this_year_cow = reduced_op_costs_this_year_herd / herd_size
-    additional_costs_selling_cows_cow = additional_costs_selling_cows_herd / herd_size
-    interest_cow_sales_cow = interest_cow_sales_herd / herd_size
-    total_year1_cow = total_year1_herd / herd_size
-    revenues_from_cow_sales_cow = revenues_from_cow_sales_herd / herd_size
-    interest_income_years_2_3_cow = interest_income_years_2_3_herd / herd_size
-    expected_calf_sales_years_2_3_cow = expected_calf_sales_years_2_3_herd / herd_size
-    reduced_op_expenses_years_2_3_cow = reduced_op_expenses_years_2_3_herd / herd_size
-    replacement_cows_cow = replacement_cows_herd / herd_size
-    total_years_2_3_cow = total_years_2_3_herd / herd_size
-
-    # Construct the table data
-    data = [
-        ["Reduced Calf Sales This Year", reduced_calf_sales_cow, reduced_calf_sales_herd],
-        ["Reduced Operating Costs, This Year", reduced_op_costs_this_year_cow, reduced_op_costs_this_year_herd],
-        ["Additional Costs for Selling Cows", additional_costs_selling_cows_cow, additional_costs_selling_cows_herd],
-        ["Interest on Cow Sales Revenues", interest_cow_sales_cow, interest_cow_sales_herd],
-        ["Total, Year 1", total_year1_cow, total_year1_herd],
-        ["Revenues from Cow Sales", revenues_from_cow_sales_cow, revenues_from_cow_sales_herd],
-        ["Interest Income, Years 2+3", interest_income_years_2_3_cow, interest_income_years_2_3_herd],
-        ["Expected Calf Sales, Years 2+3", expected_calf_sales_years_2_3_cow, expected_calf_sales_years_2_3_herd],
-        ["Reduced Operating Expenses, Yrs 2+3", reduced_op_expenses_years_2_3_cow, reduced_op_expenses_years_2_3_herd],
-        ["Replacement Cows", replacement_cows_cow, replacement_cows_herd],
-        ["Total, Years 2 & 3", total_years_2_3_cow, total_years_2_3_herd],
-        ["Total for 3 Years", total_year1_cow + total_years_2_3_cow, total_year1_herd + total_years_2_3_herd]
-    ]
-
-    df = pd.DataFrame(data, columns=["", "Additional Costs Per Cow", "Additional Costs Per Herd"])
-    
-    return df.to_dict('records')
-
-
-
-
-
-# Hidden tables
-
-@callback(
-    [Output('drought-table-container', 'figure'),
-     Output('hidden-time-table-store', 'data'),
-     Output('drought-days', 'children'),
-     Output('drought-months', 'children'),
-     Output('drought-days-store', 'data'),
-     Output('drought-months-store', 'data'),
-     Output('drought-days-store2', 'data'),
-     Output('drought-months-store2', 'data'),
-     Output('drought-days-store3', 'data'),
-     Output('drought-months-store3', 'data'),
-     Output('drought-days-store4', 'data'),
-     Output('drought-months-store4', 'data')],
-    [Input('current-month', 'value'),
-     Input('current-year', 'value'),
-     Input('drought-end-month', 'value'),
-     Input('drought-end-year', 'value')]
-)
-def update_table(current_month, current_year, drought_end_month, drought_end_year):
-
-    V = []
-    W = []
-    X = []
-
-    # Row 1 calculations
-    V.append(current_year)
-    W.append(12 - current_month)
-    X.append(W[0] * 30)
-
-    # Rows 2 to 5 calculations
-    for i in range(4):
-        next_year = V[-1] + 1
-        if drought_end_year > next_year:
-            V.append(next_year)
-        else:
-            V.append(drought_end_year if V[-1] != drought_end_year else 0)
-        
-        if V[-1] < drought_end_year:
-            W.append(0 if V[-1] < 2000 else 12)
-        else:
-            W.append(drought_end_month)
-        
-        X.append(W[-1] * 30)
-
-    # Last row calculations
-    V.append("")
-    W.append(sum(W))
-    X.append(sum(X))
-
-    table = go.Figure(go.Table(
-        header=dict(values=['Year', 'Months', 'Days']),
-        cells=dict(values=[V, W, X])
-    ))
-
-    return table, table.to_dict(), X[-1],  W[-1], X[1],  W[1], X[2],  W[2], X[3],  W[3], X[4],  W[4]
-
-
-
-
-
-
-
-## Calves sold and Trucks
-@callback(
-    [
-        Output('actual-calves-sold', 'data'),
-        Output('actual-selling-weight', 'data'),
-        Output('expected-calf-sales', 'data'),
-        Output('actual-calf-sales', 'data'),
-        Output('difference-sales', 'data'),
-        Output('pairs-per-truck', 'data'),
-        Output('cows-per-truck', 'data'),
-        Output('trucks-needed-pairs', 'data'),
-        Output('trucks-needed-cows', 'data'),
-        Output('calves-to-sell', 'data'),
-        Output('truck-table-container', 'figure')
+        Output("collapse-sensitivity-section", "is_open"),
+        Output("sensitivity-section-button", "children")
     ],
-    [
-        Input('calf-death-loss', 'value'),
-        Input('weight-at-weaning', 'value'),
-        Input('weaning-weight-adjustment', 'value'),
-        Input('price-weaning-year1', 'value'),
-        Input('avg-cow-weight', 'value'),
-        Input('current-weight-calves', 'value'),
-        Input('herd-size', 'value'),
-        Input('percent-calves-sold', 'value')
-    ]
+    [Input("sensitivity-section-button", "n_clicks")],
 )
-def update_values(calf_death_loss, weight_at_weaning, weaning_weight_adjustment, price_weaning_year1, avg_cow_weight, current_weight_calves, herd_size, percent_calves_sold):
-    
-    calves_to_sell = herd_size * (percent_calves_sold/100)
-    actual_calves_sold = calves_to_sell - calf_death_loss
-    actual_selling_weight = weight_at_weaning * (1 + (weaning_weight_adjustment/100))
-    expected_calf_sales = calves_to_sell * weight_at_weaning * price_weaning_year1
-    actual_calf_sales = actual_calves_sold * actual_selling_weight * price_weaning_year1
-    difference_sales = expected_calf_sales - actual_calf_sales
-    pairs_per_truck = math.ceil(40000 / (avg_cow_weight + current_weight_calves))
-    cows_per_truck = math.ceil(40000 / avg_cow_weight)
-    trucks_needed_pairs = math.ceil(herd_size / pairs_per_truck)
-    trucks_needed_cows = math.ceil(herd_size / cows_per_truck)
-
-
-    # Create table
-    table = go.Figure(data=[go.Table(
-        header=dict(values=['Parameter', 'Value']),
-        cells=dict(values=[
-            ['Calves to Sell', 'Actual Calves Sold', 'Actual Selling Weight', 'Expected Calf Sales', 'Actual Calf Sales', 'Difference in Sales', 'Pairs per Truck', 'Cows per Truck', 'Trucks Needed for Pairs', 'Trucks Needed for Cows'],
-            [calves_to_sell, actual_calves_sold, actual_selling_weight, expected_calf_sales, actual_calf_sales, difference_sales, pairs_per_truck, cows_per_truck, trucks_needed_pairs, trucks_needed_cows]
-        ])
-    )])
-
-    return actual_calves_sold, actual_selling_weight, expected_calf_sales, actual_calf_sales, difference_sales, pairs_per_truck, cows_per_truck, trucks_needed_pairs, trucks_needed_cows, calves_to_sell, table
-
-## Hidden 3
-@callback(
-        Output('store-expected-calf-sales-current-year', 'data'),
-        Output('store-actual-calf-sales', 'data'),
-        Output('store-difference', 'data'),
-        Output('store-expected-calf-sales-year2', 'data'),
-        Output('store-expected-calf-sales-year3', 'data'),
-        Output('store-cow-sales', 'data'),
-        Output('store-interest-income-year1', 'data'),
-        Output('store-interest-income-year2', 'data'),
-        Output('store-interest-income-year3', 'data'),
-        Output('hidden3-table-container', 'figure'),
-    [
-        Input('herd-size', 'value'),
-        Input('percent-calves-sold', 'value'),
-        Input('weight-at-weaning', 'value'),
-        Input('price-weaning-year1', 'value'),
-        Input('avg-weaning-percentage', 'value'),
-        Input('current-weight-calves', 'value'),
-        Input('current-price-per-lb', 'value'),
-        Input('price-weaning-year2', 'value'),
-        Input('price-weaning-years3-5', 'value'),
-        Input('current-value-cow', 'value'),
-        Input('hidden-time-table-store', 'data'),
-        Input('interest-invested-money', 'value')
-    ]
-)
-def update_table(herd_size, percent_calves_sold, weight_at_weaning, price_weaning_year1, avg_weaning_percentage,
-                 current_weight_calves, current_price_per_lb, price_weaning_year2, price_weaning_years3_5,
-                 current_value_cow, stored_data, interest_invested_money):
-
-    days_data = stored_data['data'][0]['cells']['values'][2]
-    X17 = days_data[0]
-
-    expected_calf_sales_current_year = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year1
-    actual_calf_sales = (herd_size * (avg_weaning_percentage/100)) * current_weight_calves * current_price_per_lb
-    difference = expected_calf_sales_current_year - actual_calf_sales
-
-    expected_calf_sales_year2 = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year2
-    expected_calf_sales_year3 = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_years3_5
-    cow_sales = herd_size * current_value_cow
-
-    initial_money_invested = cow_sales
-    interest_income_year1 = initial_money_invested * X17 * ((interest_invested_money/100) / 360)
-    interest_income_year2 = (initial_money_invested + interest_income_year1) * (interest_invested_money/100)
-    interest_income_year3 = (initial_money_invested + interest_income_year1 + interest_income_year2) * (interest_invested_money/100)
-
-    # Create the table
-    table = go.Figure(data=[go.Table(
-        header=dict(values=['Parameter', 'Value']),
-        cells=dict(values=[
-            ['Expected Calf Sales, Current Year', 'Actual Calf Sales', 'Difference', 'Expected Calf Sales, Year 2',
-             'Expected Calf Sales, Year 3', 'Cow Sales', 'Initial Money Invested', 'Interest Income, Year 1',
-             'Interest Income, Year 2', 'Interest Income, Year 3'],
-            [expected_calf_sales_current_year, actual_calf_sales, difference, expected_calf_sales_year2,
-             expected_calf_sales_year3, cow_sales, initial_money_invested, interest_income_year1,
-             interest_income_year2, interest_income_year3]
-        ])
-    )])
-
-    return expected_calf_sales_current_year, actual_calf_sales, difference, expected_calf_sales_year2, expected_calf_sales_year3, cow_sales, interest_income_year1, interest_income_year2, interest_income_year3, table 
-
 
-@callback(
-    Output('output-comparison-table', 'figure'),
-    Output('output-comparison-table2', 'figure'),
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='decision_simulation_toggle'),
     [
-        Input('reduced-operating-costs-year1', 'value'),
-        Input('drought-end-year', 'value'),
-        Input('current-year', 'value'),
-        Input('hidden-time-table-store', 'data'),
-        Input('herd-size', 'value'),
-        Input('current-value-cow', 'value'),
-        Input('annual-cow-costs', 'value'),
-        Input('percent-calves-sold', 'value'),
-        Input('weight-at-weaning', 'value'),
-        Input('price-weaning-year1', 'value'),
-        Input('price-weaning-year2', 'value'),
-        Input('current-weight-calves', 'value'),
-        Input('current-price-per-lb', 'value'),
-        Input('additional-cost-option1-stored', 'data'),
-        Input('calf-death-loss', 'value'),
-        Input('weaning-weight-adjustment', 'value'),
-        Input('total-per-herd-option2', 'data'),
-        Input('store-actual-calf-sales', 'data'),
-        Input('tax-basis-cow', 'value'),
-        Input('capital-gains-tax-rate', 'value'),
-        Input('cost-replacement-animals', 'value'),
-        Input('drought-months-store', 'data'), 
-        Input('drought-days-store', 'data'), 
-        Input('pasture-rent', 'value'),
-        Input('operating-costs-year2', 'value'),
-        Input('interest-borrowed-money', 'value'),
-        Input('interest-invested-money', 'value')
-
-    ]
+        Output("collapse-simulation-section", "is_open"),
+        Output("simulation-section-button", "children")
+    ],
+    [Input("simulation-section-button", "n_clicks")],
 )
-def update_table(reduced_operating_costs_year1, drought_end_year, current_year, stored_data, herd_size, current_value_cow, 
-                 annual_cow_costs, percent_calves_sold, weight_at_weaning, price_weaning_year1, price_weaning_year2,
-                 current_weight_calves, current_price_per_lb, additional_cost_option1,calf_death_loss,weaning_weight_adjustment,
-                 total_per_herd_option2, option3_actual_calf_sales,tax_basis_cow,capital_gains_tax_rate,cost_replacement_animals,
-                 drought_months_store,drought_days_store, pasture_rent, operating_costs_year2,interest_borrowed_money,
-                 interest_invested_money):
-
-    days_data = stored_data['data'][0]['cells']['values'][2]
-    X17 = days_data[0]
-
-    # Calculations
-    ## First table
-    cows_calc = herd_size * current_value_cow
-    calves_calc = (percent_calves_sold/100) * current_weight_calves * current_price_per_lb
-    cash_calc = -(herd_size * annual_cow_costs - herd_size * reduced_operating_costs_year1)
-    total_64_66 = cows_calc + calves_calc + cash_calc
-
-    cows_calc_row = [cows_calc, cows_calc, cows_calc, cows_calc, cows_calc]
-    calves_calc_row = [calves_calc, calves_calc, calves_calc, calves_calc, calves_calc]
-    cash_calc_row = [cash_calc, cash_calc, cash_calc, cash_calc, cash_calc]
-    total_64_66_row = [c + v + k for c, v, k in zip(cows_calc_row, calves_calc_row, cash_calc_row)]
-
-    revenues_from_calves_colE = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year1
-    revenues_from_calves_colO = ((herd_size * (percent_calves_sold/100)) - calf_death_loss) * (weight_at_weaning * (1 + (weaning_weight_adjustment/100))) * price_weaning_year1 if current_year < drought_end_year else (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year1
-    revenues_from_calves_row = [revenues_from_calves_colE, revenues_from_calves_colE, revenues_from_calves_colO, option3_actual_calf_sales, option3_actual_calf_sales]
-
-    operating_costs = -herd_size * annual_cow_costs
-    operating_costs_adj = -((herd_size * annual_cow_costs) + (X17 * additional_cost_option1 * herd_size))
-    operating_costs_row = [operating_costs, operating_costs_adj, -((herd_size * annual_cow_costs) + total_per_herd_option2), -herd_size * (annual_cow_costs - reduced_operating_costs_year1), -herd_size * (annual_cow_costs - reduced_operating_costs_year1)]
-    
-    profits_row = [c + v for c, v in zip(revenues_from_calves_row, operating_costs_row)]
-    taxes_row = [(c*(0.124+0.15+0.04) if c > 0 else 0) for c in profits_row]
-    taxes_after_income_row = [c - v for c, v in zip(profits_row, taxes_row)]
-    capital_sales_row = [0,0,0,cows_calc,cows_calc]
-    capital_gains_row = [0,0,0,0,(herd_size * (current_value_cow - tax_basis_cow)) * (capital_gains_tax_rate/100)]
-
-    ending_net_worth_cows_row = [c - v for c, v in zip(cows_calc_row, capital_sales_row)]
-    ending_net_worth_cash_row = [c + v - k for c, v, k in zip(taxes_after_income_row, capital_sales_row,capital_gains_row)]
-    total_78_79_row = [c + v for c, v in zip(ending_net_worth_cows_row, ending_net_worth_cash_row)]
-
-    ## Second table
-
-    # Table Data
-    rows1 = [
-        "Cows", "Calves", "Cash", "Total", 
-        current_year, "Revenues from Calves", 
-        "Operating Costs (typical + adjustments)", "Profits", 
-        "Taxes (SE, US Income, CO Income)", "After Tax Income", 
-        "Capital Sales - Cow Sales", "Capital Gains", 
-        "Ending Net Worth - Cows", "Ending Net Worth - Cash", "Total"
-    ]
-    data_values1 = [
-        cows_calc_row,
-        calves_calc_row,
-        cash_calc_row,
-        total_64_66_row,
-        ["", "", "", "", ""],
-        revenues_from_calves_row,
-        operating_costs_row,
-        profits_row,
-        taxes_row,
-        taxes_after_income_row,
-        capital_sales_row,
-        capital_gains_row,
-        ending_net_worth_cows_row,
-        ending_net_worth_cash_row,
-        total_78_79_row
-    ]
-
-    # Combine row headers and data values
-    table_data1 = [[row] + data_val for row, data_val in zip(rows1, data_values1)]
-
-    # Create table figure
-    fig1 = go.Figure(data=[go.Table(
-        header=dict(values=["E", "M", "N", "O", "P", "Q"]),
-        cells=dict(values=list(map(list, zip(*table_data1)))) # transpose the table data
-    )])
 
-    # Second table
 
-    revenues_from_calves_colE_repl = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year2
-    revenues_from_calves_colO_repl = ((herd_size * (percent_calves_sold/100)) - calf_death_loss) * (weight_at_weaning * (1 + (weaning_weight_adjustment/100))) * price_weaning_year2 if current_year+1 < drought_end_year else (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year2
-    revenues_from_calves_colQ_repl = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year2 if current_year > drought_end_year else 0
 
-    revenues_from_calves_row_repl = [revenues_from_calves_colE_repl, revenues_from_calves_colE_repl, revenues_from_calves_colO_repl, revenues_from_calves_colQ_repl, 0]
+## Decision model
+# Every table, label and text of the page is computed from one HerdParameters set in the
+# browser (static/decision_model.js, a port of utils/herd_model.py checked with
+# tools/check_decision_model_js.py), so input edits do not reach the server
+clientside_callback(
+    ClientsideFunction(namespace='decision', function_name='update_decision'),
 
+    # Drought period
+    Output('drought-days', 'children'),
+    Output('drought-months', 'children'),
 
-    operating_costs_repl = -herd_size * annual_cow_costs
-    operating_costs_adj_N_repl = -((herd_size * annual_cow_costs) + (drought_days_store * additional_cost_option1 * herd_size)) if drought_days_store > 0 else -(herd_size * annual_cow_costs)
-    operating_costs_adj_O_repl = -((herd_size * annual_cow_costs) + (drought_months_store * pasture_rent * herd_size)) if drought_days_store > 0 else -(herd_size * annual_cow_costs)
-    operating_costs_adj_Q_repl = -operating_costs_year2 if revenues_from_calves_row_repl[-2]==0 else -(herd_size * annual_cow_costs)
-
-    operating_costs_row_repl = [operating_costs_repl, operating_costs_adj_N_repl, operating_costs_adj_O_repl, operating_costs_adj_Q_repl ,-operating_costs_year2]
-
-    interest_income_expenses = [(c*(interest_invested_money/100) if c>0 else c*(interest_borrowed_money/100)) for c in ending_net_worth_cash_row]
-    
-    profits_row_repl = [c + v + k for c, v, k in zip(revenues_from_calves_row_repl, operating_costs_row_repl,interest_income_expenses)]
-    
-    
-    taxes_row_repl = [(c*(0.124+0.15+0.04) if c > 0 else 0) for c in profits_row_repl]
-    taxes_after_income_row_repl = [c - v for c, v in zip(profits_row_repl, taxes_row_repl)]
-    purchase_females= herd_size*cost_replacement_animals if current_year+1==drought_end_year else 0 
-    purchase_females_row = [0,0,0,purchase_females ,0]
-
-    ending_net_worth_cows_1to3 = herd_size*cost_replacement_animals if purchase_females > 0 else cows_calc+0
-    ending_net_worth_cows_4to5 = [c + v for c, v in zip(ending_net_worth_cows_row[-2:], purchase_females_row[-2:])]
-
-
-    ending_net_worth_cows_row_final = [ending_net_worth_cows_1to3,ending_net_worth_cows_1to3,ending_net_worth_cows_1to3,
-                                       ending_net_worth_cows_4to5[0],ending_net_worth_cows_4to5[1]]
-    ending_net_worth_cash_row_final = [c + v for c, v in zip(ending_net_worth_cash_row,taxes_after_income_row_repl)]
-    total_78_79_row_final = [c + v for c, v in zip(ending_net_worth_cows_row_final, ending_net_worth_cash_row_final)]
-
-    rows2 = [
-        (current_year+1), "Revenues from Calves", 
-        "Operating expenses","Interest Income/Expenses", "Profits", 
-        "Taxes (SE, US Income, CO Income)", "After Tax Income", 
-        "Purchase Replacement Females", 
-        "Ending Net Worth - Cows", "Ending Net Worth - Cash", "Total"
-    ]
-    data_values2 = [
-        ["", "", "", "", ""],
-        revenues_from_calves_row_repl,
-        operating_costs_row_repl,
-        interest_income_expenses,
-        profits_row_repl,
-        taxes_row_repl,
-        taxes_after_income_row_repl,
-        purchase_females_row,
-        ending_net_worth_cows_row_final,
-        ending_net_worth_cash_row_final,
-        total_78_79_row_final
-    ]
-
-    # Combine row headers and data values
-    table_data2 = [[row] + data_val for row, data_val in zip(rows2, data_values2)]
-
-    # Create table figure
-    fig2 = go.Figure(data=[go.Table(
-        header=dict(values=["E", "M", "N", "O", "P", "Q"]),
-        cells=dict(values=list(map(list, zip(*table_data2)))) # transpose the table data
-    )])
-
+    # Option 1: Buy feed
+    Output('additional-cost-option1', 'children'),
+    Output('option1-table-container', 'data'),
 
+    # Option 2: Rent pasture
+    Output('option2-table-container', 'data'),
 
-    return fig1, fig2
+    # Option 3: Sell and replace
+    Output('option3-table-container', 'data'),
 
+    # Five-year net worth tables
+    Output('compare-label', 'children'),
+    Output('compare-label2', 'children'),
+    Output('compare-label3', 'children'),
+    Output('compare-label4', 'children'),
+    Output('compare-label5', 'children'),
 
-@callback(
     Output('output-comparison-table-currentsummary-data', 'data'),
     Output('output-comparison-table-data', 'data'),
     Output('output-comparison-table-summary-data', 'data'),
@@ -2016,418 +1552,150 @@ def update_table(reduced_operating_costs_year1, drought_end_year, current_year,
     Output('output-comparison-table5-summary-data', 'data'),
 
     Output('output-comparison-tablesummary-data', 'data'),
-    Output('output-comparison-tablesummary-data-store', 'data'),
+    Output('output-comparison-summary', 'children'),
 
-    [
-        Input('reduced-operating-costs-year1', 'value'),
-        Input('drought-end-year', 'value'),
-        Input('current-year', 'value'),
-        Input('hidden-time-table-store', 'data'),
-        Input('herd-size', 'value'),
-        Input('current-value-cow', 'value'),
-        Input('annual-cow-costs', 'value'),
-        Input('percent-calves-sold', 'value'),
-        Input('weight-at-weaning', 'value'),
-        Input('price-weaning-year1', 'value'),
-        Input('price-weaning-year2', 'value'),
-        Input('price-weaning-years3-5', 'value'),
-        Input('current-weight-calves', 'value'),
-        Input('current-price-per-lb', 'value'),
-        Input('additional-cost-option1-stored', 'data'),
-        Input('calf-death-loss', 'value'),
-        Input('weaning-weight-adjustment', 'value'),
-        Input('total-per-herd-option2', 'data'),
-        Input('store-actual-calf-sales', 'data'),
-        Input('tax-basis-cow', 'value'),
-        Input('capital-gains-tax-rate', 'value'),
-        Input('cost-replacement-animals', 'value'),
-        Input('drought-days-store', 'data'),
-        Input('drought-months-store', 'data'), 
-        Input('drought-days-store2', 'data'),
-        Input('drought-months-store2', 'data'),
-        Input('drought-days-store3', 'data'),
-        Input('drought-months-store3', 'data'),
-        Input('drought-days-store4', 'data'),
-        Input('drought-months-store4', 'data'),
-        Input('pasture-rent', 'value'),
-        Input('operating-costs-year2', 'value'),
-        Input('interest-borrowed-money', 'value'),
-        Input('interest-invested-money', 'value')
-    ]
+    [Input(component_id, 'value') for component_id in HerdParameters.component_ids()]
 )
-def update_table(reduced_operating_costs_year1, drought_end_year, current_year, stored_data, herd_size, current_value_cow, 
-                 annual_cow_costs, percent_calves_sold, weight_at_weaning, price_weaning_year1, price_weaning_year2,price_weaning_years3_5,
-                 current_weight_calves, current_price_per_lb, additional_cost_option1,calf_death_loss,weaning_weight_adjustment,
-                 total_per_herd_option2, option3_actual_calf_sales,tax_basis_cow,capital_gains_tax_rate,cost_replacement_animals,
-                 drought_days_store, drought_months_store, drought_days_store2, drought_months_store2, drought_days_store3, drought_months_store3, drought_days_store4, drought_months_store4,
-                 pasture_rent, operating_costs_year2,interest_borrowed_money,
-                 interest_invested_money):
-
-    days_data = stored_data['data'][0]['cells']['values'][2]
-    X17 = days_data[0]
-
-    # Calculations
-    ## First table
-    cows_calc = herd_size * current_value_cow
-    calves_calc = (percent_calves_sold/100) * current_weight_calves * current_price_per_lb
-    cash_calc = -(herd_size * annual_cow_costs - herd_size * reduced_operating_costs_year1)
-    total_64_66 = cows_calc + calves_calc + cash_calc
-
-    cows_calc_row = [cows_calc, cows_calc, cows_calc, cows_calc, cows_calc]
-    calves_calc_row = [calves_calc, calves_calc, calves_calc, calves_calc, calves_calc]
-    cash_calc_row = [cash_calc, cash_calc, cash_calc, cash_calc, cash_calc]
-    total_64_66_row = [c + v + k for c, v, k in zip(cows_calc_row, calves_calc_row, cash_calc_row)]
-
-    revenues_from_calves_colE = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year1
-    revenues_from_calves_colO = ((herd_size * (percent_calves_sold/100)) - calf_death_loss) * (weight_at_weaning * (1 + (weaning_weight_adjustment/100))) * price_weaning_year1 if current_year < drought_end_year else (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year1
-    revenues_from_calves_row = [revenues_from_calves_colE, revenues_from_calves_colE, revenues_from_calves_colO, option3_actual_calf_sales, option3_actual_calf_sales]
-
-    operating_costs = -herd_size * annual_cow_costs
-    operating_costs_adj = -((herd_size * annual_cow_costs) + (X17 * additional_cost_option1 * herd_size))
-    operating_costs_row = [operating_costs, operating_costs_adj, -((herd_size * annual_cow_costs) + total_per_herd_option2), -herd_size * (annual_cow_costs - reduced_operating_costs_year1), -herd_size * (annual_cow_costs - reduced_operating_costs_year1)]
-    
-    profits_row = [c + v for c, v in zip(revenues_from_calves_row, operating_costs_row)]
-    taxes_row = [(c*(0.124+0.15+0.04) if c > 0 else 0) for c in profits_row]
-    taxes_after_income_row = [c - v for c, v in zip(profits_row, taxes_row)]
-    capital_sales_row = [0,0,0,cows_calc,cows_calc]
-    capital_gains_row = [0,0,0,0,(herd_size * (current_value_cow - tax_basis_cow)) * (capital_gains_tax_rate/100)]
-
-    ending_net_worth_cows_row = [c - v for c, v in zip(cows_calc_row, capital_sales_row)]
-    ending_net_worth_cash_row = [c + v - k for c, v, k in zip(taxes_after_income_row, capital_sales_row,capital_gains_row)]
-    total_78_79_row = [c + v for c, v in zip(ending_net_worth_cows_row, ending_net_worth_cash_row)]
-
-    data_values1_current_summary = [
-        ["Cows"] + cows_calc_row,
-        ["Calves"] + calves_calc_row,
-        ["Cash"] + cash_calc_row,
-        ["Total ($)"] + total_64_66_row,
-    ]
-
-    df1_current_summary = pd.DataFrame(data_values1_current_summary, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-
-
-    data_values1 = [
-        ["Revenues from Calves"] + revenues_from_calves_row,
-        ["Operating Costs (typical + adjustments)"] + operating_costs_row,
-        ["Profits"] + profits_row,
-        ["Taxes (SE, US Income, CO Income)"] + taxes_row,
-        ["After Tax Income"] + taxes_after_income_row,
-        ["Capital Sales - Cow Sales"] + capital_sales_row,
-        ["Capital Gains"] + capital_gains_row,
-    ]
-
-    data_values1_summary = [
-        ["Ending Net Worth - Cows"] + ending_net_worth_cows_row,
-        ["Ending Net Worth - Cash"] + ending_net_worth_cash_row,
-        ["Total ($)"] + total_78_79_row
-    ]
-
-    # Combine row headers and data values
-    df1 = pd.DataFrame(data_values1, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-    df1_summary = pd.DataFrame(data_values1_summary, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-
-    ## Second table
-
-    revenues_from_calves_colE_repl = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year2
-    revenues_from_calves_colO_repl = ((herd_size * (percent_calves_sold/100)) - calf_death_loss) * (weight_at_weaning * (1 + (weaning_weight_adjustment/100))) * price_weaning_year2 if current_year+1 < drought_end_year else (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year2
-    revenues_from_calves_colQ_repl = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_year2 if current_year+1 > drought_end_year else 0
-
-    revenues_from_calves_row_repl = [revenues_from_calves_colE_repl, revenues_from_calves_colE_repl, revenues_from_calves_colO_repl, revenues_from_calves_colQ_repl, 0]
-
-    operating_costs_repl = -herd_size * annual_cow_costs
-    operating_costs_adj_N_repl = -((herd_size * annual_cow_costs) + (drought_days_store * additional_cost_option1 * herd_size)) if drought_days_store > 0 else -(herd_size * annual_cow_costs)
-    operating_costs_adj_O_repl = -((herd_size * annual_cow_costs) + (drought_months_store * pasture_rent * herd_size)) if drought_days_store > 0 else -(herd_size * annual_cow_costs)
-    operating_costs_adj_Q_repl = -operating_costs_year2 if revenues_from_calves_row_repl[-2]==0 else -(herd_size * annual_cow_costs)
-
-    operating_costs_row_repl = [operating_costs_repl, operating_costs_adj_N_repl, operating_costs_adj_O_repl, operating_costs_adj_Q_repl ,-operating_costs_year2]
-
-    interest_income_expenses = [(c*(interest_invested_money/100) if c>0 else c*(interest_borrowed_money/100)) for c in ending_net_worth_cash_row]
-    
-    profits_row_repl = [c + v + k for c, v, k in zip(revenues_from_calves_row_repl, operating_costs_row_repl,interest_income_expenses)]
-    
-    taxes_row_repl = [(c*(0.124+0.15+0.04) if c > 0 else 0) for c in profits_row_repl]
-    taxes_after_income_row_repl = [c - v for c, v in zip(profits_row_repl, taxes_row_repl)]
-    purchase_females= herd_size*cost_replacement_animals if current_year+1==drought_end_year else 0 
-    purchase_females_row = [0,0,0,purchase_females ,0]
-
-    ending_net_worth_cows_1to3 = herd_size*cost_replacement_animals if purchase_females > 0 else cows_calc+0
-    ending_net_worth_cows_4to5 = [c + v for c, v in zip(ending_net_worth_cows_row[-2:], purchase_females_row[-2:])]
-    ending_net_worth_cows_row_final = [ending_net_worth_cows_1to3,ending_net_worth_cows_1to3,ending_net_worth_cows_1to3,
-                                       ending_net_worth_cows_4to5[0],ending_net_worth_cows_4to5[1]]
-    ending_net_worth_cash_row_final = [c + v for c, v in zip(ending_net_worth_cash_row,taxes_after_income_row_repl)]
-    total_78_79_row_final = [c + v for c, v in zip(ending_net_worth_cows_row_final, ending_net_worth_cash_row_final)]
-
-    data_values2 = [
-        ["Revenues from Calves"] + revenues_from_calves_row_repl,
-        ["Operating expenses"] + operating_costs_row_repl,
-        ["Interest Income/Expenses"] + interest_income_expenses,
-        ["Profits"] + profits_row_repl,
-        ["Taxes (SE, US Income, CO Income)"] + taxes_row_repl,
-        ["After Tax Income"] + taxes_after_income_row_repl,
-        ["Purchase Replacement Females"] + purchase_females_row,
-    ]
 
-    data_values2_summary = [
-        ["Ending Net Worth - Cows"] + ending_net_worth_cows_row_final,
-        ["Ending Net Worth - Cash"] + ending_net_worth_cash_row_final,
-        ["Total ($)"] + total_78_79_row_final
-    ]
-
-    # Combine row headers and data values
-    df2 = pd.DataFrame(data_values2, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-    df2_summary = pd.DataFrame(data_values2_summary, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-
-
-    ## third table
-
-    revenues_from_calves_colE_tbl3 = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_years3_5
-    revenues_from_calves_colO_tbl3 = ((herd_size * (percent_calves_sold/100)) - calf_death_loss) * (weight_at_weaning * (1 + (weaning_weight_adjustment/100))) * price_weaning_years3_5 if current_year+2 < drought_end_year else (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_years3_5
-    revenues_from_calves_colQ_tbl3 = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_years3_5 if current_year+2 > drought_end_year else 0
-
-    revenues_from_calves_row_tbl3 = [revenues_from_calves_colE_tbl3, revenues_from_calves_colE_tbl3, revenues_from_calves_colO_tbl3, revenues_from_calves_colQ_tbl3, 0]
-
-    operating_costs_tbl3 = -herd_size * annual_cow_costs
-    operating_costs_adj_N_tbl3 = -((herd_size * annual_cow_costs) + (drought_days_store2 * additional_cost_option1 * herd_size)) if drought_days_store2 > 0 else -(herd_size * annual_cow_costs)
-    operating_costs_adj_O_tbl3 = -((herd_size * annual_cow_costs) + (drought_months_store2 * pasture_rent * herd_size)) if drought_days_store2 > 0 else -(herd_size * annual_cow_costs)
-    operating_costs_adj_Q_tbl3 = -operating_costs_year2 if revenues_from_calves_row_tbl3[-2]==0 else -(herd_size * annual_cow_costs)
-
-    operating_costs_row_tbl3 = [operating_costs_tbl3, operating_costs_adj_N_tbl3, operating_costs_adj_O_tbl3, operating_costs_adj_Q_tbl3 ,-operating_costs_year2]
-
-    interest_income_expenses_row_tbl3 = [(c*(interest_invested_money/100) if c>0 else c*(interest_borrowed_money/100)) for c in ending_net_worth_cash_row_final]
-    
-    profits_row_tbl3 = [c + v + k for c, v, k in zip(revenues_from_calves_row_tbl3, operating_costs_row_tbl3,interest_income_expenses_row_tbl3)]
-    
-    taxes_row_tbl3 = [(c*(0.124+0.15+0.04) if c > 0 else 0) for c in profits_row_tbl3]
-    taxes_after_income_row_tbl3 = [c - v for c, v in zip(profits_row_tbl3, taxes_row_tbl3)]
-    purchase_females_tbl3= herd_size*cost_replacement_animals if current_year+2==drought_end_year else 0 
-    purchase_females_row_tbl3 = [0,0,0,purchase_females_tbl3 ,0]
-
-    ending_net_worth_cows_1to3_tbl3 = herd_size*cost_replacement_animals if purchase_females_tbl3 > 0 else ending_net_worth_cows_row_final[0]+purchase_females_row_tbl3[-2]
-    ending_net_worth_cows_4to5_tbl3 = [c + v for c, v in zip(ending_net_worth_cows_row_final[-2:], purchase_females_row_tbl3[-2:])]
-    ending_net_worth_cows_row_tbl3_final = [ending_net_worth_cows_1to3_tbl3,ending_net_worth_cows_1to3_tbl3,ending_net_worth_cows_1to3_tbl3,
-                                       ending_net_worth_cows_4to5_tbl3[0],ending_net_worth_cows_4to5_tbl3[1]]
-    ending_net_worth_cash_row_tbl3_final = [c + v - k for c, v, k in zip(ending_net_worth_cash_row_final,taxes_after_income_row_tbl3, purchase_females_row_tbl3)]
-    total_78_79_row_tbl3_final = [c + v for c, v in zip(ending_net_worth_cows_row_tbl3_final, ending_net_worth_cash_row_tbl3_final)]
-
-    data_values3 = [
-        ["Revenues from Calves"] + revenues_from_calves_row_tbl3,
-        ["Operating expenses"] + operating_costs_row_tbl3,
-        ["Interest Income/Expenses"] + interest_income_expenses_row_tbl3,
-        ["Profits"] + profits_row_tbl3,
-        ["Taxes (SE, US Income, CO Income)"] + taxes_row_tbl3,
-        ["After Tax Income"] + taxes_after_income_row_tbl3,
-        ["Purchase replacement Females"] + purchase_females_row_tbl3,
-    ]
-
-    data_values3_summary = [
-        ["Ending Net Worth - Cows"] + ending_net_worth_cows_row_tbl3_final,
-        ["Ending Net Worth - Cash"] + ending_net_worth_cash_row_tbl3_final,
-        ["Total ($)"] + total_78_79_row_tbl3_final
-    ]
-
-    # Combine row headers and data values
-    df3 = pd.DataFrame(data_values3, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-    df3_summary = pd.DataFrame(data_values3_summary, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-
-    ## fourth table
-
-    revenues_from_calves_colE_tbl4 = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_years3_5
-    revenues_from_calves_colO_tbl4 = ((herd_size * (percent_calves_sold/100)) - calf_death_loss) * (weight_at_weaning * (1 + (weaning_weight_adjustment/100))) * price_weaning_years3_5 if current_year+3 < drought_end_year else (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_years3_5
-    revenues_from_calves_colQ_tbl4 = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_years3_5 if current_year+3 > drought_end_year else 0
-
-    revenues_from_calves_row_tbl4 = [revenues_from_calves_colE_tbl4, revenues_from_calves_colE_tbl4, revenues_from_calves_colO_tbl4, revenues_from_calves_colQ_tbl4, 0]
-
-    operating_costs_tbl4 = -herd_size * annual_cow_costs
-    operating_costs_adj_N_tbl4 = -((herd_size * annual_cow_costs) + (drought_days_store3 * additional_cost_option1 * herd_size)) if drought_days_store3 > 0 else -(herd_size * annual_cow_costs)
-    operating_costs_adj_O_tbl4 = -((herd_size * annual_cow_costs) + (drought_months_store3 * pasture_rent * herd_size)) if drought_days_store3 > 0 else -(herd_size * annual_cow_costs)
-    operating_costs_adj_Q_tbl4 = -operating_costs_year2 if revenues_from_calves_row_tbl4[-2]==0 else -(herd_size * annual_cow_costs)
-
-    operating_costs_row_tbl4 = [operating_costs_tbl4, operating_costs_adj_N_tbl4, operating_costs_adj_O_tbl4, operating_costs_adj_Q_tbl4 ,-operating_costs_year2]
-
-    interest_income_expenses_row_tbl4 = [(c*(interest_invested_money/100) if c>0 else c*(interest_borrowed_money/100)) for c in ending_net_worth_cash_row_tbl3_final]
-    
-    profits_row_tbl4 = [c + v + k for c, v, k in zip(revenues_from_calves_row_tbl4, operating_costs_row_tbl4,interest_income_expenses_row_tbl4)]
-    
-    taxes_row_tbl4 = [(c*(0.124+0.15+0.04) if c > 0 else 0) for c in profits_row_tbl4]
-    taxes_after_income_row_tbl4 = [c - v for c, v in zip(profits_row_tbl4, taxes_row_tbl4)]
-    purchase_females_tbl4= herd_size*cost_replacement_animals if current_year+3==drought_end_year else 0 
-    purchase_females_row_tbl4 = [0,0,0,purchase_females_tbl4 ,0]
-
-    ending_net_worth_cows_1to3_tbl4 = herd_size*cost_replacement_animals if purchase_females_tbl4 > 0 else ending_net_worth_cows_row_tbl3_final[0]+purchase_females_row_tbl4[-2]
-    ending_net_worth_cows_4to5_tbl4 = [c + v for c, v in zip(ending_net_worth_cows_row_tbl3_final[-2:], purchase_females_row_tbl4[-2:])]
-    ending_net_worth_cows_row_tbl4_final = [ending_net_worth_cows_1to3_tbl4,ending_net_worth_cows_1to3_tbl4,ending_net_worth_cows_1to3_tbl4,
-                                       ending_net_worth_cows_4to5_tbl4[0],ending_net_worth_cows_4to5_tbl4[1]]
-    ending_net_worth_cash_row_tbl4_final = [c + v - k for c, v, k in zip(ending_net_worth_cash_row_tbl3_final,taxes_after_income_row_tbl4, purchase_females_row_tbl4)]
-    total_78_79_row_tbl4_final = [c + v for c, v in zip(ending_net_worth_cows_row_tbl4_final, ending_net_worth_cash_row_tbl4_final)]
-
-    data_values4 = [
-        ["Revenues from Calves"] + revenues_from_calves_row_tbl4,
-        ["Operating expenses"] + operating_costs_row_tbl4,
-        ["Interest Income/Expenses"] + interest_income_expenses_row_tbl4,
-        ["Profits"] + profits_row_tbl4,
-        ["Taxes (SE, US Income, CO Income)"] + taxes_row_tbl4,
-        ["After Tax Income"] + taxes_after_income_row_tbl4,
-        ["Purchase replacement Females"] + purchase_females_row_tbl4,
-    ]
-
-    data_values4_summary = [
-        ["Ending Net Worth - Cows"] + ending_net_worth_cows_row_tbl4_final,
-        ["Ending Net Worth - Cash"] + ending_net_worth_cash_row_tbl4_final,
-        ["Total ($)"] + total_78_79_row_tbl4_final
-    ]
-
-    # Combine row headers and data values
-    df4 = pd.DataFrame(data_values4, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-    df4_summary = pd.DataFrame(data_values4_summary, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-
-
-    ## fifth table
-
-    revenues_from_calves_colE_tbl5 = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_years3_5
-    revenues_from_calves_colO_tbl5 = ((herd_size * (percent_calves_sold/100)) - calf_death_loss) * (weight_at_weaning * (1 + (weaning_weight_adjustment/100))) * price_weaning_years3_5 if current_year+4 < drought_end_year else (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_years3_5
-    revenues_from_calves_colQ_tbl5 = (herd_size * (percent_calves_sold/100)) * weight_at_weaning * price_weaning_years3_5 if current_year+4 > drought_end_year else 0
-
-    revenues_from_calves_row_tbl5 = [revenues_from_calves_colE_tbl5, revenues_from_calves_colE_tbl5, revenues_from_calves_colO_tbl5, revenues_from_calves_colQ_tbl5, 0]
 
-    operating_costs_tbl5 = -herd_size * annual_cow_costs
-    operating_costs_adj_N_tbl5 = -((herd_size * annual_cow_costs) + (drought_days_store4 * additional_cost_option1 * herd_size)) if drought_days_store4 > 0 else -(herd_size * annual_cow_costs)
-    operating_costs_adj_O_tbl5 = -((herd_size * annual_cow_costs) + (drought_months_store3 * pasture_rent * herd_size)) if drought_days_store4 > 0 else -(herd_size * annual_cow_costs)
-    operating_costs_adj_Q_tbl5 = -operating_costs_year2 if revenues_from_calves_row_tbl5[-2]==0 else -(herd_size * annual_cow_costs)
 
-    operating_costs_row_tbl5 = [operating_costs_tbl5, operating_costs_adj_N_tbl5, operating_costs_adj_O_tbl5, operating_costs_adj_Q_tbl5 ,-operating_costs_year2]
-
-    interest_income_expenses_row_tbl5 = [(c*(interest_invested_money/100) if c>0 else c*(interest_borrowed_money/100)) for c in ending_net_worth_cash_row_tbl4_final]
-    
-    profits_row_tbl5 = [c + v + k for c, v, k in zip(revenues_from_calves_row_tbl5, operating_costs_row_tbl5,interest_income_expenses_row_tbl5)]
-    
-    taxes_row_tbl5 = [(c*(0.124+0.15+0.04) if c > 0 else 0) for c in profits_row_tbl5]
-    taxes_after_income_row_tbl5 = [c - v for c, v in zip(profits_row_tbl5, taxes_row_tbl5)]
-    purchase_females_tbl5= herd_size*cost_replacement_animals if current_year+4==drought_end_year else 0 
-    purchase_females_row_tbl5 = [0,0,0,purchase_females_tbl5 ,0]
-
-    ending_net_worth_cows_1to3_tbl5 = herd_size*cost_replacement_animals if purchase_females_tbl5 > 0 else ending_net_worth_cows_row_tbl4_final[0]+purchase_females_row_tbl5[-2]
-    ending_net_worth_cows_4to5_tbl5 = [c + v for c, v in zip(ending_net_worth_cows_row_tbl4_final[-2:], purchase_females_row_tbl5[-2:])]
-    ending_net_worth_cows_row_tbl5_final = [ending_net_worth_cows_1to3_tbl5,ending_net_worth_cows_1to3_tbl5,ending_net_worth_cows_1to3_tbl5,
-                                       ending_net_worth_cows_4to5_tbl5[0],ending_net_worth_cows_4to5_tbl5[1]]
-    ending_net_worth_cash_row_tbl5_final = [c + v - k for c, v, k in zip(ending_net_worth_cash_row_tbl4_final,taxes_after_income_row_tbl5, purchase_females_row_tbl5)]
-    total_78_79_row_tbl5_final = [c + v for c, v in zip(ending_net_worth_cows_row_tbl5_final, ending_net_worth_cash_row_tbl5_final)]
-
-
-
-
-    data_values5 = [
-        ["Revenues from Calves"] + revenues_from_calves_row_tbl5,
-        ["Operating expenses"] + operating_costs_row_tbl5,
-        ["Interest Income/Expenses"] + interest_income_expenses_row_tbl5,
-        ["Profits"] + profits_row_tbl5,
-        ["Taxes (SE, US Income, CO Income)"] + taxes_row_tbl5,
-        ["After Tax Income"] + taxes_after_income_row_tbl5,
-        ["Purchase replacement Females"] + purchase_females_row_tbl5,
-    ]
-
-    data_values5_summary = [
-        ["Ending Net Worth - Cows"] + ending_net_worth_cows_row_tbl5_final,
-        ["Ending Net Worth - Cash"] + ending_net_worth_cash_row_tbl5_final,
-        ["Total ($)"] + total_78_79_row_tbl5_final
-    ]
-
-    # Combine row headers and data values
-    df5 = pd.DataFrame(data_values5, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-    df5_summary = pd.DataFrame(data_values5_summary, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-
-    # Summary table
-
-    summary_total_row = [c - v for c, v in zip(total_78_79_row_tbl5_final, total_64_66_row)]
-    summary_percow_row = [c / herd_size for c in summary_total_row]
-    summary_percent_row = [(c / v)*100 for c, v in zip(summary_total_row, total_64_66_row)]
-
-
-    data_values_summary = [
-        ["Change in net worth over 5 years"] + ["", "", "", "", ""],
-        ["Total ($)"] + summary_total_row,
-        ["$/cow"] + summary_percow_row,
-        ["Percentage change over 5 years (%)"] + summary_percent_row,
-        
-    ]
-
-    # Combine row headers and data values
-    df_summary = pd.DataFrame(data_values_summary, columns=["","Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"])
-
-    return (df1_current_summary.to_dict(orient='records'), df1.to_dict(orient='records'), df1_summary.to_dict(orient='records'), 
-            df2.to_dict(orient='records'), df2_summary.to_dict(orient='records'), 
-            df3.to_dict(orient='records'), df3_summary.to_dict(orient='records'),
-            df4.to_dict(orient='records'), df4_summary.to_dict(orient='records'),
-            df5.to_dict(orient='records'), df5_summary.to_dict(orient='records'),
-            df_summary.to_dict(orient='records'),df_summary.to_dict(orient='records'))
-
-
-
-def direction(value):
-    """Return 'increase' or 'decrease' based on the sign of the value."""
-    return 'increase' if value > 0 else 'decrease'
+# ------------------------------------------------------------------------------
+# Sensitivity analysis
 
+# Values of an input swept in the heatmap: +/-50% around its value, or whole months/years for dates
+def sensitivity_range(params, name, n=25):
+    value = float(getattr(params, name))
+    if name in ['current_month', 'drought_end_month']:
+        return np.arange(1, 13)
+    if name in ['current_year', 'drought_end_year']:
+        return np.arange(params.current_year, params.current_year + YEARS)
+    if value == 0:
+        return np.linspace(0, 1, n)
+    return np.linspace(value * 0.5, value * 1.5, n)
 
 
 @callback(
-    dash.dependencies.Output('output-comparison-summary', 'children'),
-    [dash.dependencies.Input('output-comparison-tablesummary-data-store', 'data')]
+    Output('sensitivity-tornado-graph', 'figure'),
+    Output('sensitivity-heatmap-graph', 'figure'),
+    [Input('collapse-sensitivity-section', 'is_open'),
+     Input('sensitivity-x-dropdown', 'value'),
+     Input('sensitivity-y-dropdown', 'value'),
+     Input('sensitivity-update-button', 'n_clicks')] +
+    [State(component_id, 'value') for component_id in HerdParameters.component_ids()]
 )
-def update_output(data):
-    # Convert the data back to a DataFrame
-    df_summary = pd.DataFrame(data)
-
-    # Extract the "Percentage change (over 5 years)" row
-    percentage_change_row = df_summary.iloc[3, 1:].astype(float)
-    
-    # Get the column name and the value of the minimum and maximum
-    min_col_name = percentage_change_row.idxmin()
-    min_value = round(percentage_change_row[min_col_name], 0)
-    min_col_name_display = (
-        "acquiring feed" if min_col_name == "Buy feed" else
-        "renting additional pasture" if min_col_name == "Rent pasture" else
-        "replacing cows" if min_col_name == "Replace" else
-        "not replacing cows"
+def update_sensitivity(is_open, x, y, n_clicks, *values):
+    # Only computed while the section is visible, when it opens, when the pair of inputs changes
+    # or on Update (the input edits stay in the browser, see update_decision)
+    if not is_open or any(value is None for value in values):
+        raise PreventUpdate
+
+    params = HerdParameters.from_values(values)
+    labels = {option['value']: option['label'] for option in sensitivity_options}
+
+    # Tornado: inputs with the largest swing on top
+    # (model runs go to the process pool of the worker, see utils/workers.py)
+    df = workers.run(sensitivity, params)
+    df = df[np.isfinite(df['swing'])].tail(12)
+    base_change = df['base_change'].iloc[0] if len(df) else 0
+    tornado = go.Figure()
+    tornado.add_trace(go.Bar(
+        y=[labels[name] for name in df['parameter']],
+        x=df['high_change'] - df['low_change'],
+        base=df['low_change'],
+        orientation='h',
+        marker_color=np.where(df['flips'], 'red', '#cf8b0e'),
+        customdata=df[['low_value', 'high_value', 'low_best', 'high_best']],
+        hovertemplate='Low (%{customdata[0]:.2f}): %{customdata[2]}<br>'
+                      'High (%{customdata[1]:.2f}): %{customdata[3]}<extra></extra>',
+    ))
+    tornado.add_vline(x=base_change, line_dash='dash', line_color='black')
+    tornado.update_layout(
+        template='plotly_white',
+        margin=dict(l=10, r=10, t=30, b=10),
+        xaxis_title='Best strategy - 5-year net worth change (%)',
+        showlegend=False,
     )
 
-    max_col_name = percentage_change_row.idxmax()
-    max_value = round(percentage_change_row[max_col_name], 0)
-    max_col_name_display = (
-        "acquiring feed" if max_col_name == "Buy feed" else
-        "renting additional pasture" if max_col_name == "Rent pasture" else
-        "replacing cows" if max_col_name == "Replace" else
-        "not replacing cows"
+    # Heatmap: best drought strategy over the selected pair of inputs
+    x_values, y_values = sensitivity_range(params, x), sensitivity_range(params, y)
+    x_values, y_values, best, change = workers.run(best_strategy_surface, params, x, x_values, y, y_values)
+    n = len(DROUGHT_STRATEGIES)
+    colors = strategy_colors[len(STRATEGIES) - n:]
+    colorscale = [[bound / n, color] for i, color in enumerate(colors) for bound in (i, i + 1)]
+    heatmap = go.Figure(go.Heatmap(
+        x=x_values,
+        y=y_values,
+        z=best,
+        zmin=-0.5,
+        zmax=n - 0.5,
+        colorscale=colorscale,
+        customdata=np.dstack([np.array(DROUGHT_STRATEGIES, dtype=object)[best], np.round(change, 0)]),
+        hovertemplate=f'{labels[x]}: %{{x}}<br>{labels[y]}: %{{y}}<br>'
+                      'Best: %{customdata[0]} (%{customdata[1]}%)<extra></extra>',
+        colorbar=dict(tickvals=list(range(n)), ticktext=DROUGHT_STRATEGIES),
+    ))
+    heatmap.add_trace(go.Scatter(
+        x=[getattr(params, x)], y=[getattr(params, y)], mode='markers',
+        marker=dict(color='white', size=10, line=dict(color='black', width=2)),
+        hoverinfo='skip', showlegend=False,
+    ))
+    heatmap.update_layout(
+        template='plotly_white',
+        margin=dict(l=10, r=10, t=30, b=10),
+        xaxis_title=labels[x],
+        yaxis_title=labels[y],
     )
 
-    # Determine the direction of change (increase or decrease)
-    min_direction = direction(min_value)
-    max_direction = direction(max_value)
-    min_arrow_direction = "up" if min_direction == "increase" else "down"
-    max_arrow_direction = "up" if max_direction == "increase" else "down"
+    return tornado, heatmap
 
-    # sentence = (f"The least profitable option is '{min_col_name}', showing a {min_direction} of {abs(min_value)}% over 5 years. "
-    #        f"Conversely, the most profitable option is '{max_col_name}', with a {max_direction} of {abs(max_value)}%.")
 
-    # variables_style = {"color": "#cf8b0e", "font-size": "20px","vertical-align": "middle"}
-    # text_style = {"font-size": "15px","vertical-align": "middle"}
 
+# ------------------------------------------------------------------------------
+# Monte Carlo simulation
 
+@callback(
+    Output('simulation-summary', 'children'),
+    Output('simulation-graph', 'figure'),
+    [Input('simulation-run-button', 'n_clicks')],
+    [State('simulation-market-dropdown', 'value'),
+     State('simulation-size-dropdown', 'value')] +
+    [State(component_id, 'value') for component_id in HerdParameters.component_ids()]
+)
+def update_simulation(n_clicks, slug_id, n_scenarios, *values):
+    if not n_clicks or any(value is None for value in values):
+        raise PreventUpdate
+
+    params = HerdParameters.from_values(values)
+    changes = get_calf_price_changes(slug_id)
+    # Same seed on every run, so identical inputs give identical results
+    # (the scenario chunks go to the process pool of the worker, see utils/workers.py)
+    _, change = simulate(params, UncertaintySettings(calf_price_changes=changes), n=n_scenarios, seed=0)
+    summary = summarize(change)
+
+    fig = go.Figure()
+    for strategy, color in zip(STRATEGIES, strategy_colors):
+        fig.add_trace(go.Violin(
+            x=change[strategy].clip(*np.nanpercentile(change[strategy], [1, 99])),
+            name=strategy, line_color=color, orientation='h',
+            side='positive', points=False, meanline_visible=True,
+        ))
+    fig.update_layout(
+        template='plotly_white',
+        margin=dict(l=10, r=10, t=30, b=10),
+        xaxis_title='5-year net worth change (%)',
+        showlegend=False,
+    )
 
-    
-    sentence = html.Div(id="summary-decision-text", children=[
-        html.Span(f"When considering strategies in the face of a potential drought—based on the parameters outlined earlier—, ", className="text-style"),
-        html.Span(f"{min_col_name_display}", className="variable-style"),
-        html.Span(f" is expected to be the least profitable choice, with a projected net worth ", className="text-style"),
-        html.I(className=f"fa fa-arrow-{min_arrow_direction}", style={"color": "#cf8b0e", "font-size": "15px", "vertical-align": "middle"}),
-        html.Span(f" {min_direction} of ", className="variable-style"),
-        html.Span(f"{abs(min_value)}%", className="variable-style"),
-        html.Span(f" over 5 years. Conversely, the strategy of ", className="text-style"),
-        html.Span(f"{max_col_name_display}", className="variable-style"),
-        html.Span(f" holds promise, with a potential net worth ", className="text-style"),
-        html.I(className=f"fa fa-arrow-{max_arrow_direction}", style={"color": "#cf8b0e", "font-size": "15px", "vertical-align": "middle"}),
-        html.Span(f" {max_direction} of ", className="variable-style"),
-        html.Span(f"{abs(max_value)}%.", className="variable-style")
+    best = summary.loc[summary['p_best'].idxmax()]
+    source = "the historical sales of the selected market" if len(changes) else "a typical year (market history unavailable)"
+    text = html.Div(id="simulation-decision-text", children=[
+        html.Span(f"Across {len(change):,} scenarios, with calf prices varying as in {source}, ", className="text-style"),
+        html.Span(f"{best['strategy']}", className="variable-style"),
+        html.Span(" is the best strategy in ", className="text-style"),
+        html.Span(f"{best['p_best']:.0%}", className="variable-style"),
+        html.Span(" of them. Probability of being the best option: ", className="text-style"),
+        html.Span(", ".join(f"{row.strategy} {row.p_best:.0%}" for row in summary.itertuples()), className="text-style"),
+        html.Span(". Normal conditions (no drought) is shown for reference only.", className="text-style"),
     ])
 
-
-    
-    return sentence
\ No newline at end of file
+    return text, fig
@@ -3,13 +3,13 @@
 # Libraries
 # Standard libraries
 import json
+import gzip
 import time
 from datetime import datetime, timedelta
 
 # Third-party libraries for data handling and numerical computations
 import numpy as np
 import pandas as pd
-import geopandas as gpd
 
 # Third-party libraries for visualization
 import plotly.express as px 
@@ -18,93 +18,31 @@ import plotly.graph_objects as go
 # Dash libraries for web applications
 import dash
 import dash_daq as daq
-from dash import dcc, html, Input, Output, State, callback
+from dash import dcc, html, Input, Output, State, callback, clientside_callback, ClientsideFunction
 import dash_bootstrap_components as dbc
 
 # Specific imports
 from geopandas.tools import sjoin
 
-# Imports
-import requests
-import boto3
-s3 = boto3.client('s3')
+# Lazy data registry
+from utils.registry import registry
+from utils.datasets import bucket_name  # Also registers the datasets shared by the pages
+from utils.mmn import get_data_from_mmnapi
 
 
 dash.register_page(__name__)
 
 # ------------------------------------------------------------------------------
 # Import and pre-process data
-
-# # ANPP Data
-bucket_name = 'foodsight-lambda'  # Name of the S3 bucket
-## Historic data
-key_path_all_hist_read = 'hist_data/hist_data_grasscast_gp_sw.csv'
-hist_response = s3.get_object(Bucket=bucket_name, Key=key_path_all_hist_read)
-df_hist = pd.read_csv(hist_response['Body'])
-## Forcast data
-key_path_all_forecast_read = 'forecast_data/forecast_data_grasscast_gp_sw.csv'
-forecast_response = s3.get_object(Bucket=bucket_name, Key=key_path_all_forecast_read)
-df_forecast = pd.read_csv(forecast_response['Body'])
-
-# Testing data from local. To speed up the deployment process
-# df_hist = pd.read_csv("../testing_data/aws/hist_data_grasscast_gp_sw.csv")
-# df_forecast = pd.read_csv("../testing_data/aws/forecast_data_grasscast_gp_sw.csv")
-
-# --------------------------
-# Spatial data
-
-## AOI Grid
-grid_geojson_path = 'static/grasscast_aoi_grid.geojson'
-aoi_grid = gpd.read_file(grid_geojson_path).to_crs(epsg=4326).clean_names()
-# Merging historical and forecast data with grid
-gdf_hist = aoi_grid.merge(df_hist, left_on='gridid', right_on='gridid')
-gdf_forecast = aoi_grid.merge(df_forecast, left_on='gridid', right_on='gridid')
-# Historical plot slider range
-YEARS = gdf_hist['year'].unique().tolist()
-# Grid IDs and AOI dictionary
-aoi_gridids_json_path = 'static/aoi_gridids.json'
-with open(aoi_gridids_json_path, 'r') as file:
-    aoi_gridids = json.load(file)
-
-## Counties
-counties_geojson_path = 'static/grasscast_counties.geojson'
-with open(counties_geojson_path, 'r') as f:
-    counties_geojson = json.load(f)
-counties_gpd = gpd.read_file(counties_geojson_path).to_crs(epsg=4326)
-counties_list = counties_gpd['name'].tolist()
-
-# Mapbox token
-token = open(".mapbox_token").read() # you will need your own token
+# ANPP, spatial data, tokens and market lists are loaded on first use from the data registry
+# (utils/datasets.py)
 
 # --------------------------
 # Market data
 
-## API call function
-def get_data_from_mmnapi(api_key, endpoint):
-    base_url = "https://marsapi.ams.usda.gov"
-    try:
-        response = requests.get(base_url + endpoint, auth=(api_key, ''))
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        # Handle request-related errors (e.g., network issues, invalid URLs, timeouts)
-        return "The access to the API is temporarily unavailable"
-    except ValueError as e:
-        # Handle JSON decoding errors
-        return "Error decoding JSON response from the API"
-
-## API key
-api_key = open(".mmn_api_token").read() 
-# It is necessary to obtain an MMN token.
-# More information at https://mymarketnews.ams.usda.gov/mymarketnews-api
-
 ## Cattle markets 
 # (compiled post API evaluation for our Area of Interest)
-with open('data/cattle_markets.json') as json_file:
-    cattle_markets_list = json.load(json_file) 
+cattle_markets_list = registry.get('cattle_markets')
 # Cattle class, State and Markets list for dropdown menus
 cattle_dropdown_options = []
 cattle_type_dropdown_options = [{'label': 'All', 'value': 'All'}, {'label': 'Heifers', 'value': 'Heifers'}, {'label': 'Steers', 'value': 'Steers'}]
@@ -114,10 +52,88 @@ cattle_state_dropdown_options.insert(0, "All")
 
 ## Last cattle market data
 # (Stored in S3 bucket. Updated daily using lambda function)
-key_path_read_econ = 'market_data/last_market_data.json'
-response = s3.get_object(Bucket=bucket_name, Key=key_path_read_econ)
-last_market_data = response['Body'].read().decode('utf-8')
-daily_top_cattle_data = pd.DataFrame(json.loads(last_market_data))
+# Compressed columnar file holding only the columns used below, with numeric prices and weights.
+# Its latest_day_index gives the rows of the latest report day of each market and class, the only
+# rows kept in memory (the weight bins and the top markets table use the latest auctions).
+key_path_read_econ = 'market_data/last_market_data.json.gz'
+
+@registry.register('daily_top_cattle_data')
+def load_daily_top_cattle_data():
+    response = registry.get('s3').get_object(Bucket=bucket_name, Key=key_path_read_econ)
+    last_market_data = json.loads(gzip.decompress(response['Body'].read()))
+    daily_top_cattle_data = pd.DataFrame(last_market_data['columns'])
+    # {market: {class: {report_date, start, stop}}}
+    latest_rows = [np.arange(entry['start'], entry['stop'])
+                   for market_index in last_market_data['latest_day_index'].values()
+                   for entry in market_index.values()]
+    latest_rows = np.concatenate(latest_rows) if latest_rows else np.array([], dtype=int)
+    daily_top_cattle_data = daily_top_cattle_data.take(latest_rows).reset_index(drop=True)
+    daily_top_cattle_data['report_date'] = pd.to_datetime(daily_top_cattle_data['report_date'])
+    market_numeric_columns = ['avg_price', 'avg_price_min', 'avg_price_max', 'avg_weight_min', 'avg_weight_max']
+    daily_top_cattle_data[market_numeric_columns] = daily_top_cattle_data[market_numeric_columns].astype('float64')
+    return daily_top_cattle_data
+
+## Helper function for the weight vs price chart
+# Latest-day prices grouped into 50-lb weight bins, per market and class ('All' pools both classes)
+# Each entry holds (weight bin, prices, box color) tuples sorted by weight
+def build_price_weight_bins(df):
+    # Keep the latest report day of each market and class
+    df = pd.concat([df, df.assign(**{'class': 'All'})], ignore_index=True)
+    latest_date = df.groupby(['market_location_name', 'class'])['report_date'].transform('max')
+    df = df[df['report_date'] == latest_date]
+
+    # Pair min weights with min prices and max weights with max prices
+    keys = ['market_location_name', 'class']
+    long_df = pd.concat([
+        df[keys + ['avg_weight_min', 'avg_price_min']].set_axis(keys + ['weight', 'price'], axis=1),
+        df[keys + ['avg_weight_max', 'avg_price_max']].set_axis(keys + ['weight', 'price'], axis=1)
+    ])
+    long_df = long_df[(long_df['weight'] > 0) & long_df['price'].notna()]
+    # Right edge of the 50-lb bin, i.e. the (0, 50], (50, 100]... intervals
+    long_df['weight'] = (np.ceil(long_df['weight'] / 50) * 50).astype(int)
+    long_df = long_df.sort_values(keys + ['weight'])
+
+    price_weight_bins = {}
+    for key, group in long_df.groupby(keys, sort=False):
+        weights, starts = np.unique(group['weight'].values, return_index=True)
+        prices = np.split(group['price'].values, starts[1:])
+        # Color gradient from red to green following the median price of each bin
+        medians = np.array([np.median(price) for price in prices])
+        spread = medians.max() - medians.min()
+        normalized_medians = (medians - medians.min()) / spread if spread > 0 else np.zeros(len(medians))
+        colors = [(int(255 * (1 - val)), int(255 * val), 0) for val in normalized_medians]
+        price_weight_bins[key] = list(zip(weights, prices, colors))
+
+    return price_weight_bins
+
+registry.register('price_weight_bins', lambda: build_price_weight_bins(registry.get('daily_top_cattle_data')))
+
+## Helper functions for the top markets table
+# Ranking index: per (state, class), the latest-day average price of each market sorted from highest to lowest
+# ('All' entries pool every state and/or class)
+def build_top_markets_index(df):
+    df = pd.concat([df, df.assign(**{'class': 'All'})], ignore_index=True)
+    df = pd.concat([df, df.assign(market_location_state='All')], ignore_index=True)
+    keys = ['market_location_state', 'class', 'market_location_name']
+    latest_date = df.groupby(keys)['report_date'].transform('max')
+    ranking = df[df['report_date'] == latest_date].groupby(keys + ['report_date'])['avg_price'].mean().reset_index()
+    ranking = ranking.sort_values(['market_location_state', 'class', 'avg_price'], ascending=[True, True, False])
+    return {key: group[['market_location_name', 'report_date', 'avg_price']].reset_index(drop=True)
+            for key, group in ranking.groupby(['market_location_state', 'class'], sort=False)}
+
+# Top N markets for a state and class, limited to markets reporting within the last 15 days
+def get_top_markets(selected_state, cattle_type, n=5, days=15):
+    ranking = registry.get('top_markets_index').get((selected_state, cattle_type))
+    if ranking is None:
+        return pd.DataFrame({'market_location_name': pd.Series(dtype='object'),
+                             'report_date': pd.Series(dtype='datetime64[ns]'),
+                             'avg_price': pd.Series(dtype='float64')})
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    recent = (ranking['report_date'] >= start_date) & (ranking['report_date'] <= end_date)
+    return ranking[recent].head(n)
+
+registry.register('top_markets_index', lambda: build_top_markets_index(registry.get('daily_top_cattle_data')))
 
 # # Testing data from local. To speed up the deployment process
 # with open('../testing_data/last_market_data.json') as json_file:
@@ -127,8 +143,7 @@ daily_top_cattle_data = pd.DataFrame(json.loads(last_market_data))
 
 ## Hay markets
 # (compiled post API evaluation for our Area of Interest)
-with open('data/hay_markets.json') as json_file:
-    hay_markets_list = json.load(json_file) 
+hay_markets_list = registry.get('hay_markets') 
 # Hay class, grade, State and Markets list for dropdown menus
 hay_dropdown_options = []
 hay_class_dropdown_options = [{'label': 'All', 'value': 'All'}, {'label': 'All Alfalfas', 'value': 'All Alfalfas'}, {'label': 'All Grasses', 'value': 'All Grasses'}, {'label': 'Others', 'value': 'Others'}, {'label': 'Alfalfa/Grass Mix', 'value': 'Alfalfa/Grass Mix'}, {'label': 'Mixed Grass', 'value': 'Mixed Grass'}, {'label': 'Wheat', 'value': 'Wheat'}, {'label': 'Alfalfa/Oat Mix', 'value': 'Alfalfa/Oat Mix'}, {'label': 'Alfalfa/Orchard Mix', 'value': 'Alfalfa/Orchard Mix'}, {'label': 'Alfalfa/Timothy Mix', 'value': 'Alfalfa/Timothy Mix'}, {'label': 'Clover/Grass Mix', 'value': 'Clover/Grass Mix'}, {'label': 'Grass', 'value': 'Grass'}, {'label': 'Corn Stalk', 'value': 'Corn Stalk'}, {'label': 'Oat', 'value': 'Oat'}, {'label': 'Alfalfa', 'value': 'Alfalfa'}, {'label': 'Prairie/Meadow Grass', 'value': 'Prairie/Meadow Grass'}, {'label': 'Orchard Grass', 'value': 'Orchard Grass'}, {'label': 'Orchard/Timothy Grass', 'value': 'Orchard/Timothy Grass'}, {'label': 'Rye', 'value': 'Rye'}, {'label': 'Barley', 'value': 'Barley'}, {'label': 'Timothy Grass', 'value': 'Timothy Grass'}, {'label': 'Teff', 'value': 'Teff'}, {'label': 'Brome Grass', 'value': 'Brome Grass'}, {'label': 'Clover', 'value': 'Clover'}, {'label': 'Alfalfa/Wheat Mix', 'value': 'Alfalfa/Wheat Mix'}, {'label': 'Rye Grass', 'value': 'Rye Grass'}, {'label': 'Sorghum', 'value': 'Sorghum'}, {'label': 'Sudan', 'value': 'Sudan'}, {'label': 'Triticale', 'value': 'Triticale'}, {'label': 'Soybean', 'value': 'Soybean'}, {'label': 'Fescue Grass', 'value': 'Fescue Grass'}, {'label': 'Alfalfa /Rye Mix', 'value': 'Alfalfa /Rye Mix'}, {'label': 'Fodder', 'value': 'Fodder'}, {'label': 'Corn', 'value': 'Corn'}, {'label': 'Millet', 'value': 'Millet'}, {'label': 'Alfalfa/Triticale Mix', 'value': 'Alfalfa/Triticale Mix'}, {'label': 'Bluegrass', 'value': 'Bluegrass'}, {'label': 'Alfalfa/Bluegrass Mix', 'value': 'Alfalfa/Bluegrass Mix'}, {'label': 'Milo', 'value': 'Milo'}, {'label': 'Canary Reed', 'value': 'Canary Reed'}, {'label': 'Canola', 'value': 'Canola'}, {'label': 'Forage Mix-Two Way', 'value': 'Forage Mix-Two Way'}, {'label': 'Alfalfa/Forage Mix', 'value': 'Alfalfa/Forage Mix'}, {'label': 'Alfalfa Straw', 'value': 'Alfalfa Straw'}, {'label': 'Forage Mix-Three Way', 'value': 'Forage Mix-Three Way'}, {'label': 'Alfalfa/Sudan Mix', 'value': 'Alfalfa/Sudan Mix'}]
@@ -137,15 +152,6 @@ hay_state_dropdown_options = list(set([item['market_location_state'] for item in
 hay_state_dropdown_options = sorted(hay_state_dropdown_options)
 hay_state_dropdown_options.insert(0, "All")
 
-## Time variable
-# Get the current year
-current_year = datetime.now().year
-# Check if the maximum year in the DataFrame is not equal to the current year
-# Correction for the case when forecast data has not been released for the current year yet (i.e., January-April)
-if df_hist['year'].max() != current_year:
-    # If not, set the current_year to the previous year
-    current_year = current_year - 1
-
 # ------------------------------------------------------------------------------
 # Layout
 layout = html.Div([
@@ -459,27 +465,16 @@ def update_markets(selected_state):
 
 
 # Callback to update data description based on toggle switch
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='econ_switch_output'),
     [Output('switch-output', 'children'),
      Output('tooltip-container', 'children')],
     Input('econ-toggle-switch', 'on')
 )
-def update_output_and_tooltip(on):
-    if on:
-        return "Daily average prices", dbc.Tooltip(
-            "Nominal prices averaged across all transactions by date. Red indicates a market decline over the selected time range. Green corresponds a market rise from the first to the last record selected.",
-            target="switch-output",
-            id="switch-output-tooltip"
-        )
-    else:
-        return "Monthly prices", dbc.Tooltip(
-            "Nominal prices aggregated by month. Months where prices decrease from the first to the last record are shown in red. Conversely, months with a price increase are shown in green. Outliers not displayed.",
-            target="switch-output",
-            id="switch-output-tooltip"
-        )
 
 # Callback to update time range active button
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='econ_cattle_button_styles'),
     [Output('btn-all', 'style'),
      Output('btn-2yr', 'style'),
      Output('btn-1yr', 'style'),
@@ -491,46 +486,40 @@ def update_output_and_tooltip(on):
      Input('btn-6mo', 'n_clicks'),
      Input('btn-2mo', 'n_clicks')]
 )
-def update_active_button(btn_all, btn_2yr, btn_1yr, btn_6mo, btn_2mo):
-    
-    default_style = {
-        'backgroundColor': 'transparent',
-        'color': '#dbe5f3'
-    }
-
-    active_style = {
-        'backgroundColor': '#dbe5f3',
-        'color': '#282b3f'
-    }
-
-    # Get the id of the button that was clicked
-    ctx = dash.callback_context
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-
-    # If no buttons have been pressed yet, return default styles with btn-all set to active
-    if not ctx.triggered:
-        styles = [default_style for _ in range(5)]
-        styles[0] = active_style  # Make btn-all active
-        return styles
-
-    # Dictionary to map button IDs to their index in the vals list
-    button_indices = {
-        'btn-all': 0,
-        'btn-2yr': 1,
-        'btn-1yr': 2,
-        'btn-6mo': 3,
-        'btn-2mo': 4
-    }
-
-    # Index of the button that was clicked
-    active_button_index = button_indices[button_id]
-    # Start with all buttons having the default style
-    styles = [default_style for _ in range(5)]
-    # Set the active style for the clicked button
-    styles[active_button_index] = active_style
 
-    return styles
 
+## Helper function for the candlestick chart
+# Monthly box statistics computed in vectorized groupby/transform passes
+def monthly_box_stats(df):
+    df = df.sort_values(['yearmonth', 'report_date'])
+    by_month = df.groupby('yearmonth')['avg_price']
+
+    # Trend of each month: last price against the monthly average (months with one record or no change are dropped)
+    month_size = by_month.transform('size')
+    month_mean = by_month.transform('mean')
+    is_last = df.groupby('yearmonth').cumcount(ascending=False) == 0
+    month_last = df['yearmonth'].map(df.loc[is_last].set_index('yearmonth')['avg_price'])
+    trend = np.select([(month_size > 1) & (month_last > month_mean), (month_size > 1) & (month_last < month_mean)],
+                      ['Increasing', 'Decreasing'], default='')
+    df = df[trend != ''].assign(Trend=trend[trend != ''])
+    color_map = {'Increasing': 'green', 'Decreasing': 'red'}
+
+    # Outliers may distort the boxplot, not providing relevant information since these are not representative of the market trends.
+    # Therefore, we opted to remove outliers from the boxplot. These may result in slight differences on max values among the Candlestick and the line graph..
+    by_month = df.groupby('yearmonth')['avg_price']
+    q1 = by_month.transform('quantile', 0.25)
+    q3 = by_month.transform('quantile', 0.75)
+    iqr = q3 - q1
+    df = df[(df['avg_price'] >= q1 - 1.5 * iqr) & (df['avg_price'] <= q3 + 1.5 * iqr)]
+
+    # Box statistics of the remaining prices
+    by_month = df.groupby('yearmonth')
+    stats = by_month['avg_price'].quantile([0.25, 0.5, 0.75]).unstack()
+    stats.columns = ['q1', 'median', 'q3']
+    stats = stats.join(by_month['avg_price'].agg(lowerfence='min', upperfence='max', mean='mean'))
+    stats['color'] = by_month['Trend'].first().map(color_map)
+
+    return stats.reset_index()
 
 # Callback to generate update the trend and candlestick char for cattle data
 @callback(
@@ -548,6 +537,8 @@ def update_active_button(btn_all, btn_2yr, btn_1yr, btn_6mo, btn_2mo):
      State('hidden-div-econ', 'children')],
 )
 def update_cattle(location, cattle_type, n1, n2, n3, n4, n5, econ_toggle_switch_on, last_btn):
+    api_key = registry.get('mmn_api_key')
+
     ctx = dash.callback_context
 
     ## Get data from API call
@@ -724,50 +715,28 @@ def update_cattle(location, cattle_type, n1, n2, n3, n4, n5, econ_toggle_switch_
             last_year_df = daily_cattle_sw_location[daily_cattle_sw_location['report_date'] >= one_year_before_max_date]
             last_year_df['yearmonth'] = last_year_df['report_date'].dt.to_period('M')
             last_year_df['yearmonth'] = last_year_df['yearmonth'].astype(str)
-            last_year_df = last_year_df.sort_values(['yearmonth', 'report_date'])
-
-            def calculate_trend(df):
-                if len(df) > 1:
-                    average_price = df['avg_price'].mean()
-                    if df['avg_price'].iloc[-1] > average_price:
-                        return 'Increasing'
-                    elif df['avg_price'].iloc[-1] < average_price:
-                        return 'Decreasing'
-                return np.nan
-
-            trend_df = last_year_df.groupby('yearmonth').apply(calculate_trend).reset_index()
-            trend_df.columns = ['yearmonth', 'Trend']
-            last_year_df = pd.merge(last_year_df, trend_df, on='yearmonth', how='left')
-            last_year_df = last_year_df.dropna(subset=['Trend'])
-            color_map = {'Increasing': 'green', 'Decreasing': 'red'}
-            last_year_df['Color'] = last_year_df['Trend'].map(color_map)
-
-            # Outliers may distort the boxplot, not providing relevant information since these are not representative of the market trends.
-            # Therefore, we opted to remove outliers from the boxplot. These may result in slight differences on max values among the Candlestick and the line graph..
-            # Define the function to remove outliers
-            def remove_outliers(df):
-                Q1 = df['avg_price'].quantile(0.25)
-                Q3 = df['avg_price'].quantile(0.75)
-                IQR = Q3 - Q1
-                lower_bound = Q1 - 1.5 * IQR
-                upper_bound = Q3 + 1.5 * IQR
-                return df[(df['avg_price'] >= lower_bound) & (df['avg_price'] <= upper_bound)]
-
-            # Apply the function on the last_year_df grouped by yearmonth
-            filtered_last_year_df = last_year_df.groupby('yearmonth').apply(remove_outliers).reset_index(drop=True)
 
-            # Create Figure
+            # Monthly statistics for the boxes (outliers removed, see monthly_box_stats)
+            box_stats = monthly_box_stats(last_year_df)
+
+            # Create Figure (one trace per trend color, with the precomputed statistics of each month)
             fig = go.Figure()
-            for i in filtered_last_year_df['yearmonth'].unique():
+            for color, color_stats in box_stats.groupby('color', sort=False):
                 fig.add_trace(
                     go.Box(
-                        y=filtered_last_year_df[filtered_last_year_df['yearmonth'] == i]['avg_price'],
-                        name=i,
-                        marker_color=filtered_last_year_df[filtered_last_year_df['yearmonth'] == i]['Color'].iloc[0],
-                        boxmean=True,
+                        x=color_stats['yearmonth'],
+                        q1=color_stats['q1'],
+                        median=color_stats['median'],
+                        q3=color_stats['q3'],
+                        lowerfence=color_stats['lowerfence'],
+                        upperfence=color_stats['upperfence'],
+                        mean=color_stats['mean'],
+                        marker_color=color,
                         boxpoints=False
                     )
                 )
+            fig.update_layout(boxmode='overlay')
+            fig.update_xaxes(type='category', categoryorder='category ascending')
                 
             # Update layout
             fig.update_layout(
@@ -803,29 +772,10 @@ def update_cattle(location, cattle_type, n1, n2, n3, n4, n5, econ_toggle_switch_
 )
 def update_table(selected_state, cattle_type):
     
-    # If type is not "All", filter by class and grade
-    if cattle_type != "All":
-        daily_cattle_list = daily_top_cattle_data[daily_top_cattle_data['class']== cattle_type]
-    else:
-        daily_cattle_list = daily_top_cattle_data
-
-    # If state is not "All", filter daily_cattle_list by state
-    if selected_state != "All":
-        daily_cattle_list = daily_cattle_list[daily_cattle_list['market_location_state'] == selected_state]
-
-    # Limit data displayed to that updated within the last 15 days
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=15)
-    daily_cattle_list['report_date'] = pd.to_datetime(daily_cattle_list['report_date'])
-    daily_cattle_list = daily_cattle_list[(daily_cattle_list['report_date'] >= start_date) & (daily_cattle_list['report_date'] <= end_date)]
-
-    # Get the average price for each market on the last day recorded
-    grouped_df = daily_cattle_list.groupby(['market_location_name', 'report_date'])['avg_price'].mean().reset_index()
-    # Limit data displayed to 5 markets, sort it and define the format of the avg_price and report_date variables
-    df = grouped_df.sort_values('avg_price', ascending=False).head(5)
-    df['avg_price'] = df['avg_price'].round(2)
-    df['report_date'] = pd.to_datetime(df['report_date']).dt.strftime('%b %d')
-    top5_df = df.sort_values(by='avg_price', ascending=False).head(5)
+    # Top 5 markets from the ranking index, and format of the avg_price and report_date variables
+    top5_df = get_top_markets(selected_state, cattle_type, n=5).copy()
+    top5_df['avg_price'] = top5_df['avg_price'].round(2)
+    top5_df['report_date'] = top5_df['report_date'].dt.strftime('%b %d')
 
     # Create Figure
     fig = go.Figure(data=[go.Table(
@@ -867,52 +817,11 @@ def update_table(selected_state, cattle_type):
      Input('cattle-type-dropdown-cattle', 'value')]  
 )
 def update_price_weight(location, type):
+    price_weight_bins = registry.get('price_weight_bins')
 
-    #If type is not "All", filter by class and grade
-    if type != "All":
-        daily_cattle_type = daily_top_cattle_data[daily_top_cattle_data['class']== type]
-    else:
-        daily_cattle_type = daily_top_cattle_data
-
-    # Prepare data
-    # Filter the rows based on location and date conditions
-    filtered_data = daily_cattle_type[daily_cattle_type['market_location_name'] == location]
-    filtered_data['report_date'] = pd.to_datetime(filtered_data['report_date'])
-    max_date = filtered_data['report_date'].max()
-    filtered_data = filtered_data[(filtered_data['report_date'] == max_date)]
-    
-    # Reshape the dataframe to facilitate representation
-    weights_df = filtered_data[['avg_weight_min', 'avg_weight_max']].melt(var_name='variable', value_name='weight')
-    prices_df = filtered_data[['avg_price_min', 'avg_price_max']].melt(var_name='variable', value_name='price')
-
-    # Group weights into bins for clearer visualization of the data
-    max_weight = weights_df['weight'].max()
-    bins = np.arange(0, max_weight + 51, 50)  # +51 to include the max_weight
-    weights_df['weight_grouped'] = pd.cut(weights_df['weight'], bins=bins, right=True)
-    weights_df['weight_rounded'] = weights_df['weight_grouped'].apply(lambda x: x.right).astype(int)
-
-    # Create the final dataframe to represent by combining weights and prices
-    final_df = pd.DataFrame({
-        'weight': weights_df['weight_rounded'],
-        'price': prices_df['price']
-    })
-
-    # Create Color Gradient from green to red to represent the price trend
-    unique_weights = sorted(final_df['weight'].unique())
+    # Precomputed weight bins for the latest auction of the market
     box_data = []
-    medians = []
-    # Collect the median prices for each weight and store in medians list
-    for weight in unique_weights:
-        price_for_weight = final_df[final_df['weight'] == weight]['price']
-        medians.append(np.median(price_for_weight))
-    # Normalize the median values between 0 and 1
-    normalized_medians = (medians - np.min(medians)) / (np.max(medians) - np.min(medians))
-    # Map normalized values to a color gradient
-    colors = [(int(255 * (1 - val)), int(255 * val), 0) for val in normalized_medians]
-
-    # Create the boxplot for each weight
-    for weight, color in zip(unique_weights, colors):
-        price_for_weight = final_df[final_df['weight'] == weight]['price']
+    for weight, price_for_weight, color in price_weight_bins.get((location, type), []):
         box_data.append(
             go.Box(
                 y=price_for_weight, 
@@ -1005,6 +914,9 @@ def create_forecast_summaries(dff, current_year):
     Input('autocomplete-input', 'value'),
 )
 def econ_update_summary(by_county):
+    gdf_forecast = registry.get('gdf_forecast')
+    counties_gpd = registry.get('counties_gpd')
+    current_year = registry.get('current_year')
     
     # See process_summary_boxes() and update_summary_boxes() in forecast.py for more details
 
@@ -1091,7 +1003,8 @@ def update_markets(selected_state):
     return [{'label': market, 'value': market} for market in markets_sorted]
 
 # Callback to update time range active button
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='econ_hay_button_styles'),
     [Output('btn-all-hay', 'style'),
      Output('btn-2yr-hay', 'style'),
      Output('btn-1yr-hay', 'style'),
@@ -1103,46 +1016,6 @@ def update_markets(selected_state):
      Input('btn-6mo-hay', 'n_clicks'),
      Input('btn-2mo-hay', 'n_clicks')]
 )
-def update_active_button(btn_all, btn_2yr, btn_1yr, btn_6mo, btn_2mo):
-    
-    default_style = {
-        'backgroundColor': 'transparent',
-        'color': '#dbe5f3'
-    }
-
-    active_style = {
-        'backgroundColor': '#dbe5f3',
-        'color': '#282b3f'
-    }
-
-    # Get the id of the button that was clicked
-    ctx = dash.callback_context
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-
-    # If no buttons have been pressed yet, return default styles with btn-all-hay set to active
-    if not ctx.triggered:
-        styles = [default_style for _ in range(5)]
-        styles[0] = active_style  # Make btn-all-hay active
-        return styles
-
-    # Dictionary to map button IDs to their index in the vals list
-    button_indices = {
-        'btn-all-hay': 0,
-        'btn-2yr-hay': 1,
-        'btn-1yr-hay': 2,
-        'btn-6mo-hay': 3,
-        'btn-2mo-hay': 4
-    }
-
-    # Index of the button that was clicked
-    active_button_index = button_indices[button_id]
-    # Start with all buttons having the default style
-    styles = [default_style for _ in range(5)]
-    # Set the active style for the clicked button
-    styles[active_button_index] = active_style
-
-    return styles
-    
 
 # Callback to generate and update the hay graph
 @callback(
@@ -1160,6 +1033,8 @@ def update_active_button(btn_all, btn_2yr, btn_1yr, btn_6mo, btn_2mo):
      State('hidden-div-hay', 'children')],
 )
 def update_hay(location, hay_class, hay_grade, n1, n2, n3, n4, n5, last_btn_hay):
+    api_key = registry.get('mmn_api_key')
+
     ctx = dash.callback_context
 
     ## Get data from API call
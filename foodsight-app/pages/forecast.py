@@ -13,7 +13,7 @@ import janitor
 # Dash imports for web apps
 import dash
 import dash_daq as daq
-from dash import callback, dcc, html, Input, Output, State
+from dash import callback, clientside_callback, ClientsideFunction, dcc, html, Input, Output, State
 import dash_bootstrap_components as dbc
 
 # Geospatial processing and visualization
@@ -37,87 +37,29 @@ import pandas as pd
 from PIL import Image
 # import cv2
 
-# Imports
-import requests
-import boto3
-s3 = boto3.client('s3')
+# Lazy data registry
+from utils.registry import registry
+import utils.datasets  # Registers the datasets shared by the pages
+from utils.mmn import get_data_from_mmnapi
+from utils import background, directional, selection
+from utils.singleflight import single_flight  # Identical concurrent requests share one computation
 
 dash.register_page(__name__)
 
 
 # ------------------------------------------------------------------------------
 # Import and pre-process data
-
-# # ANPP Data
-bucket_name = 'foodsight-lambda'  # Name of the S3 bucket
-## Historic data
-key_path_all_hist_read = 'hist_data/hist_data_grasscast_gp_sw.csv'
-hist_response = s3.get_object(Bucket=bucket_name, Key=key_path_all_hist_read)
-df_hist = pd.read_csv(hist_response['Body'])
-## Forcast data
-key_path_all_forecast_read = 'forecast_data/forecast_data_grasscast_gp_sw.csv'
-forecast_response = s3.get_object(Bucket=bucket_name, Key=key_path_all_forecast_read)
-df_forecast = pd.read_csv(forecast_response['Body'])
-
-# Testing data from local. To speed up the deployment process
-# df_hist = pd.read_csv("../testing_lambda/hist_data_grasscast_gp_sw.csv")
-# df_forecast = pd.read_csv("../testing_lambda/forecast_data_grasscast_gp_sw.csv")
-
-# --------------------------
-# Spatial data
+# ANPP, spatial data and tokens are loaded on first use from the data registry (utils/datasets.py)
 
 ## AOI Grid
 grid_geojson_path = 'static/grasscast_aoi_grid.geojson'
-aoi_grid = gpd.read_file(grid_geojson_path).to_crs(epsg=4326).clean_names()
-# Merging historical and forecast data with grid
-gdf_hist = aoi_grid.merge(df_hist, left_on='gridid', right_on='gridid')
-gdf_forecast = aoi_grid.merge(df_forecast, left_on='gridid', right_on='gridid')
-# Historical plot slider range
-YEARS = gdf_hist['year'].unique().tolist()
-# Grid IDs and AOI dictionary
-aoi_gridids_json_path = 'static/aoi_gridids.json'
-with open(aoi_gridids_json_path, 'r') as file:
-    aoi_gridids = json.load(file)
-
-## Counties
-counties_geojson_path = 'static/grasscast_counties.geojson'
-with open(counties_geojson_path, 'r') as f:
-    counties_geojson = json.load(f)
-counties_gpd = gpd.read_file(counties_geojson_path).to_crs(epsg=4326)
-counties_list = counties_gpd['name'].tolist()
-
-# Mapbox token
-token = open(".mapbox_token").read() # you will need your own token
 
 # --------------------------
 # Market data
 
-## API call function
-def get_data_from_mmnapi(api_key, endpoint):
-    base_url = "https://marsapi.ams.usda.gov"
-    try:
-        response = requests.get(base_url + endpoint, auth=(api_key, ''))
-        
-        if response.status_code == 200:
-            return response.json()
-        else:
-            response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        # Handle request-related errors (e.g., network issues, invalid URLs, timeouts)
-        return "The access to the API is temporarily unavailable"
-    except ValueError as e:
-        # Handle JSON decoding errors
-        return "Error decoding JSON response from the API"
-
-## API key
-api_key = open(".mmn_api_token").read() 
-# It is necessary to obtain an MMN token.
-# More information at https://mymarketnews.ams.usda.gov/mymarketnews-api
-
 ## Cattle markets 
 # (compiled post API evaluation for our Area of Interest)
-with open('data/cattle_markets.json') as json_file:
-    cattle_markets_list = json.load(json_file) 
+cattle_markets_list = registry.get('cattle_markets')
 # Markets list for dropdown menu
 dropdown_options = list(set([item['market_location_name'] for item in cattle_markets_list]))
 dropdown_options = sorted(dropdown_options)
@@ -125,269 +67,266 @@ dropdown_options = sorted(dropdown_options)
 ## Time variables
 # Get the current month
 current_month = datetime.now().month
-# Get the current year
-current_year = datetime.now().year
-# Check if the maximum year in the DataFrame is not equal to the current year
-# Correction for the case when forecast data has not been released for the current year yet (i.e., January-April)
-if df_hist['year'].max() != current_year:
-    # If not, set the current_year to the previous year
-    current_year = current_year - 1
 
 # ------------------------------------------------------------------------------
 # Layout
-layout = html.Div([
-    html.Div(
-        id="app-container",
-        children=[
-            html.Div(
-                id="left-column",
-                children=[
-                    html.Div(
-                        [
-                            html.Div(id='firstText', className='mini_container'),
-                            html.Div(id='secondText', className='mini_container'),
-                            html.Div(id='thirdText', className='mini_container'),
-                            html.Div(id='fourthText', className='mini_container'),
-                            dcc.Store(id='initial_year_text'),
-                            dcc.Store(id='time_range_text'),
-                            dcc.Store(id='lastTriggered'),
-                        ],
-                        id='info-container', className='row container-display'
-                    ),
-                    html.Div(
-                        id="graph-container",
-                        children=[
-                            dcc.Tabs(id="tabs", value='tab-1', children=[
-                                dcc.Tab(
-                                    label='Forecast', value='tab-1',
-                                    children=[
-                                        html.P(id="output_text", children=[]),
-                                        html.Div(
-                                            id="plot-and-switch-container",
-                                            children=[
-                                                html.Div([
-                                                    html.Div(
-                                                        daq.BooleanSwitch(
-                                                            id='my-toggle-switch',
-                                                            on=False,
-                                                        ),
-                                                        style={'display': 'inline-block', 'text-align': 'left', 'padding-left':'3rem'}
-                                                    ),
-                                                ]),
-                                                dcc.Loading(
-                                                    id="loading-3",
-                                                    type="circle",
-                                                    children=dcc.Graph(
-                                                        id='line-plot-2',
-                                                        figure={},
-                                                        style={'visibility': 'hidden'},
-                                                        config={'displayModeBar': False, 'scrollZoom': False}
-                                                    ),
-                                                ),
-                                            ]
-                                        ),
-                                    ]
-                                ),
-                                dcc.Tab(
-                                    label='Historical', value='tab-2',
-                                    children=[
-                                        html.P(id="output_text2", children=[]),
-                                        html.Div(
-                                            id="plot-and-slider-container",
-                                            children=[
-                                                dcc.Loading(
-                                                    id="loading-4",
-                                                    type="circle",
-                                                    children=dcc.Graph(
-                                                        id='line-plot',
-                                                        figure={},
-                                                        style={'visibility': 'hidden'},
-                                                        config={'displayModeBar': False, 'scrollZoom': False}
-                                                    ),
-                                                ),
-                                                dcc.Slider(
-                                                    id="slct_year",
-                                                    min=min(YEARS),
-                                                    max=max(YEARS),
-                                                    value=max(YEARS),
-                                                    step=1,
-                                                    marks={
-                                                        str(min(YEARS)): {"label": str(min(YEARS)), "style": {"color": "#7fafdf"}},
-                                                        str(max(YEARS)): {"label": str(max(YEARS)), "style": {"color": "#7fafdf"}}
-                                                    },
-                                                    tooltip={'always_visible': True, "placement": "bottom"}
-                                                ),
-                                            ]
-                                        ),
-                                        html.Div([
-                                            html.Button('All', id='btn-all-hist', n_clicks=1, className='button-style2'),
-                                            html.Button('30Y', id='btn-30yr-hist', n_clicks=0, className='button-style2'),
-                                            html.Button('20Y', id='btn-20yr-hist', n_clicks=0, className='button-style2'),
-                                            html.Button('10Y', id='btn-10yr-hist', n_clicks=0, className='button-style2'),
-                                        ], className='button-container-hist'),
-                                        html.Div(id='time-range-store', style={'display':'none'}),
-                                        dcc.Store(id='time-range-store2')
-                                    ]
-                                ),
-                            ]),
-                        ],
-                    )
-                ],
-            ),
-            html.Div(
-                id="right-column",
-                children=[
-                    html.Div(
-                        [
-                            html.Div(
-                                [
-                                    html.Label("Where can you find better pastures?", id="compass-summary-title"),
-                                    dbc.Tooltip(
-                                        "This plot indicates the direction to find better pastures, based on the selected distance and either the centroid of the chosen county/map area or the selected point location.",
-                                        target="polar-graph-container",
-                                        placement="bottom",
-                                    ),
-                                    dbc.Tooltip(
-                                        "This plot displays the distribution of ANPP data within the buffer zone, based on the chosen distance. It compares the ANPP values at the centroid of the county or the delineated area on the map, or at the selected point location, with the productivity in the surrounding area.",
-                                        target="graph-bar-container",
-                                        placement="bottom",
-                                    ),
-                                    html.Div(
-                                        [
+def layout():
+    YEARS = registry.get('years')
+    return html.Div([
+        html.Div(
+            id="app-container",
+            children=[
+                html.Div(
+                    id="left-column",
+                    children=[
+                        html.Div(
+                            [
+                                html.Div(id='firstText', className='mini_container'),
+                                html.Div(id='secondText', className='mini_container'),
+                                html.Div(id='thirdText', className='mini_container'),
+                                html.Div(id='fourthText', className='mini_container'),
+                                dcc.Store(id='initial_year_text'),
+                                dcc.Store(id='time_range_text'),
+                                dcc.Store(id='lastTriggered'),
+                            ],
+                            id='info-container', className='row container-display'
+                        ),
+                        html.Div(
+                            id="graph-container",
+                            children=[
+                                dcc.Tabs(id="tabs", value='tab-1', children=[
+                                    dcc.Tab(
+                                        label='Forecast', value='tab-1',
+                                        children=[
+                                            html.P(id="output_text", children=[]),
                                             html.Div(
-                                                [
-                                                    html.Div(
-                                                        id='distance-input-container',
-                                                        children=[
-                                                            html.Label('Distance:', className='inline-label-input'),
-                                                            dcc.Input(
-                                                                id='miles-input',
-                                                                type='number',
-                                                                value=50,
-                                                                min=12,
-                                                                max=500,
-                                                                className='inline-label-input'
+                                                id="plot-and-switch-container",
+                                                children=[
+                                                    html.Div([
+                                                        html.Div(
+                                                            daq.BooleanSwitch(
+                                                                id='my-toggle-switch',
+                                                                on=False,
                                                             ),
-                                                            html.Label('miles', className='inline-label-input'),
-                                                        ],
-                                                    ),
-                                                    html.Div(
-                                                        id='polar-graph-container',
-                                                        children=[
-                                                            dcc.Loading(
-                                                                id="loading-1",
-                                                                type="circle",
-                                                                children=dcc.Graph(
-                                                                    id='polar-graph',
-                                                                    figure={},
-                                                                    style={'visibility': 'hidden'},
-                                                                    config={'displayModeBar': False, 'staticPlot': True}
-                                                                ),
-                                                            )
-                                                        ]
+                                                            style={'display': 'inline-block', 'text-align': 'left', 'padding-left':'3rem'}
+                                                        ),
+                                                    ]),
+                                                    dcc.Loading(
+                                                        id="loading-3",
+                                                        type="circle",
+                                                        children=dcc.Graph(
+                                                            id='line-plot-2',
+                                                            figure={},
+                                                            style={'visibility': 'hidden'},
+                                                            config={'displayModeBar': False, 'scrollZoom': False}
+                                                        ),
                                                     ),
-                                                ],
-                                                className='all-elements-column'
+                                                ]
                                             ),
+                                        ]
+                                    ),
+                                    dcc.Tab(
+                                        label='Historical', value='tab-2',
+                                        children=[
+                                            html.P(id="output_text2", children=[]),
                                             html.Div(
-                                                id='graph-bar-container',
+                                                id="plot-and-slider-container",
                                                 children=[
                                                     dcc.Loading(
-                                                        id="loading-1",
+                                                        id="loading-4",
                                                         type="circle",
-                                                        children=html.Img(id="violin-gradient-plot")
-                                                    )
+                                                        children=dcc.Graph(
+                                                            id='line-plot',
+                                                            figure={},
+                                                            style={'visibility': 'hidden'},
+                                                            config={'displayModeBar': False, 'scrollZoom': False}
+                                                        ),
+                                                    ),
+                                                    dcc.Slider(
+                                                        id="slct_year",
+                                                        min=min(YEARS),
+                                                        max=max(YEARS),
+                                                        value=max(YEARS),
+                                                        step=1,
+                                                        marks={
+                                                            str(min(YEARS)): {"label": str(min(YEARS)), "style": {"color": "#7fafdf"}},
+                                                            str(max(YEARS)): {"label": str(max(YEARS)), "style": {"color": "#7fafdf"}}
+                                                        },
+                                                        tooltip={'always_visible': True, "placement": "bottom"}
+                                                    ),
                                                 ]
                                             ),
-                                        ],
-                                        className='columns-container'
-                                    )
-                                ],
-                                id='compass_loc',
-                                className='mini_container_spatial'
-                            ),
-                            html.Div(
-                                html.Div([
-                                    html.Div([
-                                        dcc.Dropdown(
-                                            id='location-dropdown',
-                                            options=dropdown_options,
-                                            value='Cattlemen\'s Livestock Auction - Belen, NM',  # Default market
-                                            className='my-custom-dropdown'
+                                            html.Div([
+                                                html.Button('All', id='btn-all-hist', n_clicks=1, className='button-style2'),
+                                                html.Button('30Y', id='btn-30yr-hist', n_clicks=0, className='button-style2'),
+                                                html.Button('20Y', id='btn-20yr-hist', n_clicks=0, className='button-style2'),
+                                                html.Button('10Y', id='btn-10yr-hist', n_clicks=0, className='button-style2'),
+                                            ], className='button-container-hist'),
+                                            html.Div(id='time-range-store', style={'display':'none'}),
+                                            dcc.Store(id='time-range-store2'),
+                                            # Years of the historical data (range of the slider buttons)
+                                            dcc.Store(id='hist-years-store', data={'min': int(min(YEARS)), 'max': int(max(YEARS))})
+                                        ]
+                                    ),
+                                ]),
+                            ],
+                        )
+                    ],
+                ),
+                html.Div(
+                    id="right-column",
+                    children=[
+                        html.Div(
+                            [
+                                html.Div(
+                                    [
+                                        html.Label("Where can you find better pastures?", id="compass-summary-title"),
+                                        dbc.Tooltip(
+                                            "This plot indicates the direction to find better pastures, based on the selected distance and either the centroid of the chosen county/map area or the selected point location.",
+                                            target="polar-graph-container",
+                                            placement="bottom",
                                         ),
-                                    ]),
-                                    dcc.Loading(
-                                        id="loading-5",
-                                        type="circle",
-                                        children=dcc.Graph(
-                                            id='indicator-graph',
-                                            config={'displayModeBar': False, 'staticPlot': True},
-                                            style={'visibility': 'hidden'}
+                                        dbc.Tooltip(
+                                            "This plot displays the distribution of ANPP data within the buffer zone, based on the chosen distance. It compares the ANPP values at the centroid of the county or the delineated area on the map, or at the selected point location, with the productivity in the surrounding area.",
+                                            target="graph-bar-container",
+                                            placement="bottom",
                                         ),
-                                    ),
+                                        html.Div(
+                                            [
+                                                html.Div(
+                                                    [
+                                                        html.Div(
+                                                            id='distance-input-container',
+                                                            children=[
+                                                                html.Label('Distance:', className='inline-label-input'),
+                                                                dcc.Input(
+                                                                    id='miles-input',
+                                                                    type='number',
+                                                                    value=50,
+                                                                    min=12,
+                                                                    max=500,
+                                                                    className='inline-label-input'
+                                                                ),
+                                                                html.Label('miles', className='inline-label-input'),
+                                                            ],
+                                                        ),
+                                                        html.Div(
+                                                            id='polar-graph-container',
+                                                            children=[
+                                                                dcc.Loading(
+                                                                    id="loading-1",
+                                                                    type="circle",
+                                                                    children=dcc.Graph(
+                                                                        id='polar-graph',
+                                                                        figure={},
+                                                                        style={'visibility': 'hidden'},
+                                                                        config={'displayModeBar': False, 'staticPlot': True}
+                                                                    ),
+                                                                )
+                                                            ]
+                                                        ),
+                                                    ],
+                                                    className='all-elements-column'
+                                                ),
+                                                html.Div(
+                                                    id='graph-bar-container',
+                                                    children=[
+                                                        dcc.Loading(
+                                                            id="loading-1",
+                                                            type="circle",
+                                                            children=html.Img(id="violin-gradient-plot")
+                                                        )
+                                                    ]
+                                                ),
+                                            ],
+                                            className='columns-container'
+                                        )
+                                    ],
+                                    id='compass_loc',
+                                    className='mini_container_spatial'
+                                ),
+                                html.Div(
                                     html.Div([
-                                        html.Button('ALL', id='btn-all-forecast', n_clicks=1, className='button-style'),
-                                        html.Button('2Y', id='btn-2yr-forecast', n_clicks=0, className='button-style'),
-                                        html.Button('1Y', id='btn-1yr-forecast', n_clicks=0, className='button-style'),
-                                        html.Button('2M', id='btn-6mo-forecast', n_clicks=0, className='button-style'),
-                                        dcc.Link(
-                                            children=html.Button('+ Market info', id='btn-market-info', n_clicks=0, className='button-style-market'),
-                                            href='/econ',
-                                            className="page-link"
+                                        html.Div([
+                                            dcc.Dropdown(
+                                                id='location-dropdown',
+                                                options=dropdown_options,
+                                                value='Cattlemen\'s Livestock Auction - Belen, NM',  # Default market
+                                                className='my-custom-dropdown'
+                                            ),
+                                        ]),
+                                        dcc.Loading(
+                                            id="loading-5",
+                                            type="circle",
+                                            children=dcc.Graph(
+                                                id='indicator-graph',
+                                                config={'displayModeBar': False, 'staticPlot': True},
+                                                style={'visibility': 'hidden'}
+                                            ),
                                         ),
-                                    ], className='button-container-forecast'),
-                                ]),
-                                id='econ_summary',
-                                className='mini_container_spatial'
-                            ),
-                            html.Div(id='hidden-div_econ', style={'display':'none'}),
-                        ],
-                        id='info-container2',
-                    ),
-                    html.Div(
-                        id="heatmap-container",
-                        children=[
-                            html.Div(
-                                id="heatmap-header-container",
-                                children=[
-                                    html.P(id='output_container', children=[]),
-                                    dcc.Checklist(
-                                        id='checkboxes-map',
-                                        options=[
-                                            {'label': 'Great Plains', 'value': 'gp'},
-                                            {'label': 'Southwest', 'value': 'sw'}
-                                        ],
-                                        value=[]
-                                    ),
-                                ]
-                            ),
-                            # dcc.Loading(
-                                # id="loading-2",
-                                # type="circle",
-                                # children=
-                                dcc.Graph(
-                                    id='choropleth-map',
-                                    config={
-                                        'scrollZoom': True,
-                                        'displaylogo': False,
-                                        'displayModeBar': True,
-                                        'modeBarButtonsToRemove':['toImage', 'hoverClosestPie']
-                                    },
-                                    clickData=None,
-                                    figure={},
-                                    style={'visibility': 'hidden'},
+                                        html.Div([
+                                            html.Button('ALL', id='btn-all-forecast', n_clicks=1, className='button-style'),
+                                            html.Button('2Y', id='btn-2yr-forecast', n_clicks=0, className='button-style'),
+                                            html.Button('1Y', id='btn-1yr-forecast', n_clicks=0, className='button-style'),
+                                            html.Button('2M', id='btn-6mo-forecast', n_clicks=0, className='button-style'),
+                                            dcc.Link(
+                                                children=html.Button('+ Market info', id='btn-market-info', n_clicks=0, className='button-style-market'),
+                                                href='/econ',
+                                                className="page-link"
+                                            ),
+                                        ], className='button-container-forecast'),
+                                    ]),
+                                    id='econ_summary',
+                                    className='mini_container_spatial'
                                 ),
-                            # ),
-                            html.Div(id='selected-data-store', style={'display': 'none'}),
-                            html.Div(id='stored-bounds-zoom', style={'display': 'none'}),
-                            html.Div(id='stored-dragmode', style={'display': 'none'}),
-                        ],
-                    ),
-                ],
-            ),
-        ],
-    ),
-])
+                                html.Div(id='hidden-div_econ', style={'display':'none'}),
+                            ],
+                            id='info-container2',
+                        ),
+                        html.Div(
+                            id="heatmap-container",
+                            children=[
+                                html.Div(
+                                    id="heatmap-header-container",
+                                    children=[
+                                        html.P(id='output_container', children=[]),
+                                        dcc.Checklist(
+                                            id='checkboxes-map',
+                                            options=[
+                                                {'label': 'Great Plains', 'value': 'gp'},
+                                                {'label': 'Southwest', 'value': 'sw'}
+                                            ],
+                                            value=[]
+                                        ),
+                                    ]
+                                ),
+                                # dcc.Loading(
+                                    # id="loading-2",
+                                    # type="circle",
+                                    # children=
+                                    dcc.Graph(
+                                        id='choropleth-map',
+                                        config={
+                                            'scrollZoom': True,
+                                            'displaylogo': False,
+                                            'displayModeBar': True,
+                                            'modeBarButtonsToRemove':['toImage', 'hoverClosestPie']
+                                        },
+                                        clickData=None,
+                                        figure={},
+                                        style={'visibility': 'hidden'},
+                                    ),
+                                # ),
+                                html.Div(id='selected-data-store', style={'display': 'none'}),
+                                html.Div(id='stored-bounds-zoom', style={'display': 'none'}),
+                                html.Div(id='stored-dragmode', style={'display': 'none'}),
+                            ],
+                        ),
+                    ],
+                ),
+            ],
+        ),
+    ])
 
 
 # ------------------------------------------------------------------------------
@@ -472,6 +411,7 @@ def create_hist_summaries(df, columns_to_keep, spatial_join=False, polygon=None)
 
 # Text and boxes generation
 def process_summary_boxes(latest_date_rows, current_month, hist_data, time_range_text):
+    current_year = registry.get('current_year')
 
     cat_descriptions = {
         'Below': 'drier than normal',
@@ -571,6 +511,10 @@ def process_summary_boxes(latest_date_rows, current_month, hist_data, time_range
     [Input('time-range-store2', 'data')]
 )
 def update_summary_boxes_content(start_year):
+    gdf_hist = registry.get('gdf_hist')
+    YEARS = registry.get('years')
+    current_year = registry.get('current_year')
+
     # Identify which input triggered the callback
     ctx = dash.callback_context
     triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
@@ -614,7 +558,13 @@ def update_summary_boxes_content(start_year):
      Input('time_range_text', 'data'),
      Input('lastTriggered', 'data')],
 )
+@single_flight
 def update_summary_boxes(clickData, by_county, selected_data_store, initial_year, time_range_text, last_trigger):
+    df_forecast = registry.get('df_forecast')
+    gdf_hist = registry.get('gdf_hist')
+    gdf_forecast = registry.get('gdf_forecast')
+    counties_gpd = registry.get('counties_gpd')
+    current_year = registry.get('current_year')
 
     # Identify which input triggered the callback
     ctx = dash.callback_context
@@ -670,15 +620,15 @@ def update_summary_boxes(clickData, by_county, selected_data_store, initial_year
             text, text2, first_box, second_box, third_box, fourth_box = process_summary_boxes(latest_date_rows, current_month, hist_data, time_range_text)
 
         elif (triggered_id == 'selected-data-store' or last_trigger == 'selected-data-store') and selected_data_store is not None:
-            formatted_selected_data =  json.loads(selected_data_store)
+            selected = selection.from_store(registry.get('grid_index'), selected_data_store)
 
             # Forecast
-            dff_forcast_selected = gdf_forecast[gdf_forecast['gridid'].isin(formatted_selected_data)]
+            dff_forcast_selected = selected.filter(gdf_forecast)
             df_plot = create_forecast_summaries(dff_forcast_selected, current_year)
             latest_date_rows = df_plot[df_plot['report_date'] == df_plot['report_date'].max()]
 
             # Historical
-            dff_hist_selected = gdf_hist_filtered[gdf_hist_filtered['gridid'].isin(formatted_selected_data)]
+            dff_hist_selected = selected.filter(gdf_hist_filtered)
             columns_to_keep_hist = ['gridid', 'year', 'predicted_spring_anpp_lbs_ac', 'predicted_summer_anpp_lbs_ac', 'anpp_lbs_ac', 'geometry']
             hist_data = create_hist_summaries(dff_hist_selected, columns_to_keep_hist, spatial_join=False)
 
@@ -750,7 +700,14 @@ def process_forecast_data(dff_forecast, columns_to_keep, current_year):
      Input('autocomplete-input', 'value'),
      Input('selected-data-store', 'children')]
 )
+@single_flight
 def update_forecast_plot(clickData, on, by_county,selected_data_store):
+    df_forecast = registry.get('df_forecast')
+    gdf_forecast = registry.get('gdf_forecast')
+    aoi_index = registry.get('aoi_index')
+    counties_geojson = registry.get('counties_geojson')
+    counties_gpd = registry.get('counties_gpd')
+    current_year = registry.get('current_year')
     
     ## Select forecast and historical data of interest
 
@@ -770,15 +727,7 @@ def update_forecast_plot(clickData, on, by_county,selected_data_store):
         spring_df = df_plot[(df_plot['Month'] >= 4) & (df_plot['Month'] <= 5)]
         summer_df = df_plot[df_plot['Month'] >= 6]
 
-        def find_aoi_for_gridid(aoi_gridids, id_value):
-            aoi_detected = None
-            for entry in aoi_gridids:
-                if id_value in entry["gridid"]:
-                    aoi_detected = entry["aoi"]
-                    break
-            return aoi_detected
-        
-        aoi_detected = find_aoi_for_gridid(aoi_gridids, id_value)
+        aoi_detected = aoi_index.aoi_of(id_value)
 
     elif triggered_id in ['my-toggle-switch', 'autocomplete-input'] and by_county is not None:
         polygon = counties_gpd.loc[counties_gpd['name'] == by_county]
@@ -801,34 +750,19 @@ def update_forecast_plot(clickData, on, by_county,selected_data_store):
         aoi_detected = find_aoi(counties_geojson, by_county)
 
     elif triggered_id == 'selected-data-store' and selected_data_store is not None:
-        formatted_selected_data =  json.loads(selected_data_store)
+        selected = selection.from_store(registry.get('grid_index'), selected_data_store)
  
         # Forecast
-        # Filter the gdf_forecast DataFrame based on the formatted_selected_data list
-        dff_forcast_selected = gdf_forecast[gdf_forecast['gridid'].isin(formatted_selected_data)]
+        # Filter the gdf_forecast DataFrame based on the selected cells
+        dff_forcast_selected = selected.filter(gdf_forecast)
         columns_to_keep_forcast = ['gridid', 'report_date', 'npp_predict_below', 'npp_predict_avg', 'npp_predict_above',
                                 'cat', 'prob', 'year', 'npp_predict_clim', 'meananppgrid', 'geometry']
         dff_forcast_selected = dff_forcast_selected[columns_to_keep_forcast]
 
         spring_df, summer_df = process_forecast_data(dff_forcast_selected, columns_to_keep_forcast, current_year)
 
-        def find_dominant_aoi(aoi_gridids, formatted_selected_data):
-            all_sw = True
-
-            for grid_id in formatted_selected_data:
-                is_sw = False
-                for entry in aoi_gridids:
-                    if grid_id in entry["gridid"]:
-                        if entry["aoi"] == "sw":
-                            is_sw = True
-                        break
-                if not is_sw:
-                    all_sw = False
-                    break
-
-            return "sw" if all_sw else "gp"  # sw > gp or equal counts set to 'gp' to avoid problems with differences in data split
-            
-        aoi_detected = find_dominant_aoi(aoi_gridids, formatted_selected_data)
+        # sw when every selected cell is in sw, gp otherwise
+        aoi_detected = selected.dominant_aoi()
 
     else:
         def find_aoi(counties_geojson, by_county):
@@ -1137,20 +1071,13 @@ def process_hist_series_data(df):
     return df_plot
 
 # Define y axis range based on the selected AOI
-def apply_aoi_to_hist_series(df, df_to_plot, selected_aoi, aoi_gridids, y_column):
+def apply_aoi_to_hist_series(df, df_to_plot, selected_aoi, aoi_index, y_column):
 
     if len(selected_aoi) == 2 or not selected_aoi:
         y_range = [0, max(df[y_column])]
     else:
-        # Find the corresponding list of gridids for the checkbox value
-        selected_gridids = []
-        for mapping in aoi_gridids:
-            if mapping["aoi"] == selected_aoi[0]:
-                selected_gridids = mapping["gridid"]
-                break
-
-        # Filter DataFrame based on the selected gridids
-        filtered_dff = df[df['gridid'].isin(selected_gridids)]
+        # Filter DataFrame based on the gridids of the checkbox value
+        filtered_dff = df[aoi_index.contains(selected_aoi[0], df['gridid'])]
         y_range = [0, max(filtered_dff[y_column])]
 
     # Compare and adjust y_range based on df_to_plot 
@@ -1173,7 +1100,12 @@ def apply_aoi_to_hist_series(df, df_to_plot, selected_aoi, aoi_gridids, y_column
      Input('initial_year_text', 'data'),
      Input('lastTriggered', 'data')]
 )
+@single_flight
 def update_hist_series_plot(clickData, option_slctd, by_county, selected_data_store, selected_aoi, initial_year, last_trigger):
+    gdf_hist = registry.get('gdf_hist')
+    aoi_index = registry.get('aoi_index')
+    counties_gpd = registry.get('counties_gpd')
+    current_year = registry.get('current_year')
     
     # Identify which input triggered the callback
     ctx = dash.callback_context
@@ -1221,13 +1153,12 @@ def update_hist_series_plot(clickData, option_slctd, by_county, selected_data_st
 
         elif (triggered_id == 'selected-data-store' or last_trigger == 'selected-data-store') and selected_data_store is not None:
 
-            # Get the polygon og the area selected in the map
-            formatted_selected_data =  json.loads(selected_data_store)
+            # Cells of the area selected in the map
+            selected = selection.from_store(registry.get('grid_index'), selected_data_store)
         
-            # Filter data to display
-            columns_to_keep_hist = ['gridid', 'year', 'predicted_spring_anpp_lbs_ac', 'predicted_summer_anpp_lbs_ac', 'predicted_anpp', 'geometry']
-            dff_hist_selected = gdf_copy[gdf_copy['gridid'].isin(formatted_selected_data)][columns_to_keep_hist]
-            df_plot = process_hist_series_data(dff_hist_selected)
+            # Yearly means of the selected cells
+            df_plot = selected.means(gdf_copy, ['predicted_anpp'], by='year')
+            df_plot['year'] = pd.to_datetime(df_plot['year'].astype(str), format='%Y')
 
         else: # default data from county selection
             # Get polygon defining the county area
@@ -1242,7 +1173,7 @@ def update_hist_series_plot(clickData, option_slctd, by_county, selected_data_st
         # Load slider data
         slctd_year = pd.to_datetime(option_slctd, format='%Y')
         # Define range based on selected AOI
-        y_range = apply_aoi_to_hist_series(gdf_copy, df_plot, selected_aoi, aoi_gridids, y_column)
+        y_range = apply_aoi_to_hist_series(gdf_copy, df_plot, selected_aoi, aoi_index, y_column)
 
         # Generate the chart
         fig = go.Figure()
@@ -1289,7 +1220,8 @@ def update_hist_series_plot(clickData, option_slctd, by_county, selected_data_st
 
 # --------------------------
 # Callback function to update the active button for the years range (historical data plot)
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='forecast_hist_last_button'),
     Output("time-range-store2", "data"),
     [Input('btn-all-hist', 'n_clicks'),
      Input('btn-30yr-hist', 'n_clicks'),
@@ -1297,21 +1229,11 @@ def update_hist_series_plot(clickData, option_slctd, by_county, selected_data_st
      Input('btn-10yr-hist', 'n_clicks')],
     [State('time-range-store2', 'data')]
 )
-def update_active_button_hist(btn_all, btn_30yr, btn_20yr, btn_10yr, last_btn_hist_store):
-    
-    ctx = dash.callback_context
-    if not ctx.triggered:
-        return {'last_button': 'btn-all-hist'}
-
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    if button_id in ['btn-30yr-hist', 'btn-20yr-hist', 'btn-10yr-hist', 'btn-all-hist']:
-        return {'last_button': button_id}
-    else:
-        return last_btn_hist_store # If unexpected event, keep the last known value
 
 # --------------------------
 # Callback function to update the active button style (historical data plot)
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='forecast_hist_button_styles'),
     [Output('btn-all-hist', 'style'),
      Output('btn-30yr-hist', 'style'),
      Output('btn-20yr-hist', 'style'),
@@ -1321,42 +1243,11 @@ def update_active_button_hist(btn_all, btn_30yr, btn_20yr, btn_10yr, last_btn_hi
      Input('btn-20yr-hist', 'n_clicks'),
      Input('btn-10yr-hist', 'n_clicks')]
 )
-def update_active_button_hist(btn_all, btn_30yr, btn_20yr, btn_10yr):
-
-    default_style = {
-        'backgroundColor': 'transparent',
-        'color': '#282b3f'
-    }
-    active_style = {
-        'backgroundColor': '#282b3f',
-        'color': '#dbe5f3'
-    }
-
-    ctx = dash.callback_context
-    # If no buttons have been pressed yet, return default styles with btn-all-hist set to active
-    if not ctx.triggered:
-        styles = [default_style for _ in range(4)]
-        styles[0] = active_style  # Make btn-all-hist active
-        return styles
-        
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-
-    button_indices = {
-        'btn-all-hist': 0,
-        'btn-30yr-hist': 1,
-        'btn-20yr-hist': 2,
-        'btn-10yr-hist': 3
-    }
-
-    active_button_index = button_indices[button_id]
-    styles = [default_style for _ in range(4)]
-    styles[active_button_index] = active_style
-
-    return styles
 
 # --------------------------
 # Callback function to update slider range (historical data plot)
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='forecast_hist_slider'),
     [Output('slct_year', 'min'),
      Output('slct_year', 'max'),
      Output('slct_year', 'value'),
@@ -1364,38 +1255,16 @@ def update_active_button_hist(btn_all, btn_30yr, btn_20yr, btn_10yr):
     [Input('btn-all-hist', 'n_clicks'),
      Input('btn-30yr-hist', 'n_clicks'),
      Input('btn-20yr-hist', 'n_clicks'),
-     Input('btn-10yr-hist', 'n_clicks')]
+     Input('btn-10yr-hist', 'n_clicks')],
+    [State('hist-years-store', 'data')]
 )
-def update_slider_hist(all_btn, btn_30yr, btn_20yr, btn_10yr):
-    changed_id = [p['prop_id'] for p in dash.callback_context.triggered][0]
-    
-    if 'btn-all-hist' in changed_id:
-        start_year = min(YEARS)
-    elif 'btn-30yr-hist' in changed_id:
-        start_year = max(YEARS) - 30
-    elif 'btn-20yr-hist' in changed_id:
-        start_year = max(YEARS) - 20
-    elif 'btn-10yr-hist' in changed_id:
-        start_year = max(YEARS) - 10
-    else:
-        start_year = min(YEARS)  # default to all years
-    
-    end_year = max(YEARS)
-
-    return start_year, end_year, end_year, {
-        str(start_year): {
-            "label": str(start_year),
-            "style": {"color": "#7fafdf"},
-        },
-        str(end_year): {
-            "label": str(end_year),
-            "style": {"color": "#7fafdf"},
-        }
-    }
 
 
 ## ----------------------------------------
 ## Callbacks for the spatial comparison ANPP plots
+# Background callbacks (utils/background.py): the buffer overlays take seconds at long distances
+# or with large map selections. The plot is dimmed while its job runs, a new input replaces the
+# running job and leaving the page cancels it.
 
 # --------------------------
 # Polar plot
@@ -1406,9 +1275,17 @@ def update_slider_hist(all_btn, btn_30yr, btn_20yr, btn_10yr):
      Input('miles-input', 'value'),
      Input('choropleth-map', 'clickData'),
      Input('slct_year', 'value'),
-     Input('selected-data-store', 'children')]
+     Input('selected-data-store', 'children')],
+    background=True,
+    interval=background.interval,
+    running=[(Output('polar-graph-container', 'className'), 'updating', '')],
+    cancel=[Input('url', 'pathname')]
 )
+@single_flight
 def update_polar(by_county, miles, clickData, option_slctd, selected_data_store):
+    df_forecast = registry.get('df_forecast')
+    gdf_hist = registry.get('gdf_hist')
+    counties_gpd = registry.get('counties_gpd')
 
     dff = gdf_hist[gdf_hist["year"] == option_slctd]
 
@@ -1459,11 +1336,7 @@ def update_polar(by_county, miles, clickData, option_slctd, selected_data_store)
 
     # Location based on area selected centroid
     elif triggered_id in ['miles-input','slct_year', 'selected-data-store'] and selected_data_store is not None:
-        formatted_selected_data =  json.loads(selected_data_store)
-        dff_forcast_selected = gdf_forecast[gdf_forecast['gridid'].isin(formatted_selected_data)]
-        combined_geometry = dff_forcast_selected.geometry.unary_union
-        single_polygon = combined_geometry.convex_hull
-        centroid = single_polygon.centroid
+        centroid = selection.from_store(registry.get('grid_index'), selected_data_store).centroid()
         point = Point(centroid.x, centroid.y)
 
     else: # default data from county selection
@@ -1487,28 +1360,11 @@ def update_polar(by_county, miles, clickData, option_slctd, selected_data_store)
     inter = gpd.overlay(dff, buffer_gdf, how='intersection')
     circle_centroid = buffer_gdf.geometry.centroid.iloc[0]
 
-    # Prepare data for polar chart
-    sums_and_counts = []
-    for _, poly in inter.iterrows():
-        center = poly.geometry.centroid
-        direction = np.arctan2(center.y - circle_centroid.y, center.x - circle_centroid.x)
-        sums_and_counts.append((direction, poly['predicted_anpp']))
-
-    grouped_data = {}
-    for direction, value in sums_and_counts:
-        direction_degrees = np.degrees(direction) 
-        direction_degrees = (direction_degrees - 90) % 360  
-        direction_degrees = (360 - direction_degrees) % 360  
-        direction_rounded = np.round(direction_degrees / 20) * 20
-        direction_rounded = 0 if direction_rounded == 360 else direction_rounded
-
-        if direction_rounded in grouped_data:
-            grouped_data[direction_rounded].append(value)
-        else:
-            grouped_data[direction_rounded] = [value]
-
-    means_and_dirs_rounded = [(direction, np.mean(values)) for direction, values in grouped_data.items()]
-    dirs_rounded, means_rounded = zip(*means_and_dirs_rounded)
+    # Prepare data for polar chart: mean ANPP per 20° sector around the location
+    grid_index = registry.get('grid_index')
+    cells = inter['cell'].to_numpy()
+    directions = directional.bearings(grid_index.x[cells], grid_index.y[cells], circle_centroid.x, circle_centroid.y)
+    dirs_rounded, means_rounded = directional.sector_means(directions, inter['predicted_anpp'])
 
     df = pd.DataFrame({
         'direction': dirs_rounded,
@@ -1555,8 +1411,16 @@ def update_polar(by_county, miles, clickData, option_slctd, selected_data_store)
      Input('choropleth-map', 'clickData'),
      Input('slct_year', 'value'),
      Input('selected-data-store', 'children')],
+    background=True,
+    interval=background.interval,
+    running=[(Output('graph-bar-container', 'className'), 'updating', '')],
+    cancel=[Input('url', 'pathname')]
     )
+@single_flight
 def update_violin_gradient_plot(by_county, miles, clickData, option_slctd,selected_data_store):
+    df_forecast = registry.get('df_forecast')
+    gdf_hist = registry.get('gdf_hist')
+    counties_gpd = registry.get('counties_gpd')
 
     dff = gdf_hist[gdf_hist["year"] == option_slctd]
 
@@ -1607,11 +1471,7 @@ def update_violin_gradient_plot(by_county, miles, clickData, option_slctd,select
 
     # Location based on area selected centroid
     elif triggered_id in ['miles-input','slct_year', 'selected-data-store'] and selected_data_store is not None:
-        formatted_selected_data =  json.loads(selected_data_store)
-        dff_forcast_selected = gdf_forecast[gdf_forecast['gridid'].isin(formatted_selected_data)]
-        combined_geometry = dff_forcast_selected.geometry.unary_union
-        single_polygon = combined_geometry.convex_hull
-        centroid = single_polygon.centroid
+        centroid = selection.from_store(registry.get('grid_index'), selected_data_store).centroid()
         point = Point(centroid.x, centroid.y)
 
     else: # default data from county selection
@@ -1747,7 +1607,9 @@ def update_violin_gradient_plot(by_county, miles, clickData, option_slctd,select
      Input('btn-6mo-forecast', 'n_clicks'),
      State('hidden-div_econ', 'children')],
 )
+@single_flight
 def update_econ(location, n1, n2, n3, n4, last_btn):
+    api_key = registry.get('mmn_api_key')
 
     ctx = dash.callback_context
 
@@ -1894,7 +1756,8 @@ def update_econ(location, n1, n2, n3, n4, last_btn):
     
 # --------------------------
 # Callback function to update the active button style (Econ data plot)
-@callback(
+clientside_callback(
+    ClientsideFunction(namespace='ui', function_name='forecast_econ_button_styles'),
     [Output('btn-all-forecast', 'style'),
      Output('btn-2yr-forecast', 'style'),
      Output('btn-1yr-forecast', 'style'),
@@ -1906,36 +1769,6 @@ def update_econ(location, n1, n2, n3, n4, last_btn):
      Input('btn-6mo-forecast', 'n_clicks')
     ]
 )
-def update_active_button_econ(btn_5yr, btn_2yr, btn_1yr, btn_2mo):
-
-    default_style = {'backgroundColor': 'transparent', 'color': '#dbe5f3'}
-    active_style = {'backgroundColor': '#dbe5f3', 'color': '#282b3f'}
-
-    ctx = dash.callback_context
-    # If no buttons have been pressed yet, return default styles with btn-all-forecast set to active
-    if not ctx.triggered:
-        styles = [default_style for _ in range(4)]
-        styles[0] = active_style  # Make btn-all-forecast active
-        return styles
-
-    # Get the id of the button that was clicked
-    button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-    # Dictionary to map button IDs to their index in the vals list
-    button_indices = {
-        'btn-all-forecast': 0,
-        'btn-2yr-forecast': 1,
-        'btn-1yr-forecast': 2,
-        'btn-6mo-forecast': 3
-    }
-
-    # Index of the button that was clicked
-    active_button_index = button_indices[button_id]
-    # Initial default style
-    styles = [default_style for _ in range(4)]
-    # Set the active style for the clicked button
-    styles[active_button_index] = active_style
-
-    return styles
 
 
 # --------------------------
@@ -1967,7 +1800,14 @@ def update_stored_dragmode(relayoutData, stored_dragmode):
      Input('stored-bounds-zoom', 'data'),
      Input('stored-dragmode', 'data')]
 )
+@single_flight
 def update_choropleth_map(option_slctd, autocomplete, selected_aoi, relayoutData, stored_values, stored_dragmode):
+    df_hist = registry.get('df_hist')
+    df_forecast = registry.get('df_forecast')
+    aoi_index = registry.get('aoi_index')
+    counties_geojson = registry.get('counties_geojson')
+    counties_gpd = registry.get('counties_gpd')
+    token = registry.get('mapbox_token')
 
     # Set zoom and bounds for the map based on triggers
 
@@ -2066,14 +1906,8 @@ def update_choropleth_map(option_slctd, autocomplete, selected_aoi, relayoutData
     if len(selected_aoi) == 2 or not selected_aoi:
         filtered_dff = dff
     else:
-        # Find the corresponding list of gridids for the checkbox value
-        selected_gridids = []
-        for mapping in aoi_gridids:
-            if mapping["aoi"] == selected_aoi[0]:
-                selected_gridids = mapping["gridid"]
-                break
-        # Filter dataframe based on the selected gridids
-        filtered_dff = dff[dff['gridid'].isin(selected_gridids)]
+        # Filter dataframe based on the gridids of the checkbox value
+        filtered_dff = dff[aoi_index.contains(selected_aoi[0], dff['gridid'])]
 
 
     # Create the choropleth map
@@ -2124,6 +1958,8 @@ def update_choropleth_map(option_slctd, autocomplete, selected_aoi, relayoutData
     Input('autocomplete-input', 'value')
 )
 def update_aoi_checklist(selected_county):
+    counties_geojson = registry.get('counties_geojson')
+
     selected_entry = next((feature for feature in counties_geojson['features'] 
                            if feature['properties']['name'] == selected_county), None)
     # Determine the checklist value based on state_usps variable
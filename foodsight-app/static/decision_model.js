@@ -0,0 +1,473 @@
+// ------------------------------------------------------------------------------
+// Herd strategy model for the drought decision tool (browser version)
+//
+// Port of utils/herd_model.py for a single parameter set, used by the decision page
+// clientside callback so input edits are computed in the browser. Keep both files in
+// sync: tools/check_decision_model_js.py compares them on random parameter sets.
+
+(function (root) {
+
+    // ------------------------------------------------------------------------------
+    // Constants
+
+    var STRATEGIES = ["Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"];
+    var YEARS = 5;
+    // SE, US Income and CO Income taxes
+    var TAX_RATE = 0.124 + 0.15 + 0.04;
+    // Truck capacity (lbs)
+    var TRUCK_CAPACITY = 40000;
+
+    // Same order as the fields of HerdParameters (and the callback inputs)
+    var PARAMETER_NAMES = [
+        "herd_size", "avg_cow_weight", "current_value_cow", "cows_culled", "annual_cow_costs",
+        "avg_weaning_percentage", "percent_calves_sold", "current_weight_calves", "weight_at_weaning",
+        "current_price_per_lb", "price_weaning_year1", "price_weaning_year2", "price_weaning_years3_5",
+        "current_month", "current_year", "drought_end_month", "drought_end_year",
+        "interest_borrowed_money", "interest_invested_money", "tax_basis_cow", "capital_gains_tax_rate",
+        "hay_lbs_day", "hay_per_ton", "other_lbs_day", "other_per_ton",
+        "distance_to_pasture", "trucking_cost", "pasture_rent", "days_rented_pasture", "calf_death_loss",
+        "weaning_weight_adjustment", "total_other_costs",
+        "reduced_operating_costs_year1", "operating_costs_year2", "operating_costs_years3_5", "selling_costs",
+        "cost_replacement_animals"
+    ];
+
+    function sum(values) {
+        return values.reduce(function (a, b) { return a + b; }, 0);
+    }
+
+    function add(a, b) {
+        return a.map(function (value, i) { return value + b[i]; });
+    }
+
+    // ------------------------------------------------------------------------------
+    // Model
+
+    // Drought period (hidden drought table)
+    function drought(p) {
+        var years = [p.current_year];
+        var months = [12 - p.current_month];
+        var gap = p.drought_end_year - p.current_year;
+        // Row holding the drought end year (0 when the drought ends this year)
+        var endRow = gap >= 1 ? gap : (gap < 0 ? 1 : 0);
+        for (var offset = 1; offset < YEARS; offset++) {
+            if (offset < endRow) {
+                years.push(p.current_year + offset);
+                months.push(p.current_year + offset < 2000 ? 0 : 12);
+            } else if (offset === endRow) {
+                years.push(p.drought_end_year);
+                months.push(p.drought_end_month);
+            } else {
+                years.push(offset - endRow - 1);
+                months.push(0);
+            }
+        }
+        var days = months.map(function (m) { return m * 30; });
+        return {
+            years: years,
+            months: months,
+            days: days,
+            total_months: sum(months),
+            total_days: sum(days)
+        };
+    }
+
+    // Option 1: Buy feed
+    function feed(p, d) {
+        var costPerDay = p.hay_lbs_day * (p.hay_per_ton / 2000) + p.other_lbs_day * (p.other_per_ton / 2000);
+        // Days of additional feed: this year, average and whole drought
+        var days = [d.days[0], (d.total_days + d.days[0]) / 2, d.total_days];
+        var perCow = days.map(function (value) { return costPerDay * value; });
+        return {
+            cost_per_day: costPerDay,
+            days: days,
+            per_cow: perCow,
+            per_herd: perCow.map(function (value) { return value * p.herd_size; })
+        };
+    }
+
+    // Calves sold and trucks (hidden truck table)
+    function calves(p) {
+        var calvesToSell = p.herd_size * (p.percent_calves_sold / 100);
+        var actualCalvesSold = calvesToSell - p.calf_death_loss;
+        var actualSellingWeight = p.weight_at_weaning * (1 + (p.weaning_weight_adjustment / 100));
+        var expectedCalfSales = calvesToSell * p.weight_at_weaning * p.price_weaning_year1;
+        var actualCalfSales = actualCalvesSold * actualSellingWeight * p.price_weaning_year1;
+        var pairsPerTruck = Math.ceil(TRUCK_CAPACITY / (p.avg_cow_weight + p.current_weight_calves));
+        var cowsPerTruck = Math.ceil(TRUCK_CAPACITY / p.avg_cow_weight);
+        return {
+            calves_to_sell: calvesToSell,
+            actual_calves_sold: actualCalvesSold,
+            actual_selling_weight: actualSellingWeight,
+            expected_calf_sales: expectedCalfSales,
+            actual_calf_sales: actualCalfSales,
+            difference_sales: expectedCalfSales - actualCalfSales,
+            pairs_per_truck: pairsPerTruck,
+            cows_per_truck: cowsPerTruck,
+            trucks_needed_pairs: Math.ceil(p.herd_size / pairsPerTruck),
+            trucks_needed_cows: Math.ceil(p.herd_size / cowsPerTruck)
+        };
+    }
+
+    // Option 2: Rent pasture
+    // Items: trucking pairs to pasture, trucking cows to home, pasture rent, other costs,
+    // lost revenues, interest and total
+    function rentPasture(p, c) {
+        var truckingPairs = p.distance_to_pasture * p.trucking_cost * c.trucks_needed_pairs;
+        var truckingCows = p.distance_to_pasture * p.trucking_cost * c.trucks_needed_cows;
+        var rent = (p.pasture_rent / 30) * p.days_rented_pasture * p.herd_size;
+        var otherCosts = p.total_other_costs;
+        var lostRevenues = c.difference_sales;
+        var interest = (truckingPairs + truckingCows + rent + otherCosts) * (((p.interest_borrowed_money / 100) / 360) * p.days_rented_pasture);
+        var total = truckingPairs + truckingCows + rent + otherCosts + lostRevenues + interest;
+        var perHerd = [truckingPairs, truckingCows, rent, otherCosts, lostRevenues, interest, total];
+        return {
+            per_herd: perHerd,
+            per_cow: perHerd.map(function (value) { return value / p.herd_size; }),
+            total: total
+        };
+    }
+
+    // Option 3: Sell and replace
+    function sellAndReplace(p, d) {
+        var firstDays = d.days[0];
+        var calvesSold = p.herd_size * (p.percent_calves_sold / 100);
+        var investedRate = p.interest_invested_money / 100;
+
+        // Hidden table 3
+        var expectedCalfSalesCurrentYear = calvesSold * p.weight_at_weaning * p.price_weaning_year1;
+        var actualCalfSales = (p.herd_size * (p.avg_weaning_percentage / 100)) * p.current_weight_calves * p.current_price_per_lb;
+        var difference = expectedCalfSalesCurrentYear - actualCalfSales;
+        var expectedCalfSalesYear2 = calvesSold * p.weight_at_weaning * p.price_weaning_year2;
+        var expectedCalfSalesYear3 = calvesSold * p.weight_at_weaning * p.price_weaning_years3_5;
+        var cowSales = p.herd_size * p.current_value_cow;
+        var interestIncomeYear1 = cowSales * firstDays * (investedRate / 360);
+        var interestIncomeYear2 = (cowSales + interestIncomeYear1) * investedRate;
+        var interestIncomeYear3 = (cowSales + interestIncomeYear1 + interestIncomeYear2) * investedRate;
+
+        // Additional costs per herd
+        var reducedCalfSales = difference;
+        var reducedOpCostsThisYear = p.reduced_operating_costs_year1 * p.herd_size;
+        var additionalCostsSellingCows = p.selling_costs * p.herd_size;
+        var interestCowSales = -1 * (cowSales * firstDays * (investedRate / 360));
+        var totalYear1 = reducedCalfSales + reducedOpCostsThisYear + additionalCostsSellingCows + interestCowSales;
+        var revenuesFromCowSales = -1 * ((p.herd_size - p.cows_culled) * p.current_value_cow);
+        var interestIncomeYears23 = -1 * (interestIncomeYear1 + interestIncomeYear2 + interestIncomeYear3);
+        var expectedCalfSalesYears23 = expectedCalfSalesYear2 + expectedCalfSalesYear3;
+        var reducedOpExpensesYears23 = -1 * ((2 * (p.herd_size * p.annual_cow_costs)) - (p.operating_costs_year2 + p.operating_costs_years3_5));
+        var replacementCows = p.cost_replacement_animals * p.herd_size;
+        var totalYears23 = revenuesFromCowSales + interestIncomeYears23 + expectedCalfSalesYears23 + reducedOpExpensesYears23 + replacementCows;
+
+        var perHerd = [
+            reducedCalfSales, reducedOpCostsThisYear, additionalCostsSellingCows, interestCowSales, totalYear1,
+            revenuesFromCowSales, interestIncomeYears23, expectedCalfSalesYears23, reducedOpExpensesYears23,
+            replacementCows, totalYears23, totalYear1 + totalYears23
+        ];
+        return {
+            expected_calf_sales_current_year: expectedCalfSalesCurrentYear,
+            actual_calf_sales: actualCalfSales,
+            difference: difference,
+            expected_calf_sales_year2: expectedCalfSalesYear2,
+            expected_calf_sales_year3: expectedCalfSalesYear3,
+            cow_sales: cowSales,
+            initial_money_invested: cowSales,
+            interest_income_year1: interestIncomeYear1,
+            interest_income_year2: interestIncomeYear2,
+            interest_income_year3: interestIncomeYear3,
+            per_herd: perHerd,
+            per_cow: perHerd.map(function (value) { return value / p.herd_size; })
+        };
+    }
+
+    // Five-year net worth of each strategy
+    // Year rows hold one value per strategy; year 1 has no interest nor replacement
+    // purchases, and only year 1 has capital sales and gains
+    function netWorth(p, d, f, r, s) {
+        var herdSize = p.herd_size;
+        var cowCosts = herdSize * p.annual_cow_costs;
+        var reducedCowCosts = -herdSize * (p.annual_cow_costs - p.reduced_operating_costs_year1);
+        var calvesSold = herdSize * (p.percent_calves_sold / 100);
+        var investedRate = p.interest_invested_money / 100;
+        var borrowedRate = p.interest_borrowed_money / 100;
+        var prices = [p.price_weaning_year1, p.price_weaning_year2, p.price_weaning_years3_5, p.price_weaning_years3_5, p.price_weaning_years3_5];
+
+        // Starting position (same for every strategy)
+        var cows = herdSize * p.current_value_cow;
+        var calfValue = (p.percent_calves_sold / 100) * p.current_weight_calves * p.current_price_per_lb;
+        var cash = -(herdSize * p.annual_cow_costs - herdSize * p.reduced_operating_costs_year1);
+        var start = [cows, calfValue, cash, cows + calfValue + cash].map(function (value) {
+            return STRATEGIES.map(function () { return value; });
+        });
+
+        var rows = {};
+        ["revenues", "operating_costs", "interest", "profits", "taxes", "after_tax_income",
+         "capital_sales", "capital_gains", "purchase_females", "cows", "cash", "total"].forEach(function (name) { rows[name] = []; });
+
+        for (var year = 0; year < YEARS; year++) {
+            var price = prices[year];
+            var expected = calvesSold * p.weight_at_weaning * price;
+            var droughtRevenue = (calvesSold - p.calf_death_loss) * (p.weight_at_weaning * (1 + (p.weaning_weight_adjustment / 100))) * price;
+            var rented = p.current_year + year < p.drought_end_year ? droughtRevenue : expected;
+            var revenues, operatingCosts, interest;
+
+            if (year === 0) {
+                // Sell strategies collect the current calf sales this year
+                revenues = [expected, expected, rented, s.actual_calf_sales, s.actual_calf_sales];
+                operatingCosts = [-herdSize * p.annual_cow_costs,
+                                  -(cowCosts + (d.days[0] * f.cost_per_day * herdSize)),
+                                  -(cowCosts + r.total),
+                                  reducedCowCosts, reducedCowCosts];
+                interest = [0, 0, 0, 0, 0];
+            } else {
+                var restocked = p.current_year + year > p.drought_end_year ? expected : 0;
+                revenues = [expected, expected, rented, restocked, 0];
+                // Drought costs only while the year has drought days (the last year reuses the
+                // months of year 4, as the original worksheet does)
+                var droughtDays = d.days[year];
+                var droughtMonths = d.months[Math.min(year, YEARS - 2)];
+                operatingCosts = [-herdSize * p.annual_cow_costs,
+                                  droughtDays > 0 ? -(cowCosts + (droughtDays * f.cost_per_day * herdSize)) : -cowCosts,
+                                  droughtDays > 0 ? -(cowCosts + (droughtMonths * p.pasture_rent * herdSize)) : -cowCosts,
+                                  restocked === 0 ? -p.operating_costs_year2 : -cowCosts,
+                                  -p.operating_costs_year2];
+                interest = rows.cash[year - 1].map(function (value) {
+                    return value > 0 ? value * investedRate : value * borrowedRate;
+                });
+            }
+
+            var profits = year ? add(add(revenues, operatingCosts), interest) : add(revenues, operatingCosts);
+            var taxes = profits.map(function (value) { return value > 0 ? value * TAX_RATE : 0; });
+            var afterTaxIncome = profits.map(function (value, i) { return value - taxes[i]; });
+            var capitalSales, capitalGains, purchaseFemales, cowsWorth, cashWorth;
+
+            if (year === 0) {
+                capitalSales = [0, 0, 0, cows, cows];
+                capitalGains = [0, 0, 0, 0, (herdSize * (p.current_value_cow - p.tax_basis_cow)) * (p.capital_gains_tax_rate / 100)];
+                purchaseFemales = [0, 0, 0, 0, 0];
+                cowsWorth = capitalSales.map(function (value) { return cows - value; });
+                cashWorth = afterTaxIncome.map(function (value, i) { return value + capitalSales[i] - capitalGains[i]; });
+            } else {
+                capitalSales = [0, 0, 0, 0, 0];
+                capitalGains = [0, 0, 0, 0, 0];
+                var purchase = p.current_year + year === p.drought_end_year ? herdSize * p.cost_replacement_animals : 0;
+                purchaseFemales = [0, 0, 0, purchase, 0];
+                var previousCows = rows.cows[year - 1];
+                var keptHerd = purchase > 0 ? herdSize * p.cost_replacement_animals : previousCows[0] + purchase;
+                cowsWorth = [keptHerd, keptHerd, keptHerd, previousCows[3] + purchase, previousCows[4]];
+                // Replacement purchases are paid from cash from year 3 on
+                var previousCash = rows.cash[year - 1];
+                cashWorth = afterTaxIncome.map(function (value, i) {
+                    return year === 1 ? previousCash[i] + value : previousCash[i] + value - purchaseFemales[i];
+                });
+            }
+
+            var values = [revenues, operatingCosts, interest, profits, taxes, afterTaxIncome, capitalSales, capitalGains,
+                          purchaseFemales, cowsWorth, cashWorth, add(cowsWorth, cashWorth)];
+            Object.keys(rows).forEach(function (name, i) { rows[name].push(values[i]); });
+        }
+
+        var projection = rows;
+        projection.start = start;
+        var startTotal = start[3];
+        var change = rows.total[YEARS - 1].map(function (value, i) { return value - startTotal[i]; });
+        projection.change_total = change;
+        projection.change_per_cow = change.map(function (value) { return value / herdSize; });
+        projection.change_percent = change.map(function (value, i) { return (value / startTotal[i]) * 100; });
+        return projection;
+    }
+
+    // Every part of the model for one parameter set (object keyed by PARAMETER_NAMES)
+    function evaluate(p) {
+        var d = drought(p);
+        var f = feed(p, d);
+        var c = calves(p);
+        var r = rentPasture(p, c);
+        var s = sellAndReplace(p, d);
+        return {
+            drought: d,
+            feed: f,
+            calves: c,
+            rent_pasture: r,
+            sell_and_replace: s,
+            net_worth: netWorth(p, d, f, r, s)
+        };
+    }
+
+    // ------------------------------------------------------------------------------
+    // Page outputs
+
+    // Table cells as the server would send them (nan/inf become empty cells)
+    function cell(value) {
+        return isFinite(value) ? value : null;
+    }
+
+    function records(columns, rows) {
+        return rows.map(function (row) {
+            var record = {};
+            columns.forEach(function (column, i) { record[column] = typeof row[i] === "number" ? cell(row[i]) : row[i]; });
+            return record;
+        });
+    }
+
+    // Rows of a table with one column per strategy
+    function strategyRecords(labels, rows) {
+        return records([""].concat(STRATEGIES), labels.map(function (label, i) { return [label].concat(rows[i]); }));
+    }
+
+    // Python's round(): halves go to the even integer
+    function roundHalfEven(value) {
+        var rounded = Math.round(value);
+        return Math.abs(value % 1) === 0.5 ? 2 * Math.round(value / 2) : rounded;
+    }
+
+    // Python's str() of a rounded float (e.g. 12.0)
+    function formatFloat(value) {
+        if (isNaN(value)) { return "nan"; }
+        if (!isFinite(value)) { return value > 0 ? "inf" : "-inf"; }
+        return Number.isInteger(value) && Math.abs(value) < 1e16 ? value.toFixed(1) : String(value);
+    }
+
+    function strategyDisplayName(strategy) {
+        return strategy === "Buy feed" ? "acquiring feed" :
+               strategy === "Rent pasture" ? "renting additional pasture" :
+               strategy === "Replace" ? "replacing cows" :
+               "not replacing cows";
+    }
+
+    function component(type, props) {
+        return {namespace: "dash_html_components", type: type, props: props};
+    }
+
+    function span(text, className) {
+        return component("Span", {children: text, className: className});
+    }
+
+    function arrow(direction) {
+        return component("I", {
+            children: null,
+            className: "fa fa-arrow-" + (direction === "increase" ? "up" : "down"),
+            style: {"color": "#cf8b0e", "font-size": "15px", "vertical-align": "middle"}
+        });
+    }
+
+    // Summary sentence with the least and most profitable strategies
+    function summarySentence(changePercent) {
+        var minIndex = -1, maxIndex = -1;
+        changePercent.forEach(function (value, i) {
+            if (isNaN(value)) { return; }
+            if (minIndex < 0 || value < changePercent[minIndex]) { minIndex = i; }
+            if (maxIndex < 0 || value > changePercent[maxIndex]) { maxIndex = i; }
+        });
+        var minValue = roundHalfEven(changePercent[minIndex]);
+        var maxValue = roundHalfEven(changePercent[maxIndex]);
+        var minDirection = minValue > 0 ? "increase" : "decrease";
+        var maxDirection = maxValue > 0 ? "increase" : "decrease";
+
+        return component("Div", {id: "summary-decision-text", children: [
+            span("When considering strategies in the face of a potential drought—based on the parameters outlined earlier—, ", "text-style"),
+            span(strategyDisplayName(STRATEGIES[minIndex]), "variable-style"),
+            span(" is expected to be the least profitable choice, with a projected net worth ", "text-style"),
+            arrow(minDirection),
+            span(" " + minDirection + " of ", "variable-style"),
+            span(formatFloat(Math.abs(minValue)) + "%", "variable-style"),
+            span(" over 5 years. Conversely, the strategy of ", "text-style"),
+            span(strategyDisplayName(STRATEGIES[maxIndex]), "variable-style"),
+            span(" holds promise, with a potential net worth ", "text-style"),
+            arrow(maxDirection),
+            span(" " + maxDirection + " of ", "variable-style"),
+            span(formatFloat(Math.abs(maxValue)) + "%.", "variable-style")
+        ]});
+    }
+
+    // Outputs of the decision page, in the order of the update_decision callback outputs
+    function decisionOutputs(p) {
+        var model = evaluate(p);
+
+        // Option 1: Buy feed
+        var feedTable = records(["Add'l Feed", "Per Cow", "Per Herd"], model.feed.days.map(function (days, i) {
+            return [days, model.feed.per_cow[i], model.feed.per_herd[i]];
+        }));
+
+        // Option 2: Rent pasture
+        var option2 = records(["", "Per Cow", "Per Herd"],
+            ["Trucking Pairs to Pasture", "Trucking Cows to Home", "Pasture Rent", "Other Costs", "Lost Revenues", "Interest", "Total"].map(function (label, i) {
+                return [label, model.rent_pasture.per_cow[i], model.rent_pasture.per_herd[i]];
+            }));
+
+        // Option 3: Sell and replace
+        var option3 = records(["", "Additional Costs Per Cow", "Additional Costs Per Herd"],
+            ["Reduced Calf Sales This Year", "Reduced Operating Costs, This Year", "Additional Costs for Selling Cows",
+             "Interest on Cow Sales Revenues", "Total, Year 1", "Revenues from Cow Sales", "Interest Income, Years 2+3",
+             "Expected Calf Sales, Years 2+3", "Reduced Operating Expenses, Yrs 2+3", "Replacement Cows",
+             "Total, Years 2 & 3", "Total for 3 Years"].map(function (label, i) {
+                return [label, model.sell_and_replace.per_cow[i], model.sell_and_replace.per_herd[i]];
+            }));
+
+        // Tables 1 to 5 (one per year)
+        var projection = model.net_worth;
+        var compareLabels = [];
+        var yearTables = [];
+        for (var year = 0; year < YEARS; year++) {
+            var labels, rows;
+            compareLabels.push(p.current_year + year);
+            if (year === 0) {
+                labels = ["Revenues from Calves", "Operating Costs (typical + adjustments)", "Profits",
+                          "Taxes (SE, US Income, CO Income)", "After Tax Income", "Capital Sales - Cow Sales", "Capital Gains"];
+                rows = ["revenues", "operating_costs", "profits", "taxes", "after_tax_income", "capital_sales", "capital_gains"];
+            } else {
+                labels = ["Revenues from Calves", "Operating expenses", "Interest Income/Expenses", "Profits",
+                          "Taxes (SE, US Income, CO Income)", "After Tax Income",
+                          year === 1 ? "Purchase Replacement Females" : "Purchase replacement Females"];
+                rows = ["revenues", "operating_costs", "interest", "profits", "taxes", "after_tax_income", "purchase_females"];
+            }
+            yearTables.push(strategyRecords(labels, rows.map(function (row) { return projection[row][year]; })));
+            yearTables.push(strategyRecords(["Ending Net Worth - Cows", "Ending Net Worth - Cash", "Total ($)"],
+                ["cows", "cash", "total"].map(function (row) { return projection[row][year]; })));
+        }
+
+        var currentSummary = strategyRecords(["Cows", "Calves", "Cash", "Total ($)"], projection.start);
+
+        // Summary table
+        var summary = records([""].concat(STRATEGIES), [["Change in net worth over 5 years", "", "", "", "", ""]].concat(
+            [["Total ($)", projection.change_total], ["$/cow", projection.change_per_cow],
+             ["Percentage change over 5 years (%)", projection.change_percent]].map(function (row) {
+                return [row[0]].concat(row[1]);
+            })));
+
+        return [model.drought.total_days, model.drought.total_months,
+                model.feed.cost_per_day.toFixed(2), feedTable,
+                option2,
+                option3]
+            .concat(compareLabels)
+            .concat([currentSummary], yearTables, [summary, summarySentence(projection.change_percent)]);
+    }
+
+    // ------------------------------------------------------------------------------
+    // Clientside callbacks
+
+    var decision = {
+        // Inputs come in the order of PARAMETER_NAMES
+        update_decision: function () {
+            var values = Array.prototype.slice.call(arguments);
+            if (values.some(function (value) { return value === null || value === undefined; })) {
+                throw root.dash_clientside.PreventUpdate;
+            }
+            var p = {};
+            PARAMETER_NAMES.forEach(function (name, i) { p[name] = Number(values[i]); });
+            return decisionOutputs(p);
+        }
+    };
+
+    root.dash_clientside = Object.assign({}, root.dash_clientside, {decision: decision});
+
+    // Node (parity checks)
+    if (typeof module !== "undefined" && module.exports) {
+        module.exports = {
+            STRATEGIES: STRATEGIES,
+            YEARS: YEARS,
+            PARAMETER_NAMES: PARAMETER_NAMES,
+            evaluate: evaluate,
+            decisionOutputs: decisionOutputs
+        };
+    }
+
+})(typeof window !== "undefined" ? window : globalThis);
@@ -0,0 +1,177 @@
+// ------------------------------------------------------------------------------
+// Clientside callbacks for UI state (button styles, tooltips, collapses, modal)
+//
+// These callbacks only map clicks and page changes to styles or text, so they run in
+// the browser and do not send requests to the server. Registered from application.py
+// and the pages with ClientsideFunction(namespace='ui', function_name=...).
+
+(function (root) {
+
+    // Id of the component that triggered the callback ('' on the initial call)
+    function triggeredId() {
+        var context = root.dash_clientside.callback_context;
+        var triggered = context && context.triggered;
+        return triggered && triggered.length ? triggered[0].prop_id.split('.')[0] : '';
+    }
+
+    // Styles of a group of time range buttons: the clicked one is active (the first one on load)
+    function activeButtonStyles(ids, defaultStyle, activeStyle) {
+        return function () {
+            var index = Math.max(ids.indexOf(triggeredId()), 0);
+            return ids.map(function (id, i) { return i === index ? activeStyle : defaultStyle; });
+        };
+    }
+
+    // Collapse opened on odd numbers of clicks, with the label of the button
+    function clickToggle(openLabel, closedLabel) {
+        return function (n) {
+            var isOpen = Boolean(n) && n % 2 === 1;
+            return [isOpen, isOpen ? openLabel : closedLabel];
+        };
+    }
+
+    // Collapse switched on every click, with the label of the button
+    function stateToggle(openLabel, closedLabel) {
+        return function (n, isOpen) {
+            if (n) {
+                return [!isOpen, isOpen ? closedLabel : openLabel];
+            }
+            return [isOpen, closedLabel];
+        };
+    }
+
+    // --------------------------
+    // Application (navigation bar, modal, geolocation)
+
+    var PAGE_STYLES = {
+        forecast: {'background-color': '#dbe5f3', 'border': 'none'},
+        econ: {'background-color': '#282b3f', 'color': 'white', 'border': 'none'},
+        decision: {'background-color': '#efb750', 'border': 'none'},
+        resources: {'background-color': '#e3dfd8', 'border': 'none'}
+    };
+
+    var PAGE_DESCRIPTIONS = {
+        forecast: "This section presents the Grassland Productivity Forecast generated by Grasscast from the National Drought Mitigation Center at the University of Nebraska-Lincoln. The forecast is summarized based on county or map selection. Expected production is correlated with anticipated climate scenarios from the NOAA Climate Prediction Center. Users can access the most recent forecast value released and track forecast trends until the end of each season. Additionally, one can navigate through historical data to view past productivity. The platform also enables users to spatially identify areas with higher productivity in comparison to a current location or a selected location on the map. This feature is particularly useful for exploring productivity across the southwest plains. Ranchers and land managers should use this information in combination with their local knowledge of soils, plant communities, topography, and management to help with decision-making.",
+        econ: "This section provides access to nominal data from several cattle and hay market auctions. The data is sourced from the MyMarketNews API, a USDA service that offers unbiased, timely, and accurate market information for hundreds of agricultural commodities and their related products. This interface features multiple tabs, enabling users to select a specific time range, cattle or hay type, state, and auction market. For cattle, users can choose between viewing daily average prices or monthly aggregated prices. Furthermore, users can visualize the relationship between prices and weight based on the most recent auction data. For hay, the platform showcases daily average price trends across various markets.",
+        decision: "This section integrates the 'Strategies for Beef Cattle Herds During Times of Drought,' designed by Jeffrey E. Tranel, Rod Sharp, & John Deering from the Department of Agriculture and Business Management at Colorado State University. This decision tool aims to assist cow-calf producers in comparing the financial implications of various management strategies during droughts when grazing forage becomes scarce. It serves as a guide only. Producers should consult with their lenders, tax practitioners, and/or other professionals before making any final decisions.",
+        resources: "Details and links to the resources used in this application."
+    };
+
+    // Page shown for a pathname (the forecast page by default, as in display_page)
+    function pageName(pathname) {
+        var page = (pathname || '').replace(/^\//, '');
+        return PAGE_STYLES.hasOwnProperty(page) ? page : 'forecast';
+    }
+
+    var ui = {
+        close_modal: function (n, isOpen) {
+            return n ? !isOpen : isOpen;
+        },
+
+        activate_geolocation: function (click) {
+            return Boolean(click && click > 0);
+        },
+
+        // Forecast, econ, decision, resources and hidden resources buttons
+        page_button_styles: function (pathname) {
+            var page = pageName(pathname);
+            return ['forecast', 'econ', 'decision', 'resources', 'resources'].map(function (name) {
+                return name === page ? PAGE_STYLES[name] : {};
+            });
+        },
+
+        page_description: function (pathname) {
+            return PAGE_DESCRIPTIONS[pageName(pathname)];
+        },
+
+        // --------------------------
+        // Forecast page
+
+        forecast_hist_last_button: function () {
+            var ids = ['btn-all-hist', 'btn-30yr-hist', 'btn-20yr-hist', 'btn-10yr-hist'];
+            var id = triggeredId();
+            return {last_button: ids.indexOf(id) >= 0 ? id : 'btn-all-hist'};
+        },
+
+        forecast_hist_button_styles: activeButtonStyles(
+            ['btn-all-hist', 'btn-30yr-hist', 'btn-20yr-hist', 'btn-10yr-hist'],
+            {'backgroundColor': 'transparent', 'color': '#282b3f'},
+            {'backgroundColor': '#282b3f', 'color': '#dbe5f3'}
+        ),
+
+        // Slider range of the historical data plot ({min, max} years of the data)
+        forecast_hist_slider: function (allBtn, btn30yr, btn20yr, btn10yr, years) {
+            var spans = {'btn-30yr-hist': 30, 'btn-20yr-hist': 20, 'btn-10yr-hist': 10};
+            var id = triggeredId();
+            var startYear = spans.hasOwnProperty(id) ? years.max - spans[id] : years.min;
+            var endYear = years.max;
+            var marks = {};
+            marks[String(startYear)] = {label: String(startYear), style: {color: '#7fafdf'}};
+            marks[String(endYear)] = {label: String(endYear), style: {color: '#7fafdf'}};
+            return [startYear, endYear, endYear, marks];
+        },
+
+        forecast_econ_button_styles: activeButtonStyles(
+            ['btn-all-forecast', 'btn-2yr-forecast', 'btn-1yr-forecast', 'btn-6mo-forecast'],
+            {'backgroundColor': 'transparent', 'color': '#dbe5f3'},
+            {'backgroundColor': '#dbe5f3', 'color': '#282b3f'}
+        ),
+
+        // --------------------------
+        // Econ page
+
+        econ_switch_output: function (on) {
+            var text = on ?
+                "Nominal prices averaged across all transactions by date. Red indicates a market decline over the selected time range. Green corresponds a market rise from the first to the last record selected." :
+                "Nominal prices aggregated by month. Months where prices decrease from the first to the last record are shown in red. Conversely, months with a price increase are shown in green. Outliers not displayed.";
+            return [on ? "Daily average prices" : "Monthly prices", {
+                namespace: 'dash_bootstrap_components',
+                type: 'Tooltip',
+                props: {children: text, target: 'switch-output', id: 'switch-output-tooltip'}
+            }];
+        },
+
+        econ_cattle_button_styles: activeButtonStyles(
+            ['btn-all', 'btn-2yr', 'btn-1yr', 'btn-6mo', 'btn-2mo'],
+            {'backgroundColor': 'transparent', 'color': '#dbe5f3'},
+            {'backgroundColor': '#dbe5f3', 'color': '#282b3f'}
+        ),
+
+        econ_hay_button_styles: activeButtonStyles(
+            ['btn-all-hay', 'btn-2yr-hay', 'btn-1yr-hay', 'btn-6mo-hay', 'btn-2mo-hay'],
+            {'backgroundColor': 'transparent', 'color': '#dbe5f3'},
+            {'backgroundColor': '#dbe5f3', 'color': '#282b3f'}
+        ),
+
+        // --------------------------
+        // Decision page
+
+        // Option tables replace the option summaries while they are open
+        decision_option_toggles: function () {
+            var outputs = [];
+            Array.prototype.slice.call(arguments).forEach(function (n) {
+                var isOpen = n !== null && n !== undefined && n % 2 === 1;
+                outputs.push(isOpen, {display: isOpen ? 'none' : 'block'});
+            });
+            return outputs;
+        },
+
+        decision_input_toggle: stateToggle("Input information -", "Input information +"),
+
+        decision_compare_toggles: function () {
+            var isOpen = Array.prototype.slice.call(arguments).map(function (n) { return n ? n % 2 === 1 : false; });
+            return isOpen.concat(isOpen.map(function (open) { return open ? "- Details" : "+ Details"; }));
+        },
+
+        decision_comparison_toggle: stateToggle('fas fa-chevron-up ml-2', 'fas fa-chevron-down ml-2'),
+
+        decision_details_toggle: clickToggle("Explore net worth changes by year -", "Explore net worth changes by year +"),
+
+        decision_sensitivity_toggle: clickToggle("Explore what changes the best strategy -", "Explore what changes the best strategy +"),
+
+        decision_simulation_toggle: clickToggle("Simulate uncertain prices and drought length -", "Simulate uncertain prices and drought length +")
+    };
+
+    root.dash_clientside = Object.assign({}, root.dash_clientside, {ui: ui});
+
+})(typeof window !== "undefined" ? window : globalThis);
@@ -0,0 +1,273 @@
+# ------------------------------------------------------------------------------
+# Parity check between the decision model in Python (utils/herd_model.py) and its
+# browser version (static/decision_model.js)
+#
+# Evaluates random parameter sets with both versions (the JS one through node) and
+# compares every value of the model, and the outputs of the clientside update_decision
+# callback (tables, rounding and summary sentence) with those of the Python callback it
+# replaced, reproduced below. Run from the foodsight-app folder:
+#   python tools/check_decision_model_js.py --n 1000 --seed 0
+# Exits with status 1 when any value differs.
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+from dash import html
+from dash._utils import to_json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.herd_model import STRATEGIES, YEARS, HerdParameters, evaluate
+
+JS_MODEL = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'static', 'decision_model.js')
+
+# Model parts compared between both versions
+PARTS = ['drought', 'feed', 'calves', 'rent_pasture', 'sell_and_replace', 'net_worth']
+
+# Node script: evaluates every parameter set read from stdin (non-finite numbers as strings)
+NODE_SCRIPT = """
+const model = require(process.argv[1]);
+const params = JSON.parse(require('fs').readFileSync(0, 'utf8'));
+const replacer = (key, value) => (typeof value === 'number' && !isFinite(value)) ? String(value) : value;
+process.stdout.write(JSON.stringify({
+    names: model.PARAMETER_NAMES,
+    results: params.map(p => model.evaluate(p)),
+    outputs: params.map(p => model.decisionOutputs(p))
+}, replacer));
+"""
+
+
+# ------------------------------------------------------------------------------
+# Python reference of the page outputs (update_decision callback before it moved to the browser)
+
+# Rows of a table with one column per strategy
+def strategy_records(labels, rows):
+    data = [[label] + row.tolist() for label, row in zip(labels, rows)]
+    return pd.DataFrame(data, columns=[""] + STRATEGIES).to_dict(orient='records')
+
+
+def direction(value):
+    return 'increase' if value > 0 else 'decrease'
+
+
+# Name of each strategy in the summary sentence
+def strategy_display_name(strategy):
+    return (
+        "acquiring feed" if strategy == "Buy feed" else
+        "renting additional pasture" if strategy == "Rent pasture" else
+        "replacing cows" if strategy == "Replace" else
+        "not replacing cows"
+    )
+
+
+# Summary sentence with the least and most profitable strategies
+def summary_sentence(change_percent):
+    percentage_change_row = pd.Series(change_percent, index=STRATEGIES)
+
+    min_col_name = percentage_change_row.idxmin()
+    min_value = round(percentage_change_row[min_col_name], 0)
+    max_col_name = percentage_change_row.idxmax()
+    max_value = round(percentage_change_row[max_col_name], 0)
+
+    min_direction = direction(min_value)
+    max_direction = direction(max_value)
+    min_arrow_direction = "up" if min_direction == "increase" else "down"
+    max_arrow_direction = "up" if max_direction == "increase" else "down"
+
+    return html.Div(id="summary-decision-text", children=[
+        html.Span(f"When considering strategies in the face of a potential drought—based on the parameters outlined earlier—, ", className="text-style"),
+        html.Span(f"{strategy_display_name(min_col_name)}", className="variable-style"),
+        html.Span(f" is expected to be the least profitable choice, with a projected net worth ", className="text-style"),
+        html.I(className=f"fa fa-arrow-{min_arrow_direction}", style={"color": "#cf8b0e", "font-size": "15px", "vertical-align": "middle"}),
+        html.Span(f" {min_direction} of ", className="variable-style"),
+        html.Span(f"{abs(min_value)}%", className="variable-style"),
+        html.Span(f" over 5 years. Conversely, the strategy of ", className="text-style"),
+        html.Span(f"{strategy_display_name(max_col_name)}", className="variable-style"),
+        html.Span(f" holds promise, with a potential net worth ", className="text-style"),
+        html.I(className=f"fa fa-arrow-{max_arrow_direction}", style={"color": "#cf8b0e", "font-size": "15px", "vertical-align": "middle"}),
+        html.Span(f" {max_direction} of ", className="variable-style"),
+        html.Span(f"{abs(max_value)}%.", className="variable-style")
+    ])
+
+
+# Outputs of update_decision, as sent to the browser (JSON of the Dash response)
+def decision_outputs(params):
+    model = evaluate(params)
+
+    # Drought period
+    drought_days = int(model.drought['total_days'])
+    drought_months = int(model.drought['total_months'])
+
+    # Option 1: Buy feed
+    feed = model.feed
+    option1 = pd.DataFrame({
+        "Add'l Feed": feed['days'].tolist(),
+        "Per Cow": feed['per_cow'].tolist(),
+        "Per Herd": feed['per_herd'].tolist()
+    }).to_dict('records')
+
+    # Option 2: Rent pasture
+    option2 = pd.DataFrame({
+        '': ['Trucking Pairs to Pasture', 'Trucking Cows to Home', 'Pasture Rent', 'Other Costs', 'Lost Revenues', 'Interest', 'Total'],
+        'Per Cow': model.rent_pasture['per_cow'].tolist(),
+        'Per Herd': model.rent_pasture['per_herd'].tolist()
+    }).to_dict('records')
+
+    # Option 3: Sell and replace
+    option3 = pd.DataFrame({
+        '': ["Reduced Calf Sales This Year", "Reduced Operating Costs, This Year", "Additional Costs for Selling Cows",
+             "Interest on Cow Sales Revenues", "Total, Year 1", "Revenues from Cow Sales", "Interest Income, Years 2+3",
+             "Expected Calf Sales, Years 2+3", "Reduced Operating Expenses, Yrs 2+3", "Replacement Cows",
+             "Total, Years 2 & 3", "Total for 3 Years"],
+        'Additional Costs Per Cow': model.sell_and_replace['per_cow'].tolist(),
+        'Additional Costs Per Herd': model.sell_and_replace['per_herd'].tolist()
+    }).to_dict('records')
+
+    # Tables 1 to 5 (one per year)
+    projection = model.net_worth
+    compare_labels = [params.current_year + year for year in range(YEARS)]
+    summary_labels = ["Ending Net Worth - Cows", "Ending Net Worth - Cash", "Total ($)"]
+    year_tables = []
+    for year in range(YEARS):
+        if year == 0:
+            labels = ["Revenues from Calves", "Operating Costs (typical + adjustments)", "Profits",
+                      "Taxes (SE, US Income, CO Income)", "After Tax Income", "Capital Sales - Cow Sales", "Capital Gains"]
+            rows = ['revenues', 'operating_costs', 'profits', 'taxes', 'after_tax_income', 'capital_sales', 'capital_gains']
+        else:
+            labels = ["Revenues from Calves", "Operating expenses", "Interest Income/Expenses", "Profits",
+                      "Taxes (SE, US Income, CO Income)", "After Tax Income",
+                      "Purchase Replacement Females" if year == 1 else "Purchase replacement Females"]
+            rows = ['revenues', 'operating_costs', 'interest', 'profits', 'taxes', 'after_tax_income', 'purchase_females']
+        year_tables.append(strategy_records(labels, [projection[row][year] for row in rows]))
+        year_tables.append(strategy_records(summary_labels, [projection[row][year] for row in ['cows', 'cash', 'total']]))
+
+    current_summary = strategy_records(["Cows", "Calves", "Cash", "Total ($)"], projection['start'])
+
+    # Summary table
+    summary = [["Change in net worth over 5 years"] + ["", "", "", "", ""]]
+    summary += [[label] + row.tolist() for label, row in zip(
+        ["Total ($)", "$/cow", "Percentage change over 5 years (%)"],
+        [projection['change_total'], projection['change_per_cow'], projection['change_percent']]
+    )]
+    summary = pd.DataFrame(summary, columns=[""] + STRATEGIES).to_dict(orient='records')
+
+    outputs = [drought_days, drought_months,
+               f"{float(feed['cost_per_day']):.2f}", option1,
+               option2,
+               option3,
+               *compare_labels,
+               current_summary, *year_tables, summary,
+               summary_sentence(projection['change_percent'])]
+    return json.loads(to_json(outputs))
+
+
+# ------------------------------------------------------------------------------
+# Comparison
+
+
+# Random parameter set, including zeros and a drought ending before/after the current year
+def random_parameters(rng):
+    current_year = int(rng.integers(2020, 2030))
+    values = {
+        'herd_size': rng.integers(1, 600), 'avg_cow_weight': rng.integers(800, 1500),
+        'current_value_cow': rng.integers(500, 2000), 'cows_culled': rng.integers(0, 40),
+        'annual_cow_costs': rng.integers(300, 900), 'avg_weaning_percentage': rng.integers(50, 100),
+        'percent_calves_sold': rng.integers(50, 100), 'current_weight_calves': rng.integers(200, 500),
+        'weight_at_weaning': rng.integers(400, 800), 'current_price_per_lb': rng.uniform(0.8, 3),
+        'price_weaning_year1': rng.uniform(0.8, 3), 'price_weaning_year2': rng.uniform(0.8, 3),
+        'price_weaning_years3_5': rng.uniform(0.8, 3),
+        'current_month': rng.integers(1, 13), 'current_year': current_year,
+        'drought_end_month': rng.integers(1, 13), 'drought_end_year': current_year + rng.integers(-2, 7),
+        'interest_borrowed_money': rng.uniform(0, 12), 'interest_invested_money': rng.uniform(0, 6),
+        'tax_basis_cow': rng.integers(0, 1000), 'capital_gains_tax_rate': rng.integers(0, 40),
+        'hay_lbs_day': rng.uniform(0, 40), 'hay_per_ton': rng.integers(50, 400),
+        'other_lbs_day': rng.uniform(0, 10), 'other_per_ton': rng.integers(0, 400),
+        'distance_to_pasture': rng.integers(0, 800), 'trucking_cost': rng.uniform(1, 8),
+        'pasture_rent': rng.uniform(5, 60), 'days_rented_pasture': rng.integers(0, 365),
+        'calf_death_loss': rng.integers(0, 10), 'weaning_weight_adjustment': rng.integers(-30, 5),
+        'total_other_costs': rng.integers(0, 2000),
+        'reduced_operating_costs_year1': rng.integers(0, 300), 'operating_costs_year2': rng.integers(0, 20000),
+        'operating_costs_years3_5': rng.integers(0, 20000), 'selling_costs': rng.integers(0, 60),
+        'cost_replacement_animals': rng.choice([0, 1000, 1500])
+    }
+    values = {name: float(value) for name, value in values.items()}
+    # Empty inputs show as zeros
+    if rng.random() < 0.1:
+        values[rng.choice(list(values))] = 0.0
+    return values
+
+
+def to_number(value):
+    return float(value) if isinstance(value, str) else value
+
+
+# Paths of the values that differ between the Python and JS results
+def differences(python, js, path=''):
+    if isinstance(python, dict):
+        return [diff for key in python for diff in differences(python[key], js.get(key), f"{path}.{key}")]
+    python = np.asarray(python, dtype=float)
+    js = np.asarray(js if isinstance(js, list) else to_number(js), dtype=object)
+    js = np.vectorize(to_number, otypes=[float])(js) if js.size else js.astype(float)
+    if python.shape != js.shape:
+        return [f"{path}: shape {python.shape} != {js.shape}"]
+    same = np.isclose(python, js, rtol=1e-9, atol=1e-6, equal_nan=True) | (python == js)
+    return [f"{path}: {python.tolist()} != {js.tolist()}"] if not same.all() else []
+
+
+# Paths of the values that differ between two page outputs (JSON: tables, texts, components)
+def output_differences(python, js, path=''):
+    if isinstance(python, dict) and isinstance(js, dict):
+        if python.keys() != js.keys():
+            return [f"{path}: keys {sorted(python)} != {sorted(js)}"]
+        return [diff for key in python for diff in output_differences(python[key], js[key], f"{path}.{key}")]
+    if isinstance(python, list) and isinstance(js, list):
+        if len(python) != len(js):
+            return [f"{path}: length {len(python)} != {len(js)}"]
+        return [diff for i, (p, j) in enumerate(zip(python, js)) for diff in output_differences(p, j, f"{path}[{i}]")]
+    numbers = (int, float)
+    if isinstance(python, numbers) and isinstance(js, numbers) and not isinstance(python, bool):
+        same = np.isclose(python, js, rtol=1e-9, atol=1e-6)
+    else:
+        same = python == js
+    return [] if same else [f"{path}: {python!r} != {js!r}"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Python and JS decision models")
+    parser.add_argument('--n', type=int, default=1000, help="number of random parameter sets")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    params = [random_parameters(rng) for _ in range(args.n)]
+
+    output = subprocess.run(['node', '-e', NODE_SCRIPT, JS_MODEL], input=json.dumps(params),
+                            capture_output=True, text=True, check=True)
+    output = json.loads(output.stdout)
+
+    if output['names'] != HerdParameters.names():
+        print("Error: PARAMETER_NAMES in decision_model.js does not match HerdParameters")
+        sys.exit(1)
+
+    failures = 0
+    for i, (values, js, js_outputs) in enumerate(zip(params, output['results'], output['outputs'])):
+        model = evaluate(HerdParameters(**values))
+        diffs = [diff for part in PARTS for diff in differences(getattr(model, part), js[part], part)]
+        diffs += output_differences(decision_outputs(HerdParameters(**values)), js_outputs, 'outputs')
+        if diffs:
+            failures += 1
+            if failures <= 5:
+                print(f"Parameter set {i}: {values}")
+                for diff in diffs[:10]:
+                    print(f"  {diff}")
+
+    print(f"{args.n - failures}/{args.n} parameter sets match")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
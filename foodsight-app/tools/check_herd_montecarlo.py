@@ -0,0 +1,60 @@
+# ------------------------------------------------------------------------------
+# Reproducibility check of the Monte Carlo simulation (utils/herd_montecarlo.py)
+#
+# Runs the default simulation of the decision page (N_SCENARIOS scenarios, seeded) once in the
+# calling process and once spread over the process pool (utils/workers.py), and compares the
+# sampled inputs and the results. Run from the foodsight-app folder:
+#   python tools/check_herd_montecarlo.py --seed 0
+# Exits with status 1 when the runs differ or the parallel run did not use the pool.
+
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils import workers
+from utils.herd_model import HerdParameters
+from utils.herd_montecarlo import N_SCENARIOS, PARALLEL_THRESHOLD, UncertaintySettings, simulate
+
+
+# Names of the columns that differ between both runs
+def differences(single, parallel):
+    if list(single.columns) != list(parallel.columns) or single.shape != parallel.shape:
+        return [f"shape {single.shape} != {parallel.shape}"]
+    return [column for column in single.columns
+            if not np.array_equal(single[column].to_numpy(), parallel[column].to_numpy(), equal_nan=True)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare single-process and parallel Monte Carlo runs")
+    parser.add_argument('--n', type=int, default=N_SCENARIOS, help="number of scenarios")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if workers.inline() or args.n < PARALLEL_THRESHOLD:
+        print(f"Error: {args.n} scenarios with FOODSIGHT_PROCESS_WORKERS={workers.max_workers} "
+              f"do not use the process pool (from {PARALLEL_THRESHOLD} scenarios and 1+ workers)")
+        sys.exit(1)
+
+    # Calf price changes drawn from a history, as on the decision page
+    settings = UncertaintySettings(calf_price_changes=np.random.default_rng(args.seed).normal(0, 0.15, 40))
+    params = HerdParameters()
+    single = simulate(params, settings, n=args.n, seed=args.seed, max_workers=1)
+    parallel = simulate(params, settings, n=args.n, seed=args.seed)
+    workers.shutdown()
+
+    failures = 0
+    for name, single_frame, parallel_frame in zip(['scenarios', 'change'], single, parallel):
+        diffs = differences(single_frame, parallel_frame)
+        if diffs:
+            failures += 1
+            print(f"{name}: {', '.join(diffs)} differ")
+
+    print(f"{args.n} scenarios: single-process and parallel runs {'differ' if failures else 'match'}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,243 @@
+# ------------------------------------------------------------------------------
+# Fake MMN API server
+#
+# Serves the My Market News endpoints used by the pages and the market data Lambda from recorded
+# fixtures, so the app can be run and load tested without the real API. Run from the foodsight-app
+# folder and point the app (and the Lambdas) to it:
+#   python tools/fake_mmn_server.py --port 8060
+#   MMN_BASE_URL=http://localhost:8060 MMN_API_KEY=offline python application.py
+#
+# Fixtures are stored in tools/mmn_fixtures/, one file per request (path + query). Requests without
+# a fixture get a synthetic report (same fields as MMN) unless --strict is set. Record fixtures from
+# the real API with:
+#   python tools/fake_mmn_server.py --record https://marsapi.ams.usda.gov --api-key <key>
+# Any other file in the fixtures folder is served as is (e.g. the Grass-Cast CSVs or NOAA zips
+# used by the forecast Lambdas, see GRASSCAST_URL and NOAA_CPC_URL).
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import requests
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mmn_fixtures')
+
+REPORT_PATH = re.compile(r'^/services/v1\.2/reports/(?P<slug_id>\d+)(/Details)?/?$')
+
+# Classes and weights of the synthetic cattle reports
+CATTLE_CLASSES = ['Heifers', 'Steers']
+CATTLE_WEIGHTS = range(300, 1000, 100)
+HAY_CLASSES = ['Alfalfa', 'Grass', 'Mixed Grass']
+HAY_GRADES = ['Good', 'Fair', 'Premium']
+# Weeks of synthetic history (the pages show up to the last 2 years)
+HISTORY_WEEKS = 3 * 52
+
+
+# ------------------------------------------------------------------------------
+# Fixtures
+
+# Fixture file of a request: the path, plus a hash of the query when there is one
+def fixture_path(fixtures_dir, path, query):
+    path = os.path.normpath(unquote(path)).lstrip(os.sep)
+    if path.startswith('..'):
+        return None
+    if query:
+        name = 'query-' + hashlib.sha1(unquote(query).encode('utf-8')).hexdigest()[:16] + '.json'
+        return os.path.join(fixtures_dir, path, name)
+    return os.path.join(fixtures_dir, path)
+
+
+def record(upstream, api_key, path, query, file_path):
+    url = upstream.rstrip('/') + path + ('?' + query if query else '')
+    response = requests.get(url, auth=(api_key, ''), timeout=60)
+    if response.status_code == 200:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'wb') as file:
+            file.write(response.content)
+        print(f"Recorded {path}?{query}")
+    return response.status_code, response.content
+
+
+# ------------------------------------------------------------------------------
+# Synthetic reports
+
+def load_markets():
+    markets = {}
+    for commodity, file_name in [('Feeder Cattle', 'cattle_markets.json'), ('Hay', 'hay_markets.json')]:
+        with open(os.path.join(APP_DIR, 'data', file_name)) as file:
+            for market in json.load(file):
+                markets.setdefault(market['slug_id'], dict(market, commodity=commodity))
+    return markets
+
+
+# Filters of an MMN query (q=commodity=Hay;class=Alfalfa,Grass;quality=Good)
+def query_filters(params):
+    filters = {}
+    for item in ';'.join(params.get('q', [])).split(';'):
+        if '=' in item:
+            key, value = item.split('=', 1)
+            filters[key.strip()] = [v for v in value.split(',') if v]
+    return filters
+
+
+# Weekly reports of a market, the last one a few days ago (depends on the market)
+def report_dates(slug_id, last_days=None):
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    latest = today - timedelta(days=int(slug_id) % 7)
+    dates = [latest - timedelta(weeks=week) for week in range(HISTORY_WEEKS)]
+    if last_days is not None:
+        dates = [date for date in dates if date > today - timedelta(days=last_days)]
+    return sorted(dates)
+
+
+def cattle_results(market, filters, dates, rng):
+    results = []
+    for date in dates:
+        # Seasonal price (cents/cwt) with a trend over the years
+        season = 15 * ((date.timetuple().tm_yday / 365) - 0.5)
+        trend = 40 * (date.year - 2020)
+        for cattle_class in filters.get('class') or CATTLE_CLASSES:
+            for weight in CATTLE_WEIGHTS:
+                price = 180 + trend + season - 0.08 * (weight - 300) + (10 if cattle_class == 'Steers' else 0) + rng.gauss(0, 6)
+                results.append({
+                    'report_date': date.strftime('%m/%d/%Y'),
+                    'market_location_name': market['market_location_name'],
+                    'market_location_state': market['market_location_state'],
+                    'market_location_city': market.get('market_location_city'),
+                    'commodity': 'Feeder Cattle',
+                    'class': cattle_class,
+                    'avg_weight_min': weight,
+                    'avg_weight_max': weight + 99,
+                    'avg_weight': weight + 50,
+                    'avg_price_min': round(price - rng.uniform(2, 8), 2),
+                    'avg_price_max': round(price + rng.uniform(2, 8), 2),
+                    'avg_price': round(price, 2),
+                    'head_count': rng.randint(5, 200)
+                })
+    return results
+
+
+def hay_results(market, filters, dates, rng):
+    results = []
+    for date in dates:
+        for hay_class in filters.get('class') or HAY_CLASSES:
+            for grade in filters.get('quality') or HAY_GRADES:
+                price = 150 + 20 * (date.year - 2020) + rng.gauss(0, 15)
+                results.append({
+                    'report_Date': date.strftime('%m/%d/%Y'),
+                    'market_Location_Name': market['market_location_name'],
+                    'market_Location_State': market['market_location_state'],
+                    'commodity': 'Hay',
+                    'class': hay_class,
+                    'quality': grade,
+                    'price_Min': round(price - rng.uniform(5, 20), 2),
+                    'price_Max': round(price + rng.uniform(5, 20), 2),
+                    'average_Price': round(price, 2),
+                    'price_Unit': 'Per Ton'
+                })
+    return results
+
+
+# Synthetic results of a market report for the query parameters (same for the same request)
+def synthetic_results(market, params):
+    rng = random.Random(market['slug_id'] + json.dumps(params, sort_keys=True))
+    filters = query_filters(params)
+    last_days = int(params['lastDays'][0]) if 'lastDays' in params else None
+    dates = report_dates(market['slug_id'], last_days)
+    commodity = (filters.get('commodity') or [market['commodity']])[0]
+    if commodity == 'Hay':
+        return hay_results(market, filters, dates, rng)
+    return cattle_results(market, filters, dates, rng)
+
+
+def synthetic_report(markets, match, params):
+    market = markets.get(match.group('slug_id'))
+    if market is None:
+        return 404, {'message': 'Report not found'}
+    results = synthetic_results(market, params)
+    return 200, {'stats': {'totalRows': len(results), 'returnedRows': len(results)}, 'results': results}
+
+
+# ------------------------------------------------------------------------------
+# Server
+
+def create_handler(settings, markets):
+    class FakeMMNHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            file_path = fixture_path(settings.fixtures, url.path, url.query)
+            if settings.latency:
+                time.sleep(random.expovariate(1 / settings.latency))
+
+            if file_path and os.path.isfile(file_path):
+                with open(file_path, 'rb') as file:
+                    return self.reply(200, file.read())
+            if file_path and settings.record:
+                return self.reply(*record(settings.record, settings.api_key, url.path, url.query, file_path))
+
+            match = REPORT_PATH.match(unquote(url.path))
+            if match is None or settings.strict:
+                return self.reply(404, json.dumps({'message': f"No fixture for {self.path}"}).encode('utf-8'))
+            status, body = synthetic_report(markets, match, parse_qs(url.query))
+            self.reply(status, json.dumps(body).encode('utf-8'))
+
+        def reply(self, status, body):
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json' if body[:1] in (b'{', b'[') else 'application/octet-stream')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            if not settings.quiet:
+                super().log_message(format, *args)
+
+    return FakeMMNHandler
+
+
+# Server in a background thread (returns the server, stop it with server.shutdown())
+def start_server(port=0, fixtures=FIXTURES_DIR, latency=0, strict=False, quiet=True):
+    settings = argparse.Namespace(fixtures=fixtures, latency=latency, strict=strict, quiet=quiet,
+                                  record=None, api_key='')
+    server = ThreadingHTTPServer(('127.0.0.1', port), create_handler(settings, load_markets()))
+    threading.Thread(target=server.serve_forever, name='fake-mmn-server', daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake MMN API server backed by recorded fixtures")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8060)
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help="folder of the recorded responses")
+    parser.add_argument('--latency', type=float, default=0, help="mean delay (seconds) added to each response")
+    parser.add_argument('--strict', action='store_true', help="answer 404 instead of a synthetic report when there is no fixture")
+    parser.add_argument('--record', metavar='URL', help="fetch the missing fixtures from this API (e.g. https://marsapi.ams.usda.gov)")
+    parser.add_argument('--api-key', default=os.environ.get('MMN_API_KEY', ''), help="MMN API key used when recording")
+    parser.add_argument('--quiet', action='store_true', help="do not log the requests")
+    settings = parser.parse_args()
+
+    if settings.record and not settings.api_key:
+        sys.exit("Error: --record needs an MMN API key (--api-key or MMN_API_KEY)")
+
+    server = ThreadingHTTPServer((settings.host, settings.port), create_handler(settings, load_markets()))
+    print(f"Fake MMN API on http://{settings.host}:{settings.port} (fixtures: {os.path.abspath(settings.fixtures)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
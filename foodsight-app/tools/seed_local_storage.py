@@ -0,0 +1,196 @@
+# ------------------------------------------------------------------------------
+# Seed the local storage with synthetic data
+#
+# Writes every object read by the app and the Lambdas into the local storage folder
+# (utils/storage.py), using the synthetic datasets of the benchmarks, so both run offline.
+# Run from the foodsight-app folder:
+#   python tools/seed_local_storage.py --storage-dir local_storage --scale 0.1
+#   FOODSIGHT_STORAGE=local FOODSIGHT_STORAGE_DIR=local_storage MMN_BASE_URL=http://localhost:8060 \
+#       MMN_API_KEY=offline MAPBOX_TOKEN=offline python application.py
+#
+# It also writes the files the forecast Lambdas download into the fake MMN server fixtures
+# (tools/fake_mmn_server.py): the Grass-Cast CSVs of the next report and this month's NOAA outlook.
+
+import argparse
+import gzip
+import io
+import json
+import os
+import sys
+import tempfile
+import zipfile
+from datetime import datetime
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import shapely
+
+TOOLS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TOOLS_DIR, '..'))
+sys.path.insert(0, os.path.join(TOOLS_DIR, '..', 'benchmarks'))
+from synthetic_data import build_datasets
+from fake_mmn_server import FIXTURES_DIR, load_markets, synthetic_results
+from utils.datasets import bucket_name
+from utils.storage import LocalStorage
+
+MONTH_NAMES = {4: "April", 5: "May", 6: "June", 7: "July", 8: "August", 9: "September"}
+
+# Columns of the Grass-Cast forecast CSVs kept by the forecast Lambda (besides report_date)
+GRASSCAST_COLUMNS = ['fips', 'countystate', 'gridid', 'indx', 'year', 'meanndvigrid', 'meananppgrid',
+                     'ndvi_predict_below', 'npp_predict_below', 'npp_stdev_below', 'deltanpp_below',
+                     'pct_diffnpp_below', 'ndvi_predict_avg', 'npp_predict_avg', 'npp_stdev_avg',
+                     'deltanpp_avg', 'pct_diffnpp_avg', 'ndvi_predict_above', 'npp_predict_above',
+                     'npp_stdev_above', 'deltanpp_above', 'pct_diffnpp_above']
+
+# Columns of the market data file written by the market data Lambda
+MARKET_TEXT_COLUMNS = ['market_location_name', 'market_location_state', 'class']
+MARKET_NUMERIC_COLUMNS = ['avg_price', 'avg_price_min', 'avg_price_max', 'avg_weight_min', 'avg_weight_max']
+
+
+def put_csv(storage, key, df):
+    storage.put_object(Bucket=bucket_name, Key=key, Body=df.to_csv(index=False).encode())
+
+
+def put_json(storage, key, data):
+    storage.put_object(Bucket=bucket_name, Key=key, Body=json.dumps(data).encode())
+
+
+# ------------------------------------------------------------------------------
+# ANPP data
+
+# Grass-Cast columns missing from the synthetic forecast
+def with_grasscast_columns(df):
+    df = df.copy()
+    for column in GRASSCAST_COLUMNS:
+        if column not in df:
+            df[column] = 0
+    df['countystate'] = 'Synthetic County, XX'
+    return df
+
+
+def seed_anpp(storage, datasets, aoi_grid, fixtures_dir):
+    df_hist, df_forecast = datasets['df_hist'], datasets['df_forecast']
+    is_sw = df_hist['gridid'].isin(aoi_grid.loc[aoi_grid['aoi'] == 'sw', 'gridid'])
+
+    # Files read by the app
+    put_csv(storage, 'hist_data/hist_data_grasscast_gp_sw.csv', df_hist)
+    put_csv(storage, 'forecast_data/forecast_data_grasscast_gp_sw.csv', df_forecast)
+
+    # Files of each region updated by the forecast Lambda
+    put_csv(storage, 'hist_data/updated_hist_data_grasscast_gp.csv', df_hist.loc[~is_sw, ['gridid', 'year', 'anpp_lbs_ac']])
+    put_csv(storage, 'hist_data/updated_hist_data_grasscast_sw.csv',
+            df_hist.loc[is_sw, ['gridid', 'year', 'predicted_spring_anpp_lbs_ac', 'predicted_summer_anpp_lbs_ac']])
+
+    # The last report is left out of the region files and served as the next Grass-Cast release
+    last_report = df_forecast['report_date'].max()
+    report_date = datetime.strptime(last_report, '%Y-%m-%d')
+    for region in ['gp', 'sw']:
+        cells = aoi_grid.loc[aoi_grid['aoi'] == region, 'gridid']
+        forecast = with_grasscast_columns(df_forecast[df_forecast['gridid'].isin(cells)])
+        put_csv(storage, f'forecast_data/forecast_data_grasscast_{region}_clim.csv', forecast[forecast['report_date'] != last_report])
+
+        release = forecast.loc[forecast['report_date'] == last_report, GRASSCAST_COLUMNS]
+        if report_date.month in MONTH_NAMES:
+            path = os.path.join(fixtures_dir, 'data', 'csv', str(report_date.year),
+                                f"ANPP_forecast_summary_{region}_{report_date.year}_{MONTH_NAMES[report_date.month]}_{report_date.day}.csv")
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            release.to_csv(path, index=False)
+
+
+# ------------------------------------------------------------------------------
+# Spatial data
+
+def seed_spatial(storage, datasets, aoi_grid):
+    put_json(storage, 'spatial_data/grasscast_aoi_grid.geojson', json.loads(aoi_grid[['gridid', 'geometry']].to_json()))
+    put_json(storage, 'spatial_data/aoi_gridids.json', datasets['aoi_gridids'])
+    forecast = datasets['df_forecast']
+    seasprcp_grid = forecast.drop_duplicates('gridid')[['gridid', 'cat', 'prob']]
+    put_csv(storage, 'spatial_data/seasprcp_grid.csv', seasprcp_grid)
+    # GP cells also covered by the SW grid (none in the synthetic grid)
+    put_json(storage, 'spatial_data/overlapping_gridids.json', {'gridid': []})
+
+
+# NOAA seasonal precipitation outlook of the current month: one band per category over the grid
+def write_noaa_outlook(aoi_grid, fixtures_dir):
+    now = datetime.now()
+    xmin, ymin, xmax, ymax = aoi_grid.total_bounds
+    edges = np.linspace(ymin - 1, ymax + 1, 4)
+    outlook = gpd.GeoDataFrame({
+        'Cat': ['Below', 'EC', 'Above'],
+        'Prob': [40.0, 33.0, 50.0],
+        'geometry': shapely.box(xmin - 1, edges[:-1], xmax + 1, edges[1:])
+    }, crs='EPSG:4326')
+
+    archive = io.BytesIO()
+    with tempfile.TemporaryDirectory() as folder:
+        outlook.to_file(os.path.join(folder, 'lead1_seasprcp.shp'))
+        with zipfile.ZipFile(archive, 'w') as zip_file:
+            for name in os.listdir(folder):
+                zip_file.write(os.path.join(folder, name), name)
+
+    path = os.path.join(fixtures_dir, 'GIS', 'us_tempprcpfcst', f'seasprcp_{now.year:04d}{now.month:02d}.zip')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(archive.getvalue())
+
+
+# ------------------------------------------------------------------------------
+# Market data
+
+# Same columnar format as the market data Lambda output (latest report of each cattle market)
+def seed_markets(storage):
+    with open('data/cattle_markets.json') as file:
+        cattle_markets = json.load(file)
+    put_json(storage, 'market_data/markets_data_final.json', cattle_markets)
+
+    markets = load_markets()
+    rows = []
+    for market in cattle_markets:
+        for record in synthetic_results(markets[market['slug_id']], {'lastDays': ['7']}):
+            row = {column: record[column] for column in MARKET_TEXT_COLUMNS}
+            row.update({column: float(record[column]) for column in MARKET_NUMERIC_COLUMNS})
+            row['report_date'] = datetime.strptime(record['report_date'], '%m/%d/%Y').strftime('%Y-%m-%d')
+            rows.append(row)
+    rows.sort(key=lambda row: (row['market_location_name'], row['class'], row['report_date']))
+
+    # Latest-day rows of each market and class (rows sorted by date within a market and class)
+    latest_day_index = {}
+    for position, row in enumerate(rows):
+        market_index = latest_day_index.setdefault(row['market_location_name'], {})
+        entry = market_index.get(row['class'])
+        if entry is None or entry['report_date'] != row['report_date']:
+            market_index[row['class']] = {'report_date': row['report_date'], 'start': position, 'stop': position + 1}
+        else:
+            entry['stop'] = position + 1
+    columns = ['report_date'] + MARKET_TEXT_COLUMNS + MARKET_NUMERIC_COLUMNS
+    data = {'columns': {column: [row[column] for row in rows] for column in columns}, 'latest_day_index': latest_day_index}
+    storage.put_object(Bucket=bucket_name, Key='market_data/last_market_data.json.gz',
+                       Body=gzip.compress(json.dumps(data, separators=(',', ':')).encode()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the local storage with synthetic data")
+    parser.add_argument('--storage-dir', default=os.environ.get('FOODSIGHT_STORAGE_DIR', 'local_storage'))
+    parser.add_argument('--fixtures', default=FIXTURES_DIR, help="fixtures folder of the fake MMN server")
+    parser.add_argument('--scale', type=float, default=1.0, help="fraction of the production grid size")
+    parser.add_argument('--n-years', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    storage = LocalStorage(args.storage_dir)
+    datasets = build_datasets(scale=args.scale, n_years=args.n_years, seed=args.seed)
+    # Grid with the AOI of each cell
+    aoi_grid = datasets['aoi_grid'].merge(
+        pd.DataFrame([(entry['aoi'], gridid) for entry in datasets['aoi_gridids'] for gridid in entry['gridid']],
+                     columns=['aoi', 'gridid']), on='gridid')
+
+    seed_anpp(storage, datasets, aoi_grid, args.fixtures)
+    seed_spatial(storage, datasets, aoi_grid)
+    write_noaa_outlook(aoi_grid, args.fixtures)
+    seed_markets(storage)
+    print(f"Local storage seeded at {os.path.abspath(args.storage_dir)}")
+
+
+if __name__ == '__main__':
+    main()
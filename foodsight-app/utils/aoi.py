@@ -0,0 +1,51 @@
+# ------------------------------------------------------------------------------
+# AOI membership of the grid cells
+#
+# aoi_gridids.json lists the gridids of each AOI ({aoi, gridid: [...]} entries). The index is
+# built once when the file is loaded (dataset 'aoi_index' in utils/datasets.py):
+#   - a gridid -> AOI dict, for the membership of one cell
+#   - the sorted gridids of each AOI (NumPy array), for the vectorized AOI filters of the frames
+# A gridid listed in several entries belongs to the first one, like the scans it replaces.
+#
+#   aoi_index = registry.get('aoi_index')
+#   aoi_index.aoi_of(id_value)  # 'gp', 'sw' or None
+#   dff[aoi_index.contains('sw', dff['gridid'])]
+
+import numpy as np
+
+
+class AoiIndex:
+    def __init__(self, aoi_gridids):
+        self.names = [entry['aoi'] for entry in aoi_gridids]
+        self._by_gridid = {}
+        for entry in aoi_gridids:
+            for gridid in entry['gridid']:
+                self._by_gridid.setdefault(gridid, entry['aoi'])
+        self._gridids = {}
+        for entry in aoi_gridids:
+            if entry['aoi'] not in self._gridids:
+                self._gridids[entry['aoi']] = np.unique(np.asarray(entry['gridid'], dtype=np.int64))
+
+    # AOI of a gridid (None when it is in no AOI)
+    def aoi_of(self, gridid):
+        return self._by_gridid.get(gridid)
+
+    # Sorted gridids of an AOI (empty for an unknown AOI)
+    def gridids(self, aoi):
+        return self._gridids.get(aoi, np.empty(0, dtype=np.int64))
+
+    # Boolean mask of the gridids listed in the AOI
+    def contains(self, aoi, gridids):
+        aoi_gridids = self.gridids(aoi)
+        gridids = np.asarray(gridids)
+        if len(aoi_gridids) == 0:
+            return np.zeros(len(gridids), dtype=bool)
+        positions = np.searchsorted(aoi_gridids, gridids).clip(0, len(aoi_gridids) - 1)
+        return aoi_gridids[positions] == gridids
+
+    # AOI code of each gridid: position of its AOI in names (-1 when it is in no AOI)
+    def codes(self, gridids):
+        codes = np.full(len(gridids), -1)
+        for code, aoi in reversed(list(enumerate(self.names))):
+            codes[self.contains(aoi, gridids)] = code
+        return codes
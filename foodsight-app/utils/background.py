@@ -0,0 +1,42 @@
+# ------------------------------------------------------------------------------
+# Background callback manager
+#
+# The slow callbacks of the forecast page (buffer overlays of the polar and violin plots, kaleido
+# rendering, large lasso selections) run as Dash background callbacks: the request returns at
+# once with a job id and the browser polls for the result, so they do not hold a request thread
+# while the fast interactions wait. When an input changes during a job, the browser cancels it
+# and starts a new one. FOODSIGHT_BACKGROUND selects where the jobs run:
+#   - diskcache (default): one process per job, forked from the web worker (the datasets loaded
+#     by the worker are shared with it), results in FOODSIGHT_BACKGROUND_DIR
+#   - celery: celery workers, with the broker and results in FOODSIGHT_CELERY_BROKER (a local
+#     redis). Start them from the foodsight-app folder:
+#       celery -A application:celery_app worker --concurrency 4
+
+import os
+import tempfile
+
+# ------------------------------------------------------------------------------
+# Settings
+
+backend = os.environ.get('FOODSIGHT_BACKGROUND', 'diskcache')
+cache_dir = os.environ.get('FOODSIGHT_BACKGROUND_DIR', os.path.join(tempfile.gettempdir(), 'foodsight-background'))
+celery_broker = os.environ.get('FOODSIGHT_CELERY_BROKER', 'redis://localhost:6379/0')
+interval = int(os.environ.get('FOODSIGHT_BACKGROUND_INTERVAL', 500))  # Milliseconds between result polls
+
+celery_app = None
+
+
+def create_manager():
+    global celery_app
+    if backend == 'diskcache':
+        import diskcache
+        from dash import DiskcacheManager
+        return DiskcacheManager(diskcache.Cache(cache_dir))
+    if backend == 'celery':
+        from celery import Celery
+        from dash import CeleryManager
+        celery_app = Celery(__name__, broker=celery_broker, backend=celery_broker)
+        return CeleryManager(celery_app)
+    raise ValueError(f"Error: unknown background callback backend '{backend}' (diskcache or celery)")
+
+manager = create_manager()
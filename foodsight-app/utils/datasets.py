@@ -0,0 +1,158 @@
+# ------------------------------------------------------------------------------
+# Datasets shared by the application and the pages
+#
+# Every dataset is registered in the data registry (utils/registry.py) and loaded on first use,
+# once per process, instead of at import time in every page.
+
+import json
+import os
+from datetime import datetime
+from io import BytesIO
+
+import geopandas as gpd
+import janitor
+import pandas as pd
+
+from utils.aoi import AoiIndex
+from utils.registry import registry
+from utils.selection import GridIndex
+from utils.storage import create_s3_client, storage_backend
+
+# Name of the S3 bucket
+bucket_name = 'foodsight-lambda'
+
+
+# S3 client, or a local folder with FOODSIGHT_STORAGE=local (utils/storage.py)
+@registry.register('s3')
+def load_s3():
+    return create_s3_client()
+
+
+# ------------------------------------------------------------------------------
+# ANPP data
+
+## Historic data
+@registry.register('df_hist')
+def load_df_hist():
+    response = registry.get('s3').get_object(Bucket=bucket_name, Key='hist_data/hist_data_grasscast_gp_sw.csv')
+    return pd.read_csv(response['Body'])
+
+## Forecast data
+@registry.register('df_forecast')
+def load_df_forecast():
+    response = registry.get('s3').get_object(Bucket=bucket_name, Key='forecast_data/forecast_data_grasscast_gp_sw.csv')
+    return pd.read_csv(response['Body'])
+
+# Testing data from local. To speed up the deployment process
+# registry.register('df_hist', lambda: pd.read_csv("../testing_lambda/hist_data_grasscast_gp_sw.csv"))
+# registry.register('df_forecast', lambda: pd.read_csv("../testing_lambda/forecast_data_grasscast_gp_sw.csv"))
+
+# Last year with ANPP data
+# Correction for the case when forecast data has not been released for the current year yet (i.e., January-April)
+@registry.register('current_year')
+def load_current_year():
+    current_year = datetime.now().year
+    if registry.get('df_hist')['year'].max() != current_year:
+        current_year = current_year - 1
+    return current_year
+
+
+# ------------------------------------------------------------------------------
+# Spatial data
+
+# Grid files are read from the bucket (spatial_data/) when there is no copy in static/, or with the
+# local storage, so they match the seeded synthetic data (tools/seed_local_storage.py)
+def open_grid_file(name):
+    path = os.path.join('static', name)
+    if storage_backend == 'local' or not os.path.exists(path):
+        response = registry.get('s3').get_object(Bucket=bucket_name, Key='spatial_data/' + name)
+        return BytesIO(response['Body'].read())
+    return open(path, 'rb')
+
+## AOI Grid
+@registry.register('aoi_grid')
+def load_aoi_grid():
+    with open_grid_file('grasscast_aoi_grid.geojson') as file:
+        return gpd.read_file(file).to_crs(epsg=4326).clean_names()
+
+# Gridid offsets, centroids and AOIs of the grid cells (lasso selections, directional analytics)
+@registry.register('grid_index')
+def load_grid_index():
+    return GridIndex.from_grid(registry.get('aoi_grid'), registry.get('aoi_index'))
+
+# AOI grid with the offset of each cell in the grid index ('cell' column)
+def grid_with_cells():
+    aoi_grid = registry.get('aoi_grid')
+    return aoi_grid.assign(cell=registry.get('grid_index').offsets(aoi_grid['gridid']))
+
+# Merging historical and forecast data with grid
+@registry.register('gdf_hist')
+def load_gdf_hist():
+    return grid_with_cells().merge(registry.get('df_hist'), left_on='gridid', right_on='gridid')
+
+@registry.register('gdf_forecast')
+def load_gdf_forecast():
+    return grid_with_cells().merge(registry.get('df_forecast'), left_on='gridid', right_on='gridid')
+
+# Historical plot slider range
+@registry.register('years')
+def load_years():
+    return registry.get('gdf_hist')['year'].unique().tolist()
+
+# Grid IDs and AOI dictionary
+@registry.register('aoi_gridids')
+def load_aoi_gridids():
+    with open_grid_file('aoi_gridids.json') as file:
+        return json.load(file)
+
+# AOI of each gridid and gridids of each AOI
+@registry.register('aoi_index')
+def load_aoi_index():
+    return AoiIndex(registry.get('aoi_gridids'))
+
+## Counties
+@registry.register('counties_geojson')
+def load_counties_geojson():
+    with open('static/grasscast_counties.geojson', 'r') as f:
+        return json.load(f)
+
+@registry.register('counties_gpd')
+def load_counties_gpd():
+    return gpd.read_file('static/grasscast_counties.geojson').to_crs(epsg=4326)
+
+
+# ------------------------------------------------------------------------------
+# Tokens
+
+# Tokens are read from the environment when set (e.g. a dummy token for the fake MMN server)
+
+# Mapbox token
+@registry.register('mapbox_token')
+def load_mapbox_token():
+    if os.environ.get('MAPBOX_TOKEN'):
+        return os.environ['MAPBOX_TOKEN']
+    return open(".mapbox_token").read() # you will need your own token
+
+# MMN API key (requests in utils/mmn.py)
+# It is necessary to obtain an MMN token.
+# More information at https://mymarketnews.ams.usda.gov/mymarketnews-api
+@registry.register('mmn_api_key')
+def load_mmn_api_key():
+    if os.environ.get('MMN_API_KEY'):
+        return os.environ['MMN_API_KEY']
+    return open(".mmn_api_token").read()
+
+
+# ------------------------------------------------------------------------------
+# Markets
+# (compiled post API evaluation for our Area of Interest)
+
+@registry.register('cattle_markets')
+def load_cattle_markets():
+    with open('data/cattle_markets.json') as json_file:
+        return json.load(json_file)
+
+@registry.register('hay_markets')
+def load_hay_markets():
+    with open('data/hay_markets.json') as json_file:
+        return json.load(json_file)
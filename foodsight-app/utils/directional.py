@@ -0,0 +1,45 @@
+# ------------------------------------------------------------------------------
+# Directional analytics
+#
+# Bearings of grid cells seen from a location and their binning into compass sectors, on
+# arrays (no loop over the cells). Bearings are in degrees clockwise from north, as shown by
+# the polar plots (angularaxis direction="clockwise", rotation=90). The cell centroids are
+# computed once per grid (grid index, utils/selection.py).
+#
+#   cells = frame['cell'].to_numpy()
+#   directions, means = sector_means(bearings(grid_index.x[cells], grid_index.y[cells], origin.x, origin.y), values)
+
+import numpy as np
+
+# ------------------------------------------------------------------------------
+# Sectors
+
+SECTOR_SIZE = 20  # Degrees
+
+# Sector centers: 0 (N), 20, ..., 340
+def sector_labels(size=SECTOR_SIZE):
+    return np.arange(0, 360, size)
+
+
+# ------------------------------------------------------------------------------
+# Binning
+
+# Bearings of the points (x, y) from the origin, in degrees clockwise from north [0, 360)
+def bearings(x, y, origin_x, origin_y):
+    angles = np.degrees(np.arctan2(np.asarray(y) - origin_y, np.asarray(x) - origin_x))
+    return (90 - angles) % 360
+
+
+# Index of the sector of each bearing (nearest sector center, 360 is 0)
+def sector_index(bearings, size=SECTOR_SIZE):
+    return np.round(np.asarray(bearings) / size).astype(int) % (360 // size)
+
+
+# Mean value per sector, for the sectors holding at least one point: (directions, means)
+def sector_means(bearings, values, size=SECTOR_SIZE):
+    n_sectors = 360 // size
+    index = sector_index(bearings, size)
+    counts = np.bincount(index, minlength=n_sectors)
+    sums = np.bincount(index, weights=np.asarray(values, dtype=float), minlength=n_sectors)
+    filled = counts > 0
+    return sector_labels(size)[filled], sums[filled] / counts[filled]
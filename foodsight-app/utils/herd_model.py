@@ -0,0 +1,374 @@
+# ------------------------------------------------------------------------------
+# Herd strategy model for the drought decision tool
+#
+# Every input of the decision page is a field of HerdParameters. Fields can be scalars or
+# NumPy arrays of the same shape, so one model evaluates a single scenario or a whole
+# batch of parameter sets. Results keep the batch shape and add the year axis (5 years)
+# and/or the strategy axis (STRATEGIES, in the order of the decision page tables).
+
+from dataclasses import dataclass, field, fields
+from datetime import datetime
+from functools import cached_property
+
+import numpy as np
+
+# ------------------------------------------------------------------------------
+# Constants
+
+STRATEGIES = ["Normal conditions", "Buy feed", "Rent pasture", "Replace", "Do not replace"]
+# Strategies the rancher can choose in a drought ("Normal conditions" is the no-drought baseline)
+DROUGHT_STRATEGIES = STRATEGIES[1:]
+YEARS = 5
+# SE, US Income and CO Income taxes
+TAX_RATE = 0.124 + 0.15 + 0.04
+# Truck capacity (lbs)
+TRUCK_CAPACITY = 40000
+
+
+# ------------------------------------------------------------------------------
+# Parameters
+
+@dataclass
+class HerdParameters:
+    # Cows
+    herd_size: float = 200
+    avg_cow_weight: float = 1200
+    current_value_cow: float = 950
+    cows_culled: float = 15
+    annual_cow_costs: float = 650
+    # Calves
+    avg_weaning_percentage: float = 80
+    percent_calves_sold: float = 75
+    current_weight_calves: float = 375
+    weight_at_weaning: float = 700
+    current_price_per_lb: float = 1.45
+    price_weaning_year1: float = 1.32
+    price_weaning_year2: float = 1.25
+    price_weaning_years3_5: float = 1.20
+    # Drought period
+    current_month: float = field(default_factory=lambda: datetime.now().month)
+    current_year: float = field(default_factory=lambda: datetime.now().year)
+    drought_end_month: float = field(default_factory=lambda: datetime.now().month)
+    drought_end_year: float = field(default_factory=lambda: datetime.now().year + 1)
+    # Other information
+    interest_borrowed_money: float = 6.50
+    interest_invested_money: float = 2.25
+    tax_basis_cow: float = 0
+    capital_gains_tax_rate: float = 20
+    # Option 1: Buy feed
+    hay_lbs_day: float = 22.00
+    hay_per_ton: float = 200
+    other_lbs_day: float = 0.00
+    other_per_ton: float = 0
+    # Option 2: Rent pasture
+    distance_to_pasture: float = 300
+    trucking_cost: float = 4.75
+    pasture_rent: float = 25.00
+    days_rented_pasture: float = 120
+    calf_death_loss: float = 2
+    weaning_weight_adjustment: float = -10
+    total_other_costs: float = 300
+    # Option 3: Sell and replace
+    reduced_operating_costs_year1: float = 100
+    operating_costs_year2: float = 5000
+    operating_costs_years3_5: float = 5000
+    selling_costs: float = 20
+    cost_replacement_animals: float = 1000
+
+    # Names of the parameters, in declaration order
+    @classmethod
+    def names(cls):
+        return [f.name for f in fields(cls)]
+
+    # Id of the decision page input bound to each parameter (e.g. herd_size -> 'herd-size')
+    @classmethod
+    def component_ids(cls):
+        return [name.replace('_', '-') for name in cls.names()]
+
+    @classmethod
+    def from_values(cls, values):
+        return cls(**dict(zip(cls.names(), values)))
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.names()}
+
+
+# ------------------------------------------------------------------------------
+# Model
+
+class HerdStrategyModel:
+
+    def __init__(self, params):
+        self.params = params
+        self.p = {name: np.asarray(value, dtype=float) for name, value in params.to_dict().items()}
+        self.shape = np.broadcast_shapes(*(value.shape for value in self.p.values()))
+
+    # Parameter broadcast to the batch shape, with a trailing axis for years or strategies
+    def _column(self, name):
+        return np.broadcast_to(self.p[name], self.shape)[..., np.newaxis]
+
+    ## ----------------------------------------
+    ## Drought period (hidden drought table)
+    # Rows are the current year and the 4 following years; calendar years after the end of the
+    # drought restart from 0, as in the original spreadsheet
+    @cached_property
+    def drought(self):
+        p = self.p
+        current_year = np.broadcast_to(p['current_year'], self.shape)[..., np.newaxis]
+        end_year = np.broadcast_to(p['drought_end_year'], self.shape)[..., np.newaxis]
+        end_month = np.broadcast_to(p['drought_end_month'], self.shape)[..., np.newaxis]
+        offset = np.arange(1, YEARS)
+        gap = end_year - current_year
+        # Row holding the drought end year (0 when the drought ends this year)
+        end_row = np.where(gap >= 1, gap, np.where(gap < 0, 1, 0))
+        years = np.select([offset < end_row, offset == end_row],
+                          [current_year + offset, end_year],
+                          default=offset - end_row - 1)
+        months = np.select([offset < end_row, offset == end_row],
+                           [np.where(current_year + offset < 2000, 0, 12), end_month],
+                           default=0)
+        first_months = 12 - np.broadcast_to(p['current_month'], self.shape)[..., np.newaxis]
+        years = np.concatenate([current_year, years], axis=-1)
+        months = np.concatenate([first_months, months.astype(float)], axis=-1)
+        return {
+            'years': years,
+            'months': months,
+            'days': months * 30,
+            'total_months': months.sum(axis=-1),
+            'total_days': (months * 30).sum(axis=-1)
+        }
+
+    ## ----------------------------------------
+    ## Option 1: Buy feed
+    @cached_property
+    def feed(self):
+        p = self.p
+        cost_per_day = p['hay_lbs_day'] * (p['hay_per_ton'] / 2000) + p['other_lbs_day'] * (p['other_per_ton'] / 2000)
+        cost_per_day = np.broadcast_to(cost_per_day, self.shape)
+        # Days of additional feed: this year, average and whole drought
+        first_days = self.drought['days'][..., 0]
+        total_days = self.drought['total_days']
+        days = np.stack([first_days, (total_days + first_days) / 2, total_days], axis=-1)
+        per_cow = cost_per_day[..., np.newaxis] * days
+        return {
+            'cost_per_day': cost_per_day,
+            'days': days,
+            'per_cow': per_cow,
+            'per_herd': per_cow * self._column('herd_size')
+        }
+
+    ## ----------------------------------------
+    ## Calves sold and trucks (hidden truck table)
+    @cached_property
+    def calves(self):
+        p = self.p
+        calves_to_sell = p['herd_size'] * (p['percent_calves_sold'] / 100)
+        actual_calves_sold = calves_to_sell - p['calf_death_loss']
+        actual_selling_weight = p['weight_at_weaning'] * (1 + (p['weaning_weight_adjustment'] / 100))
+        expected_calf_sales = calves_to_sell * p['weight_at_weaning'] * p['price_weaning_year1']
+        actual_calf_sales = actual_calves_sold * actual_selling_weight * p['price_weaning_year1']
+        pairs_per_truck = np.ceil(TRUCK_CAPACITY / (p['avg_cow_weight'] + p['current_weight_calves']))
+        cows_per_truck = np.ceil(TRUCK_CAPACITY / p['avg_cow_weight'])
+        values = {
+            'calves_to_sell': calves_to_sell,
+            'actual_calves_sold': actual_calves_sold,
+            'actual_selling_weight': actual_selling_weight,
+            'expected_calf_sales': expected_calf_sales,
+            'actual_calf_sales': actual_calf_sales,
+            'difference_sales': expected_calf_sales - actual_calf_sales,
+            'pairs_per_truck': pairs_per_truck,
+            'cows_per_truck': cows_per_truck,
+            'trucks_needed_pairs': np.ceil(p['herd_size'] / pairs_per_truck),
+            'trucks_needed_cows': np.ceil(p['herd_size'] / cows_per_truck)
+        }
+        return {name: np.broadcast_to(value, self.shape) for name, value in values.items()}
+
+    ## ----------------------------------------
+    ## Option 2: Rent pasture
+    # Items: trucking pairs to pasture, trucking cows to home, pasture rent, other costs,
+    # lost revenues, interest and total
+    @cached_property
+    def rent_pasture(self):
+        p = self.p
+        trucking_pairs = p['distance_to_pasture'] * p['trucking_cost'] * self.calves['trucks_needed_pairs']
+        trucking_cows = p['distance_to_pasture'] * p['trucking_cost'] * self.calves['trucks_needed_cows']
+        rent = (p['pasture_rent'] / 30) * p['days_rented_pasture'] * p['herd_size']
+        other_costs = np.broadcast_to(p['total_other_costs'], self.shape)
+        lost_revenues = self.calves['difference_sales']
+        interest = (trucking_pairs + trucking_cows + rent + other_costs) * (((p['interest_borrowed_money'] / 100) / 360) * p['days_rented_pasture'])
+        total = trucking_pairs + trucking_cows + rent + other_costs + lost_revenues + interest
+        per_herd = np.stack(np.broadcast_arrays(trucking_pairs, trucking_cows, rent, other_costs, lost_revenues, interest, total), axis=-1)
+        return {
+            'per_herd': per_herd,
+            'per_cow': per_herd / self._column('herd_size'),
+            'total': per_herd[..., -1]
+        }
+
+    ## ----------------------------------------
+    ## Option 3: Sell and replace
+    @cached_property
+    def sell_and_replace(self):
+        p = self.p
+        first_days = self.drought['days'][..., 0]
+        calves_sold = p['herd_size'] * (p['percent_calves_sold'] / 100)
+        invested_rate = p['interest_invested_money'] / 100
+
+        # Hidden table 3
+        expected_calf_sales_current_year = calves_sold * p['weight_at_weaning'] * p['price_weaning_year1']
+        actual_calf_sales = (p['herd_size'] * (p['avg_weaning_percentage'] / 100)) * p['current_weight_calves'] * p['current_price_per_lb']
+        difference = expected_calf_sales_current_year - actual_calf_sales
+        expected_calf_sales_year2 = calves_sold * p['weight_at_weaning'] * p['price_weaning_year2']
+        expected_calf_sales_year3 = calves_sold * p['weight_at_weaning'] * p['price_weaning_years3_5']
+        cow_sales = p['herd_size'] * p['current_value_cow']
+        interest_income_year1 = cow_sales * first_days * (invested_rate / 360)
+        interest_income_year2 = (cow_sales + interest_income_year1) * invested_rate
+        interest_income_year3 = (cow_sales + interest_income_year1 + interest_income_year2) * invested_rate
+
+        # Additional costs per herd
+        reduced_calf_sales = difference
+        reduced_op_costs_this_year = p['reduced_operating_costs_year1'] * p['herd_size']
+        additional_costs_selling_cows = p['selling_costs'] * p['herd_size']
+        interest_cow_sales = -1 * (cow_sales * first_days * (invested_rate / 360))
+        total_year1 = reduced_calf_sales + reduced_op_costs_this_year + additional_costs_selling_cows + interest_cow_sales
+        revenues_from_cow_sales = -1 * ((p['herd_size'] - p['cows_culled']) * p['current_value_cow'])
+        interest_income_years_2_3 = -1 * (interest_income_year1 + interest_income_year2 + interest_income_year3)
+        expected_calf_sales_years_2_3 = expected_calf_sales_year2 + expected_calf_sales_year3
+        reduced_op_expenses_years_2_3 = -1 * ((2 * (p['herd_size'] * p['annual_cow_costs'])) - (p['operating_costs_year2'] + p['operating_costs_years3_5']))
+        replacement_cows = p['cost_replacement_animals'] * p['herd_size']
+        total_years_2_3 = revenues_from_cow_sales + interest_income_years_2_3 + expected_calf_sales_years_2_3 + reduced_op_expenses_years_2_3 + replacement_cows
+
+        per_herd = np.stack(np.broadcast_arrays(
+            reduced_calf_sales, reduced_op_costs_this_year, additional_costs_selling_cows, interest_cow_sales, total_year1,
+            revenues_from_cow_sales, interest_income_years_2_3, expected_calf_sales_years_2_3, reduced_op_expenses_years_2_3,
+            replacement_cows, total_years_2_3, total_year1 + total_years_2_3
+        ), axis=-1)
+        values = {
+            'expected_calf_sales_current_year': expected_calf_sales_current_year,
+            'actual_calf_sales': actual_calf_sales,
+            'difference': difference,
+            'expected_calf_sales_year2': expected_calf_sales_year2,
+            'expected_calf_sales_year3': expected_calf_sales_year3,
+            'cow_sales': cow_sales,
+            'initial_money_invested': cow_sales,
+            'interest_income_year1': interest_income_year1,
+            'interest_income_year2': interest_income_year2,
+            'interest_income_year3': interest_income_year3
+        }
+        values = {name: np.broadcast_to(value, self.shape) for name, value in values.items()}
+        values['per_herd'] = per_herd
+        values['per_cow'] = per_herd / self._column('herd_size')
+        return values
+
+    ## ----------------------------------------
+    ## Five-year net worth of each strategy
+    # Year arrays have shape (..., YEARS, strategies); year 1 has no interest nor replacement
+    # purchases, and only year 1 has capital sales and gains
+    @cached_property
+    def net_worth(self):
+        col = self._column
+        herd_size = col('herd_size')
+        cow_costs = herd_size * col('annual_cow_costs')
+        reduced_cow_costs = -herd_size * (col('annual_cow_costs') - col('reduced_operating_costs_year1'))
+        calves_sold = herd_size * (col('percent_calves_sold') / 100)
+        feed_cost_per_day = self.feed['cost_per_day'][..., np.newaxis]
+        days = self.drought['days']
+        months = self.drought['months']
+        current_year = col('current_year')
+        end_year = col('drought_end_year')
+        invested_rate = col('interest_invested_money') / 100
+        borrowed_rate = col('interest_borrowed_money') / 100
+        zeros = np.zeros(self.shape + (1,))
+        prices = [col('price_weaning_year1'), col('price_weaning_year2')] + [col('price_weaning_years3_5')] * 3
+
+        # Starting position (same for every strategy)
+        cows = herd_size * col('current_value_cow')
+        calves = (col('percent_calves_sold') / 100) * col('current_weight_calves') * col('current_price_per_lb')
+        cash = -(herd_size * col('annual_cow_costs') - herd_size * col('reduced_operating_costs_year1'))
+        start = np.concatenate(np.broadcast_arrays(cows, calves, cash, cows + calves + cash), axis=-1)
+        start = np.repeat(start[..., np.newaxis], len(STRATEGIES), axis=-1)
+
+        rows = {name: [] for name in ['revenues', 'operating_costs', 'interest', 'profits', 'taxes', 'after_tax_income',
+                                      'capital_sales', 'capital_gains', 'purchase_females', 'cows', 'cash', 'total']}
+        for year in range(YEARS):
+            price = prices[year]
+            expected = calves_sold * col('weight_at_weaning') * price
+            drought_revenue = (calves_sold - col('calf_death_loss')) * (col('weight_at_weaning') * (1 + (col('weaning_weight_adjustment') / 100))) * price
+            rented = np.where(current_year + year < end_year, drought_revenue, expected)
+
+            if year == 0:
+                # Sell strategies collect the current calf sales this year
+                calf_sales = self.sell_and_replace['actual_calf_sales'][..., np.newaxis]
+                revenues = [expected, expected, rented, calf_sales, calf_sales]
+                operating_costs = [-herd_size * col('annual_cow_costs'),
+                                   -(cow_costs + (days[..., :1] * feed_cost_per_day * herd_size)),
+                                   -(cow_costs + self.rent_pasture['total'][..., np.newaxis]),
+                                   reduced_cow_costs, reduced_cow_costs]
+                interest = zeros
+            else:
+                restocked = np.where(current_year + year > end_year, expected, 0)
+                revenues = [expected, expected, rented, restocked, zeros]
+                # Drought costs only while the year has drought days (the last year reuses the
+                # months of year 4, as the original worksheet does)
+                drought_days = days[..., year:year + 1]
+                drought_months = months[..., min(year, YEARS - 2):min(year, YEARS - 2) + 1]
+                operating_costs = [-herd_size * col('annual_cow_costs'),
+                                   np.where(drought_days > 0, -(cow_costs + (drought_days * feed_cost_per_day * herd_size)), -cow_costs),
+                                   np.where(drought_days > 0, -(cow_costs + (drought_months * col('pasture_rent') * herd_size)), -cow_costs),
+                                   np.where(restocked == 0, -col('operating_costs_year2'), -cow_costs),
+                                   -col('operating_costs_year2')]
+                previous_cash = rows['cash'][-1]
+                interest = np.where(previous_cash > 0, previous_cash * invested_rate, previous_cash * borrowed_rate)
+
+            revenues = np.concatenate(np.broadcast_arrays(*revenues), axis=-1)
+            operating_costs = np.concatenate(np.broadcast_arrays(*operating_costs), axis=-1)
+            profits = revenues + operating_costs + interest if year else revenues + operating_costs
+            taxes = np.where(profits > 0, profits * TAX_RATE, 0)
+            after_tax_income = profits - taxes
+
+            if year == 0:
+                capital_sales = np.concatenate(np.broadcast_arrays(zeros, zeros, zeros, cows, cows), axis=-1)
+                capital_gains = np.concatenate(np.broadcast_arrays(
+                    zeros, zeros, zeros, zeros, (herd_size * (col('current_value_cow') - col('tax_basis_cow'))) * (col('capital_gains_tax_rate') / 100)
+                ), axis=-1)
+                purchase_females = np.zeros_like(revenues)
+                cows_worth = np.repeat(cows, len(STRATEGIES), axis=-1) - capital_sales
+                cash_worth = after_tax_income + capital_sales - capital_gains
+            else:
+                capital_sales = capital_gains = np.zeros_like(revenues)
+                purchase = np.where(current_year + year == end_year, herd_size * col('cost_replacement_animals'), 0)
+                purchase_females = np.concatenate(np.broadcast_arrays(zeros, zeros, zeros, purchase, zeros), axis=-1)
+                previous_cows = rows['cows'][-1]
+                kept_herd = np.where(purchase > 0, herd_size * col('cost_replacement_animals'), previous_cows[..., :1] + purchase)
+                cows_worth = np.concatenate(np.broadcast_arrays(kept_herd, kept_herd, kept_herd,
+                                                                previous_cows[..., 3:4] + purchase, previous_cows[..., 4:5] + zeros), axis=-1)
+                # Replacement purchases are paid from cash from year 3 on
+                cash_worth = rows['cash'][-1] + after_tax_income if year == 1 else rows['cash'][-1] + after_tax_income - purchase_females
+
+            for name, value in zip(rows, [revenues, operating_costs, np.broadcast_to(interest, revenues.shape), profits, taxes,
+                                          after_tax_income, capital_sales, capital_gains, purchase_females,
+                                          cows_worth, cash_worth, cows_worth + cash_worth]):
+                rows[name].append(value)
+
+        projection = {name: np.stack(values, axis=-2) for name, values in rows.items()}
+        projection['start'] = start
+        start_total = start[..., 3, :]
+        change = projection['total'][..., -1, :] - start_total
+        projection['change_total'] = change
+        projection['change_per_cow'] = change / herd_size
+        projection['change_percent'] = (change / start_total) * 100
+        return projection
+
+    # Best and worst strategy from the 5-year percentage change (indices into STRATEGIES)
+    def best_strategy(self):
+        return np.argmax(self.net_worth['change_percent'], axis=-1)
+
+    def worst_strategy(self):
+        return np.argmin(self.net_worth['change_percent'], axis=-1)
+
+
+# Evaluate the model with errors from empty or zero inputs silenced (they show as nan/inf)
+def evaluate(params):
+    model = HerdStrategyModel(params)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        model.net_worth
+    return model
@@ -0,0 +1,132 @@
+# ------------------------------------------------------------------------------
+# Monte Carlo simulation of the herd strategy model
+#
+# Uncertain inputs are sampled around the values entered on the decision page:
+#   - Calf prices: year-over-year changes bootstrapped from a historical MMN Feeder Cattle
+#     series (lognormal changes when no history is available)
+#   - Drought length: months until the end of the drought, lognormal around the entered end date
+#   - Hay cost: lognormal around the entered price per ton
+# Scenarios are generated in fixed-size chunks, each with its own RNG stream spawned from one
+# seed, so results only depend on the seed and not on how chunks are spread over processes.
+
+import itertools
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from utils import workers
+from utils.herd_model import DROUGHT_STRATEGIES, STRATEGIES
+from utils.herd_sweep import evaluate_columns
+
+# ------------------------------------------------------------------------------
+# Constants
+
+N_SCENARIOS = 10000
+CHUNK_SIZE = 5000
+# Scenarios from which the chunks are spread over the process pool (~20 ms per chunk, well
+# above the cost of sending it to a pool process), so the default run uses two processes
+PARALLEL_THRESHOLD = 2 * CHUNK_SIZE
+# Fallback spread of the yearly calf price change (log scale) when no history is available
+CALF_PRICE_SIGMA = 0.15
+
+
+# ------------------------------------------------------------------------------
+# Calf price history
+
+# Year-over-year log changes of a daily price series (report_date, avg_price)
+def annual_log_changes(df):
+    prices = df.groupby('report_date')['avg_price'].mean().sort_index()
+    prices = prices[prices > 0]
+    if len(prices) < 2:
+        return np.array([])
+    dates = prices.index.values
+    # Price about one year after each report (first report at least 365 days later)
+    later = np.searchsorted(dates, dates + np.timedelta64(365, 'D'))
+    valid = later < len(prices)
+    return np.log(prices.values[later[valid]] / prices.values[valid])
+
+
+# ------------------------------------------------------------------------------
+# Sampling
+
+@dataclass
+class UncertaintySettings:
+    # Yearly log changes of calf prices; empty to use CALF_PRICE_SIGMA
+    calf_price_changes: np.ndarray = None
+    # Spread (log scale) of the drought length and of the hay price
+    drought_length_sigma: float = 0.5
+    hay_price_sigma: float = 0.25
+
+
+# Yearly calf price multipliers (n, 3) for year 1, year 2 and years 3-5, centred on 1
+def sample_calf_price_multipliers(rng, n, settings):
+    changes = settings.calf_price_changes
+    if changes is not None and len(changes) > 0:
+        # Historical variability around the prices entered by the user
+        steps = rng.choice(changes - changes.mean(), size=(n, 3), replace=True)
+    else:
+        steps = rng.normal(-CALF_PRICE_SIGMA ** 2 / 2, CALF_PRICE_SIGMA, size=(n, 3))
+    return np.exp(np.cumsum(steps, axis=1))
+
+
+# Sampled parameter columns for n scenarios
+def sample_scenarios(rng, n, base, settings):
+    prices = sample_calf_price_multipliers(rng, n, settings)
+
+    # Months from now until the end of the drought, as end year and month
+    months_left = (base.drought_end_year - base.current_year) * 12 + base.drought_end_month - base.current_month
+    months_left = np.maximum(months_left, 1) * rng.lognormal(0, settings.drought_length_sigma, n)
+    months_left = np.clip(np.round(months_left), 1, 12 * 4)
+    end = base.current_year * 12 + base.current_month - 1 + months_left
+    return {
+        'price_weaning_year1': base.price_weaning_year1 * prices[:, 0],
+        'price_weaning_year2': base.price_weaning_year2 * prices[:, 1],
+        'price_weaning_years3_5': base.price_weaning_years3_5 * prices[:, 2],
+        'drought_end_year': end // 12,
+        'drought_end_month': end % 12 + 1,
+        'hay_per_ton': base.hay_per_ton * rng.lognormal(-settings.hay_price_sigma ** 2 / 2, settings.hay_price_sigma, n)
+    }
+
+
+def _simulate_chunk(base, settings, seed, n):
+    rng = np.random.default_rng(seed)
+    columns = sample_scenarios(rng, n, base, settings)
+    change = evaluate_columns(base, columns, max_workers=1)['change_percent']
+    return columns, change
+
+
+# ------------------------------------------------------------------------------
+# Simulation
+
+# Run n scenarios. Returns the sampled inputs and the 5-year change (%) of every strategy.
+def simulate(base, settings=None, n=N_SCENARIOS, seed=0, max_workers=None):
+    settings = settings or UncertaintySettings()
+    sizes = [min(CHUNK_SIZE, n - start) for start in range(0, n, CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if n < PARALLEL_THRESHOLD or max_workers == 1:
+        results = list(map(_simulate_chunk, itertools.repeat(base), itertools.repeat(settings), seeds, sizes))
+    else:
+        results = workers.map(_simulate_chunk, itertools.repeat(base), itertools.repeat(settings), seeds, sizes)
+
+    scenarios = pd.DataFrame({name: np.concatenate([columns[name] for columns, _ in results]) for name in results[0][0]})
+    change = np.concatenate([change for _, change in results])
+    return scenarios, pd.DataFrame(change, columns=STRATEGIES)
+
+
+# Probability of each drought strategy being the best one, with percentiles of its 5-year change (%).
+# "Normal conditions" is the no-drought baseline, not an option, so it is left out.
+def summarize(change):
+    values = change[DROUGHT_STRATEGIES].to_numpy()
+    values = np.where(np.isfinite(values), values, np.nan)
+    best = np.argmax(np.where(np.isnan(values), -np.inf, values), axis=1)
+    summary = pd.DataFrame({
+        'strategy': DROUGHT_STRATEGIES,
+        'p_best': np.bincount(best, minlength=len(DROUGHT_STRATEGIES)) / len(values),
+        'mean': np.nanmean(values, axis=0),
+        'p5': np.nanpercentile(values, 5, axis=0),
+        'median': np.nanpercentile(values, 50, axis=0),
+        'p95': np.nanpercentile(values, 95, axis=0)
+    })
+    return summary
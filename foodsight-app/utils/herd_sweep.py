@@ -0,0 +1,164 @@
+# ------------------------------------------------------------------------------
+# Parameter sweeps over the herd strategy model
+#
+# A sweep evaluates every point of a cartesian grid of parameters in one vectorized pass of
+# HerdStrategyModel. Large grids are split in chunks and spread over the process pool of the
+# web worker (utils/workers.py).
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from utils import workers
+from utils.herd_model import HerdParameters, DROUGHT_STRATEGIES, STRATEGIES, evaluate
+
+# ------------------------------------------------------------------------------
+# Constants
+
+# Grids smaller than this are evaluated in the calling process
+PARALLEL_THRESHOLD = 100000
+CHUNK_SIZE = 50000
+# Calendar inputs are moved by whole months/years in the sensitivity analysis
+CALENDAR_PARAMETERS = ['current_month', 'current_year', 'drought_end_month', 'drought_end_year']
+
+
+# ------------------------------------------------------------------------------
+# Evaluation
+
+# Outcome of every strategy for a batch of parameter sets, as arrays (..., strategy)
+def evaluate_outcomes(params):
+    projection = evaluate(params).net_worth
+    return {
+        'net_worth': projection['total'][..., -1, :],
+        'change_total': projection['change_total'],
+        'change_per_cow': projection['change_per_cow'],
+        'change_percent': projection['change_percent']
+    }
+
+
+def _evaluate_chunk(base, columns):
+    return evaluate_outcomes(HerdParameters(**{**base, **columns}))
+
+
+def _chunks(columns, size):
+    n = len(next(iter(columns.values())))
+    for start in range(0, n, size):
+        yield {name: values[start:start + size] for name, values in columns.items()}
+
+
+# Evaluate flat parameter columns (name -> 1-d array), in parallel when the batch is large
+# (max_workers=1 keeps every chunk in the calling process)
+def evaluate_columns(base, columns, max_workers=None, chunk_size=CHUNK_SIZE):
+    base = base.to_dict() if isinstance(base, HerdParameters) else dict(base)
+    columns = {name: np.asarray(values, dtype=float) for name, values in columns.items()}
+    n = len(next(iter(columns.values()))) if columns else 1
+
+    if n < PARALLEL_THRESHOLD or max_workers == 1:
+        return _evaluate_chunk(base, columns)
+
+    results = workers.map(_evaluate_chunk, itertools.repeat(base), _chunks(columns, chunk_size))
+    return {key: np.concatenate([result[key] for result in results]) for key in results[0]}
+
+
+# Best drought strategy of each parameter set: (index in DROUGHT_STRATEGIES, its change %).
+# "Normal conditions" (first strategy) is the no-drought baseline and is never picked.
+def best_drought_strategy(change_percent):
+    change = np.where(np.isfinite(change_percent), change_percent, -np.inf)[..., 1:]
+    return np.argmax(change, axis=-1), change.max(axis=-1)
+
+
+# ------------------------------------------------------------------------------
+# Sweeps
+
+# Flat columns with every combination of the grid values (name -> sequence of values)
+def grid_columns(grid):
+    names = list(grid)
+    axes = np.meshgrid(*[np.asarray(grid[name], dtype=float) for name in names], indexing='ij')
+    return {name: axis.ravel() for name, axis in zip(names, axes)}
+
+
+# Net-worth outcome of every strategy for each point of the grid.
+# Returns one row per grid point and strategy, with the swept parameters as columns and
+# 'best' flagging the drought strategy with the largest 5-year percentage change.
+def sweep(base, grid, max_workers=None):
+    unknown = set(grid) - set(HerdParameters.names())
+    if unknown:
+        raise ValueError(f"Error: unknown parameters {sorted(unknown)}")
+
+    columns = grid_columns(grid)
+    outcomes = evaluate_columns(base, columns, max_workers=max_workers)
+    n_points = len(next(iter(columns.values())))
+    n_strategies = len(STRATEGIES)
+
+    df = pd.DataFrame({name: np.repeat(values, n_strategies) for name, values in columns.items()})
+    df['strategy'] = np.tile(STRATEGIES, n_points)
+    for key, values in outcomes.items():
+        df[key] = values.ravel()
+    best, _ = best_drought_strategy(outcomes['change_percent'])
+    df['best'] = (np.array(STRATEGIES) == np.array(DROUGHT_STRATEGIES)[best][:, np.newaxis]).ravel()
+    return df
+
+
+# Best drought strategy over a 2-d grid:
+# (x values, y values, best strategy index in DROUGHT_STRATEGIES (y, x), best change %)
+def best_strategy_surface(base, x, x_values, y, y_values, max_workers=None):
+    columns = grid_columns({y: y_values, x: x_values})
+    change = evaluate_columns(base, columns, max_workers=max_workers)['change_percent']
+    shape = (len(y_values), len(x_values))
+    best, outcome = best_drought_strategy(change)
+    return np.asarray(x_values), np.asarray(y_values), best.reshape(shape), outcome.reshape(shape)
+
+
+# ------------------------------------------------------------------------------
+# Sensitivity (tornado)
+
+# Low and high value of each parameter around the base set
+def perturbations(base, names=None, delta=0.2):
+    names = names or HerdParameters.names()
+    values = base.to_dict()
+    bounds = {}
+    for name in names:
+        value = float(values[name])
+        if name in CALENDAR_PARAMETERS:
+            low, high = value - 1, value + 1
+            if name.endswith('month'):
+                low, high = max(low, 1), min(high, 12)
+        elif value == 0:
+            continue
+        else:
+            low, high = value * (1 - delta), value * (1 + delta)
+        bounds[name] = (low, high)
+    return bounds
+
+
+# Best drought strategy and its 5-year change when each parameter is moved to its low and high value,
+# sorted by the swing of the outcome. 'flips' marks inputs that change the best strategy.
+def sensitivity(base, names=None, delta=0.2):
+    bounds = perturbations(base, names, delta)
+    names = list(bounds)
+    n = len(names)
+
+    # One batch: the base set followed by the low and high set of every parameter
+    columns = {name: np.full(2 * n + 1, float(getattr(base, name))) for name in names}
+    for i, name in enumerate(names):
+        columns[name][1 + 2 * i] = bounds[name][0]
+        columns[name][2 + 2 * i] = bounds[name][1]
+    change = evaluate_columns(base, columns, max_workers=1)['change_percent']
+    best, outcome = best_drought_strategy(change)
+
+    df = pd.DataFrame({
+        'parameter': names,
+        'low_value': [bounds[name][0] for name in names],
+        'high_value': [bounds[name][1] for name in names],
+        'low_best': [DROUGHT_STRATEGIES[i] for i in best[1::2]],
+        'high_best': [DROUGHT_STRATEGIES[i] for i in best[2::2]],
+        'low_change': outcome[1::2],
+        'high_change': outcome[2::2]
+    })
+    df['base_best'] = DROUGHT_STRATEGIES[best[0]]
+    df['base_change'] = outcome[0]
+    df['flips'] = (df['low_best'] != df['base_best']) | (df['high_best'] != df['base_best'])
+    df['swing'] = (df['high_change'] - df['low_change']).abs()
+    return df.sort_values('swing', ascending=True, ignore_index=True)
+
@@ -0,0 +1,289 @@
+# ------------------------------------------------------------------------------
+# Callback metrics and profiling
+#
+# Opt-in metrics: with FOODSIGHT_METRICS=1, every Dash callback request (/_dash-update-component)
+# is timed by Flask hooks on the server: wall time, CPU time of the request thread, payload bytes
+# in and out and the input that triggered it. The metrics are served in the Prometheus text format
+# on /metrics, with a table of the slowest callbacks on /metrics/callbacks.
+#
+# Each gunicorn worker writes its counters to its own file in FOODSIGHT_METRICS_DIR (.metrics in
+# the app folder, at most once a second and when it exits), and the worker answering a scrape
+# adds up the files of every worker, so the counters cover the whole host and never go back when
+# the load balancer picks another worker. The files of restarted workers are kept (their requests
+# stay counted) until the folder is cleared when gunicorn starts (gunicorn.conf.py).
+#
+# Opt-in profiler: FOODSIGHT_PROFILE=1 profiles a sample of the callback requests with cProfile
+# and keeps the profiles of the ones slower than the threshold (open them with snakeviz or
+# flameprof to get a flamegraph).
+
+import atexit
+import cProfile
+import copy
+import itertools
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+
+import flask
+from markupsafe import escape
+
+# ------------------------------------------------------------------------------
+# Settings
+
+metrics_enabled = os.environ.get('FOODSIGHT_METRICS', '0') == '1'
+metrics_dir = os.environ.get('FOODSIGHT_METRICS_DIR',
+                             os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.metrics'))
+flush_interval = 1  # Seconds between two writes of the counters of a worker
+profile_enabled = os.environ.get('FOODSIGHT_PROFILE', '0') == '1'
+profile_rate = float(os.environ.get('FOODSIGHT_PROFILE_RATE', 1))  # Fraction of requests profiled
+profile_threshold = float(os.environ.get('FOODSIGHT_PROFILE_THRESHOLD', 1))  # Seconds
+profile_dir = os.environ.get('FOODSIGHT_PROFILE_DIR', 'profiles')
+
+# Upper bounds (seconds) of the latency histogram buckets
+BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30]
+
+CALLBACK_PATH = '/_dash-update-component'
+
+
+# ------------------------------------------------------------------------------
+# Metrics
+
+# Counters of the callback requests. With a directory, the counters of this process are written
+# to it and the reports add up the counters of every process that wrote there.
+class CallbackMetrics:
+    def __init__(self, buckets=BUCKETS, directory=None):
+        self.buckets = buckets
+        self.directory = directory
+        self._reset()
+        # A forked process (background callback job) starts with empty counters and its own file
+        os.register_at_fork(after_in_child=self._reset)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+            atexit.register(self.flush)
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        # callback -> totals and latency histogram
+        self._callbacks = {}
+        # (callback, trigger, status) -> number of calls
+        self._calls = {}
+        # File of this process (unique: the pids of restarted workers are reused)
+        self._path = os.path.join(self.directory, f"{os.getpid()}-{uuid.uuid4().hex}.json") if self.directory else None
+        self._next_flush = 0
+
+    def observe(self, callback, trigger, status, wall, cpu, bytes_in, bytes_out):
+        with self._lock:
+            stats = self._callbacks.setdefault(callback, {
+                'count': 0, 'wall': 0.0, 'cpu': 0.0, 'bytes_in': 0, 'bytes_out': 0, 'max': 0.0,
+                'buckets': [0] * len(self.buckets)
+            })
+            stats['count'] += 1
+            stats['wall'] += wall
+            stats['cpu'] += cpu
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+            stats['max'] = max(stats['max'], wall)
+            for i, bound in enumerate(self.buckets):
+                if wall <= bound:
+                    stats['buckets'][i] += 1
+            key = (callback, trigger, status)
+            self._calls[key] = self._calls.get(key, 0) + 1
+            if self._path and time.monotonic() >= self._next_flush:
+                self._write()
+
+    # ------------------------------------------------------------------------------
+    # Shared counters
+
+    # Write the counters of this process (under the lock, so an older state never replaces a newer one)
+    def _write(self):
+        self._next_flush = time.monotonic() + flush_interval
+        state = {'callbacks': self._callbacks,
+                 'calls': [[*key, count] for key, count in self._calls.items()]}
+        tmp_path = f"{self._path}.tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump(state, file)
+        os.replace(tmp_path, self._path)
+
+    def flush(self):
+        with self._lock:
+            if self._path and self._callbacks:
+                self._write()
+
+    # Counters of every process: (callback -> totals and histogram, (callback, trigger, status) -> calls)
+    def snapshot(self):
+        with self._lock:
+            if not self._path:
+                return copy.deepcopy(self._callbacks), dict(self._calls)
+            if self._callbacks:
+                self._write()
+
+        callbacks, calls = {}, {}
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path) as file:
+                    state = json.load(file)
+            except (FileNotFoundError, ValueError):
+                continue
+            for callback, stats in state['callbacks'].items():
+                total = callbacks.get(callback)
+                if total is None:
+                    callbacks[callback] = stats
+                    continue
+                for key in ['count', 'wall', 'cpu', 'bytes_in', 'bytes_out']:
+                    total[key] += stats[key]
+                total['max'] = max(total['max'], stats['max'])
+                total['buckets'] = [a + b for a, b in zip(total['buckets'], stats['buckets'])]
+            for callback, trigger, status, count in state['calls']:
+                key = (callback, trigger, status)
+                calls[key] = calls.get(key, 0) + count
+        return callbacks, calls
+
+    # ------------------------------------------------------------------------------
+    # Reports
+
+    # Totals per callback, slowest (total wall time) first
+    def summary(self):
+        callbacks, _ = self.snapshot()
+        rows = [{'callback': callback, **{k: v for k, v in stats.items() if k != 'buckets'}}
+                for callback, stats in callbacks.items()]
+        for row in rows:
+            row['mean'] = row['wall'] / row['count']
+        return sorted(rows, key=lambda row: row['wall'], reverse=True)
+
+    # Metrics in the Prometheus text exposition format
+    def render(self):
+        callbacks, calls = self.snapshot()
+        lines = ['# HELP dash_callback_calls_total Callback requests by triggering input and status',
+                 '# TYPE dash_callback_calls_total counter']
+        for (callback, trigger, status), count in sorted(calls.items()):
+            lines.append(f'dash_callback_calls_total{{callback="{_escape(callback)}",trigger="{_escape(trigger)}",status="{status}"}} {count}')
+
+        lines += ['# HELP dash_callback_duration_seconds Wall time of the callback requests',
+                  '# TYPE dash_callback_duration_seconds histogram']
+        for callback, stats in sorted(callbacks.items()):
+            label = f'callback="{_escape(callback)}"'
+            for bound, count in zip(self.buckets, stats['buckets']):
+                lines.append(f'dash_callback_duration_seconds_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'dash_callback_duration_seconds_bucket{{{label},le="+Inf"}} {stats["count"]}')
+            lines.append(f'dash_callback_duration_seconds_sum{{{label}}} {stats["wall"]:.6f}')
+            lines.append(f'dash_callback_duration_seconds_count{{{label}}} {stats["count"]}')
+
+        for name, key, help_text in [
+            ('dash_callback_cpu_seconds_total', 'cpu', 'CPU time of the callback requests'),
+            ('dash_callback_request_bytes_total', 'bytes_in', 'Request payload bytes'),
+            ('dash_callback_response_bytes_total', 'bytes_out', 'Response payload bytes')
+        ]:
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+            for callback, stats in sorted(callbacks.items()):
+                value = f'{stats[key]:.6f}' if key == 'cpu' else stats[key]
+                lines.append(f'{name}{{callback="{_escape(callback)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Callback name (its outputs, e.g. "page-content.children") and triggering input of a request.
+# Result polls of the background callbacks (?job=...) are labelled "poll".
+def callback_labels(body, args=None):
+    body = body or {}
+    callback = body.get('output', 'unknown').strip('.')
+    if args and args.get('job'):
+        return callback, 'poll'
+    triggers = body.get('changedPropIds') or []
+    return callback, triggers[0] if triggers else 'initial'
+
+
+# ------------------------------------------------------------------------------
+# Profiler
+
+# Profiles dumped by this process (keeps file names unique within a second)
+_profile_ids = itertools.count()
+
+def _profile_path(callback, wall):
+    name = re.sub(r'[^A-Za-z0-9_.-]+', '_', callback)[:80]
+    return os.path.join(profile_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}-{next(_profile_ids)}_{name}_{int(wall * 1000)}ms.prof")
+
+
+# ------------------------------------------------------------------------------
+# Flask hooks
+
+# Remove the counters of the previous run (called by gunicorn before it starts the workers)
+def clear_shared_metrics(directory=metrics_dir):
+    if not os.path.isdir(directory):
+        return
+    for entry in os.scandir(directory):
+        if entry.name.endswith(('.json', '.tmp')):
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+
+# Time the callback requests of a Flask server and add the /metrics routes (FOODSIGHT_METRICS=1),
+# and profile them (FOODSIGHT_PROFILE=1). Returns the metrics, None when they are disabled.
+def instrument(server, metrics=None):
+    if metrics is None and metrics_enabled:
+        metrics = CallbackMetrics(directory=metrics_dir)
+    if metrics is None and not profile_enabled:
+        return None
+
+    @server.before_request
+    def start_timer():
+        if flask.request.path != CALLBACK_PATH:
+            return
+        flask.g.callback_start = (time.perf_counter(), time.thread_time())
+        flask.g.callback_profiler = None
+        if profile_enabled and random.random() < profile_rate:
+            flask.g.callback_profiler = cProfile.Profile()
+            flask.g.callback_profiler.enable()
+
+    @server.after_request
+    def record_metrics(response):
+        start = flask.g.pop('callback_start', None)
+        if start is None:
+            return response
+        profiler = flask.g.pop('callback_profiler', None)
+        if profiler is not None:
+            profiler.disable()
+        wall = time.perf_counter() - start[0]
+        cpu = time.thread_time() - start[1]
+
+        callback, trigger = callback_labels(flask.request.get_json(silent=True), flask.request.args)
+        if metrics is not None:
+            bytes_out = response.calculate_content_length() or 0
+            metrics.observe(callback, trigger, response.status_code, wall, cpu,
+                            flask.request.content_length or 0, bytes_out)
+
+        if profiler is not None and wall >= profile_threshold:
+            os.makedirs(profile_dir, exist_ok=True)
+            profiler.dump_stats(_profile_path(callback, wall))
+        return response
+
+    if metrics is None:
+        return None
+
+    @server.route('/metrics')
+    def serve_metrics():
+        return flask.Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+    @server.route('/metrics/callbacks')
+    def serve_callback_table():
+        rows = ''.join(
+            f"<tr><td>{escape(row['callback'])}</td><td>{row['count']}</td>"
+            f"<td>{row['wall']:.2f}</td><td>{row['mean'] * 1000:.0f}</td><td>{row['max'] * 1000:.0f}</td>"
+            f"<td>{row['cpu']:.2f}</td><td>{row['bytes_in']}</td><td>{row['bytes_out']}</td></tr>"
+            for row in metrics.summary()
+        )
+        return ("<table><tr><th>Callback</th><th>Calls</th><th>Total (s)</th><th>Mean (ms)</th>"
+                "<th>Max (ms)</th><th>CPU (s)</th><th>Bytes in</th><th>Bytes out</th></tr>"
+                f"{rows}</table>")
+
+    return metrics
@@ -0,0 +1,68 @@
+# ------------------------------------------------------------------------------
+# MMN API client
+#
+# One HTTP session shared by the pages, so the connections to the MMN API are kept alive
+# between callbacks. Every request has a connect and read timeout, and only MMN_MAX_CONCURRENT
+# requests wait on the API at the same time: when the API is slow, the other callbacks get
+# the "unavailable" message instead of piling up and taking every thread of the worker.
+# On gevent workers (gunicorn.conf.py) the session is cooperative, so a request waiting on
+# the API does not block the worker.
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# ------------------------------------------------------------------------------
+# Settings
+
+# MMN_BASE_URL points the pages to a fake server, see tools/fake_mmn_server.py
+mmn_base_url = os.environ.get('MMN_BASE_URL', "https://marsapi.ams.usda.gov")
+connect_timeout = float(os.environ.get('MMN_CONNECT_TIMEOUT', 3.05))  # Seconds
+read_timeout = float(os.environ.get('MMN_READ_TIMEOUT', 20))  # Seconds
+max_concurrent = int(os.environ.get('MMN_MAX_CONCURRENT', 8))  # Requests waiting on the API per worker
+pool_size = int(os.environ.get('MMN_POOL_SIZE', 16))  # Connections kept alive per worker
+
+UNAVAILABLE = "The access to the API is temporarily unavailable"
+DECODING_ERROR = "Error decoding JSON response from the API"
+
+
+# ------------------------------------------------------------------------------
+# Session
+
+def create_session():
+    session = requests.Session()
+    # Retry once when the connection fails (never after the request was sent)
+    retries = Retry(total=1, connect=1, read=0, status=0, backoff_factor=0.2)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retries)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+session = create_session()
+slots = threading.BoundedSemaphore(max_concurrent)
+
+
+## API call function
+# Returns the JSON response, or an error message (str) when the API cannot be reached in time
+def get_data_from_mmnapi(api_key, endpoint):
+    # Every slot busy for longer than a connection: the API is slow, do not wait for it
+    if not slots.acquire(timeout=connect_timeout):
+        return UNAVAILABLE
+    try:
+        response = session.get(mmn_base_url + endpoint, auth=(api_key, ''), timeout=(connect_timeout, read_timeout))
+
+        if response.status_code == 200:
+            return response.json()
+        else:
+            response.raise_for_status()
+    except requests.exceptions.RequestException as e:
+        # Handle request-related errors (e.g., network issues, invalid URLs, timeouts)
+        return UNAVAILABLE
+    except ValueError as e:
+        # Handle JSON decoding errors
+        return DECODING_ERROR
+    finally:
+        slots.release()
@@ -0,0 +1,82 @@
+# ------------------------------------------------------------------------------
+# Lazy data registry
+#
+# Datasets are registered by name with the function that loads them. A dataset is loaded the
+# first time it is requested and then kept in memory, so importing the pages does not download
+# anything and the server can answer requests right after it boots. warm_up() loads every
+# dataset in a background thread, so most of them are ready before a page asks for them.
+#
+#   @registry.register('df_hist')
+#   def load_df_hist():
+#       return pd.read_csv(...)
+#
+#   df_hist = registry.get('df_hist')
+
+import os
+import threading
+import time
+
+
+class DataRegistry:
+    def __init__(self):
+        self._loaders = {}
+        self._values = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+        # A process forked while a dataset is loading (background callback jobs) starts with
+        # its lock held and no thread to release it: give the child new locks. The child loads
+        # the dataset itself if the parent had not finished it.
+        os.register_at_fork(after_in_child=self._reset_locks)
+
+    def _reset_locks(self):
+        self._lock = threading.Lock()
+        self._locks = {name: threading.Lock() for name in self._loaders}
+
+    # Register a loader (also usable as a decorator: @registry.register(name))
+    def register(self, name, loader=None):
+        if loader is None:
+            return lambda function: self.register(name, function)
+        with self._lock:
+            self._loaders[name] = loader
+            self._locks[name] = threading.Lock()
+        return loader
+
+    def names(self):
+        return list(self._loaders)
+
+    def is_loaded(self, name):
+        return name in self._values
+
+    # Dataset value, loaded on the first call. Concurrent calls wait for the same load.
+    # Errors are raised to the caller and the dataset is loaded again on the next call.
+    def get(self, name):
+        if name in self._values:
+            return self._values[name]
+        if name not in self._loaders:
+            raise KeyError(f"Error: unknown dataset '{name}'")
+        with self._locks[name]:
+            if name not in self._values:
+                self._values[name] = self._loaders[name]()
+        return self._values[name]
+
+    # Load the datasets (all of them by default) in a background thread
+    def warm_up(self, names=None):
+        names = list(names or self.names())
+
+        def load():
+            for name in names:
+                start = time.time()
+                try:
+                    self.get(name)
+                except Exception as e:
+                    print(f"Error: dataset '{name}' could not be loaded ({e})")
+                    continue
+                print(f"Dataset '{name}' loaded in {time.time() - start:.2f} s")
+
+        thread = threading.Thread(target=load, name='data-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+
+# Registry shared by the application and the pages
+registry = DataRegistry()
@@ -0,0 +1,120 @@
+# ------------------------------------------------------------------------------
+# Lasso selection engine
+#
+# The gridids of the AOI grid are mapped once to dense integer offsets (0 ... n-1, the position of
+# the gridid in the sorted gridids): gdf_hist and gdf_forecast carry the offset of each row in
+# their 'cell' column (utils/datasets.py). A lasso selection is then a boolean mask over the
+# cells, and filtering a frame, the AOI membership, the means by year or report date and the
+# centroid of the selection are array operations on that mask instead of isin() lookups and
+# geometry unions over the selected cells.
+#
+#   selection = from_store(registry.get('grid_index'), selected_data_store)
+#   dff_forcast_selected = selection.filter(gdf_forecast)
+
+import functools
+import json
+import warnings
+
+import numpy as np
+import pandas as pd
+from shapely.geometry import Point
+
+# ------------------------------------------------------------------------------
+# Grid index
+
+class GridIndex:
+    def __init__(self, gridids, x, y, area, aoi, aoi_names):
+        self.gridids = gridids  # Sorted gridids: offset -> gridid
+        self.x = x  # Cell centroids (degrees)
+        self.y = y
+        self.area = area  # Cell areas (square degrees, weights of the centroid)
+        self.aoi = aoi  # AOI code of each cell, position in aoi_names (-1: none)
+        self.aoi_names = aoi_names
+
+    # Index of the AOI grid (GeoDataFrame with gridid and geometry), with the AOIs of the AOI index
+    @classmethod
+    def from_grid(cls, aoi_grid, aoi_index):
+        order = np.argsort(aoi_grid['gridid'].to_numpy(), kind='stable')
+        gridids = aoi_grid['gridid'].to_numpy()[order]
+        geometry = aoi_grid.geometry.iloc[order]
+        with warnings.catch_warnings():
+            # Centroids in geographic coordinates, like the overlays of the forecast page
+            warnings.simplefilter('ignore', UserWarning)
+            centroids = geometry.centroid
+            area = geometry.area.to_numpy()
+        return cls(gridids, centroids.x.to_numpy(), centroids.y.to_numpy(), area,
+                   aoi_index.codes(gridids), aoi_index.names)
+
+    def __len__(self):
+        return len(self.gridids)
+
+    # Offsets of the gridids (-1 for the gridids that are not in the grid)
+    def offsets(self, gridids):
+        gridids = np.asarray(gridids)
+        positions = np.searchsorted(self.gridids, gridids).clip(0, len(self.gridids) - 1)
+        return np.where(self.gridids[positions] == gridids, positions, -1)
+
+    # Boolean mask of the cells of the gridids
+    def mask(self, gridids):
+        mask = np.zeros(len(self.gridids), dtype=bool)
+        offsets = self.offsets(gridids)
+        mask[offsets[offsets >= 0]] = True
+        return mask
+
+
+# ------------------------------------------------------------------------------
+# Selections
+
+class Selection:
+    def __init__(self, index, mask):
+        self.index = index
+        self.mask = mask
+
+    def __len__(self):
+        return int(self.mask.sum())
+
+    @property
+    def gridids(self):
+        return self.index.gridids[self.mask]
+
+    # Rows of the frame (with a 'cell' column) in the selection
+    def rows(self, frame):
+        return self.mask[frame['cell'].to_numpy()]
+
+    def filter(self, frame):
+        return frame[self.rows(frame)]
+
+    # Mean of the columns over the selected rows, by value of the `by` column (sorted), NaN skipped
+    def means(self, frame, columns, by):
+        rows = self.rows(frame)
+        groups, codes = np.unique(frame[by].to_numpy()[rows], return_inverse=True)
+        result = {by: groups}
+        for column in columns:
+            values = frame[column].to_numpy(dtype=float)[rows]
+            valid = ~np.isnan(values)
+            sums = np.bincount(codes, weights=np.where(valid, values, 0), minlength=len(groups))
+            counts = np.bincount(codes, weights=valid, minlength=len(groups))
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[column] = sums / counts
+        return pd.DataFrame(result)
+
+    # 'sw' when every selected cell is in the sw AOI, 'gp' otherwise (also for equal counts,
+    # to avoid problems with differences in data split)
+    def dominant_aoi(self):
+        if 'sw' not in self.index.aoi_names:
+            return 'gp'
+        sw = self.index.aoi_names.index('sw')
+        return 'sw' if np.all(self.index.aoi[self.mask] == sw) else 'gp'
+
+    # Centroid of the selected area (centroids of the cells weighted by their areas)
+    def centroid(self):
+        weights = self.index.area[self.mask]
+        return Point(np.average(self.index.x[self.mask], weights=weights),
+                     np.average(self.index.y[self.mask], weights=weights))
+
+
+# Selection stored by store_selected_map_data (JSON list of gridids). The callbacks triggered by
+# the same lasso selection share it.
+@functools.lru_cache(maxsize=32)
+def from_store(index, selected_data_store):
+    return Selection(index, index.mask(json.loads(selected_data_store)))
@@ -0,0 +1,276 @@
+# ------------------------------------------------------------------------------
+# Single-flight for the callbacks
+#
+# When many users open the same view at the same time (e.g. /forecast with the default county
+# right after a GrassCast release), identical callback requests arrive together. Wrapped
+# callbacks compute each set of inputs once: the first request computes the result and the
+# identical requests arriving meanwhile wait for it and share it. The key is built like the cache
+# key of the Dash background callbacks: the callback, its arguments and the triggering inputs.
+#
+# Waiters share the result (or the error) of the running call. Across processes
+# (gunicorn workers, background jobs), FOODSIGHT_SINGLEFLIGHT selects how they coordinate:
+#   - file (default): lock files and result files in FOODSIGHT_SINGLEFLIGHT_DIR (.singleflight in
+#     the app folder), for the workers of one host (nothing is kept open, so it also works in the
+#     processes forked for background jobs). The results are pickles: the folder must belong to
+#     the user of the app and not be writable by anyone else.
+#   - local: no coordination between processes
+#   - redis: a lock and the result in redis (FOODSIGHT_SINGLEFLIGHT_REDIS, e.g. a local redis)
+# Results shared across processes are kept FOODSIGHT_SINGLEFLIGHT_TTL seconds, just long enough
+# for the waiting processes to read them: this is not a cache.
+#
+#   @callback(Output(...), Input(...))
+#   @single_flight
+#   def update_choropleth_map(...):
+
+import functools
+import hashlib
+import json
+import os
+import pickle
+import threading
+import time
+
+from dash._callback_context import context_value
+
+# ------------------------------------------------------------------------------
+# Settings
+
+backend = os.environ.get('FOODSIGHT_SINGLEFLIGHT', 'file')
+store_dir = os.environ.get('FOODSIGHT_SINGLEFLIGHT_DIR',
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.singleflight'))
+redis_url = os.environ.get('FOODSIGHT_SINGLEFLIGHT_REDIS', 'redis://localhost:6379/1')
+result_ttl = float(os.environ.get('FOODSIGHT_SINGLEFLIGHT_TTL', 10))  # Seconds
+timeout = float(os.environ.get('FOODSIGHT_SINGLEFLIGHT_TIMEOUT', 120))  # Seconds a waiter waits before computing itself
+poll_interval = 0.05  # Seconds between two checks of another process' result
+
+# Not found in the shared store
+_MISSING = object()
+
+
+# ------------------------------------------------------------------------------
+# Shared stores (same interface as diskcache.Cache: add, get, set, delete)
+
+# Folder only the user of the app can write to (created with mode 0o700). Files planted in it
+# would be unpickled, so a folder of another user or writable by others is refused.
+def private_directory(directory):
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    if hasattr(os, 'getuid'):
+        info = os.stat(directory)
+        if info.st_uid != os.getuid() or info.st_mode & 0o022:
+            raise PermissionError(f"Error: '{directory}' must belong to the app user and not be writable by other users")
+    return directory
+
+
+# One file per key, holding the value and its expiry time. Files older than max_age seconds
+# (expired) are removed once a minute.
+class FileStore:
+    def __init__(self, directory, max_age=600):
+        self.directory = private_directory(directory)
+        self.max_age = max_age
+        self._next_prune = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest())
+
+    # Create the key only when it does not exist or expired (atomic). Returns True when created.
+    def add(self, key, value, expire=None):
+        path = self._path(key)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    with open(path, 'rb') as file:
+                        expires, _ = pickle.load(file)
+                except FileNotFoundError:
+                    continue
+                except (EOFError, pickle.UnpicklingError):
+                    # Being written by another add()
+                    return False
+                if expires is None or expires >= time.time():
+                    return False
+                # Expired: remove it and try again
+                self.delete(key)
+                continue
+            with os.fdopen(fd, 'wb') as file:
+                pickle.dump((time.time() + expire if expire else None, value), file)
+            return True
+        return False
+
+    def get(self, key, default=None):
+        try:
+            with open(self._path(key), 'rb') as file:
+                expires, value = pickle.load(file)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            # Missing, or created by add() and not written yet
+            return default
+        if expires is not None and expires < time.time():
+            return default
+        return value
+
+    def set(self, key, value, expire=None):
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as file:
+            pickle.dump((time.time() + expire if expire else None, value), file)
+        os.replace(tmp_path, path)
+        if time.time() > self._next_prune:
+            self._next_prune = time.time() + 60
+            self.prune()
+
+    def prune(self):
+        limit = time.time() - self.max_age
+        for entry in os.scandir(self.directory):
+            try:
+                if entry.stat().st_mtime < limit:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class RedisStore:
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+
+    # Set the key only when it does not exist (atomic). Returns True when set.
+    def add(self, key, value, expire=None):
+        return bool(self.client.set(key, pickle.dumps(value), nx=True, px=int(expire * 1000) if expire else None))
+
+    def get(self, key, default=None):
+        value = self.client.get(key)
+        return default if value is None else pickle.loads(value)
+
+    def set(self, key, value, expire=None):
+        self.client.set(key, pickle.dumps(value), px=int(expire * 1000) if expire else None)
+
+    def delete(self, key):
+        self.client.delete(key)
+
+
+def create_store():
+    if backend == 'local':
+        return None
+    if backend == 'file':
+        return FileStore(store_dir, max_age=timeout + result_ttl)
+    if backend == 'redis':
+        return RedisStore(redis_url)
+    raise ValueError(f"Error: unknown single-flight backend '{backend}' (local, file or redis)")
+
+
+# ------------------------------------------------------------------------------
+# Single-flight
+
+# Call in progress in this process
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, store=None, result_ttl=result_ttl, timeout=timeout):
+        self.store = store
+        self.result_ttl = result_ttl
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        # Calls of the parent process never finish in a forked child (background callback jobs)
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    # fn(*args, **kwargs), computed once for the concurrent calls with the same key
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(self.timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            return fn(*args, **kwargs)
+
+        try:
+            call.result = self._do_shared(key, fn, *args, **kwargs)
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    # One process computes, the other ones read its result from the store
+    def _do_shared(self, key, fn, *args, **kwargs):
+        if self.store is None:
+            return fn(*args, **kwargs)
+        result_key, lock_key = f"singleflight:{key}:result", f"singleflight:{key}:lock"
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            # Outcome of the process this one waited for (none when it died: compute here)
+            if waited:
+                outcome = self.store.get(result_key, _MISSING)
+                if outcome is not _MISSING:
+                    result, error = outcome
+                    if error is not None:
+                        raise error
+                    return result
+            if self.store.add(lock_key, os.getpid(), expire=self.timeout):
+                break
+            if time.monotonic() > deadline:
+                return fn(*args, **kwargs)
+            waited = True
+            time.sleep(poll_interval)
+        try:
+            result = fn(*args, **kwargs)
+            self.store.set(result_key, (result, None), expire=self.result_ttl)
+            return result
+        except Exception as error:
+            # Shared as well (e.g. PreventUpdate), so the waiting processes do not compute again
+            try:
+                self.store.set(result_key, (None, error), expire=self.result_ttl)
+            except (pickle.PicklingError, TypeError, AttributeError):
+                pass
+            raise
+        finally:
+            self.store.delete(lock_key)
+
+    # Callback decorator: identical inputs and triggers share one computation
+    def __call__(self, fn):
+        name = f"{fn.__module__}.{fn.__qualname__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return self.do(callback_key(name, args, kwargs), fn, *args, **kwargs)
+
+        return wrapper
+
+
+# Key of a callback call: callback, arguments and triggering inputs (the callbacks read them from
+# dash.callback_context)
+def callback_key(name, args, kwargs):
+    try:
+        triggered = [item['prop_id'] for item in context_value.get().triggered_inputs]
+    except (LookupError, AttributeError, KeyError, TypeError):
+        triggered = []
+    payload = json.dumps([name, args, kwargs, triggered], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+single_flight = SingleFlight(create_store())
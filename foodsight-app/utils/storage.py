@@ -0,0 +1,80 @@
+# ------------------------------------------------------------------------------
+# Storage backend
+#
+# The app and the Lambdas read and write their data with the S3 client methods get_object,
+# put_object, list_objects_v2 and delete_object. create_s3_client() returns the boto3 client, or a
+# local directory with the same methods when FOODSIGHT_STORAGE=local, so everything runs offline:
+#   FOODSIGHT_STORAGE=local FOODSIGHT_STORAGE_DIR=local_storage python application.py
+# Objects are stored as files under <FOODSIGHT_STORAGE_DIR>/<bucket>/<key>
+# (tools/seed_local_storage.py fills the folder with synthetic data).
+
+import io
+import os
+
+storage_backend = os.environ.get('FOODSIGHT_STORAGE', 's3')  # 's3' or 'local'
+storage_dir = os.environ.get('FOODSIGHT_STORAGE_DIR', 'local_storage')
+
+
+class LocalStorage:
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, bucket, key):
+        path = os.path.abspath(os.path.join(self.root, bucket, key))
+        # Keys can't point outside of the bucket folder
+        if not path.startswith(os.path.abspath(os.path.join(self.root, bucket)) + os.sep):
+            raise ValueError(f"Error: invalid key '{key}'")
+        return path
+
+    def get_object(self, Bucket, Key):
+        path = self._path(Bucket, Key)
+        if not os.path.isfile(path):
+            raise FileNotFoundError(f"Error: no object '{Key}' in the local bucket '{Bucket}' ({path})")
+        with open(path, 'rb') as file:
+            body = file.read()
+        return {'Body': io.BytesIO(body), 'ContentLength': len(body)}
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        path = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if isinstance(Body, str):
+            Body = Body.encode('utf-8')
+        elif hasattr(Body, 'read'):
+            Body = Body.read()
+        # Written next to the target and renamed, so readers never see a partial object
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(Body)
+        os.replace(temp_path, path)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix=''):
+        bucket_dir = os.path.join(self.root, Bucket)
+        keys = []
+        for folder, _, files in os.walk(bucket_dir):
+            for name in files:
+                key = os.path.relpath(os.path.join(folder, name), bucket_dir).replace(os.sep, '/')
+                if key.startswith(Prefix) and not name.endswith('.tmp'):
+                    keys.append(key)
+        # Same shape as boto3: no 'Contents' when nothing matches
+        listing = {'KeyCount': len(keys)}
+        if keys:
+            listing['Contents'] = [{'Key': key, 'Size': os.path.getsize(os.path.join(bucket_dir, key))} for key in sorted(keys)]
+        return listing
+
+    def delete_object(self, Bucket, Key):
+        path = self._path(Bucket, Key)
+        if os.path.isfile(path):
+            os.remove(path)
+        return {}
+
+
+# S3 client or local storage, depending on FOODSIGHT_STORAGE
+def create_s3_client():
+    if storage_backend == 'local':
+        print(f"Using local storage at {os.path.abspath(storage_dir)}")
+        return LocalStorage(storage_dir)
+    if storage_backend != 's3':
+        raise ValueError(f"Error: unknown storage backend '{storage_backend}' (use 's3' or 'local')")
+    import boto3
+    return boto3.client('s3')
@@ -0,0 +1,91 @@
+# ------------------------------------------------------------------------------
+# Process pool for the CPU-heavy callbacks
+#
+# One bounded pool per web worker process runs the CPU-bound work of the callbacks (herd model
+# sweeps and simulations), so a long computation does not hold the thread (or the gevent loop)
+# of the web worker and the number of processes stays bounded however many requests arrive:
+#   - FOODSIGHT_PROCESS_WORKERS processes per web worker (0 runs everything in the caller)
+#   - at most FOODSIGHT_PROCESS_QUEUE tasks per process queued or running; callers wait for a slot
+# The pool is started on first use, after gunicorn forked the web worker, with the 'spawn'
+# start method (forking a process with threads or a gevent loop is not safe). Work submitted
+# from a pool process runs in that process.
+#
+#   from utils import workers
+#   df = workers.run(sensitivity, params)
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+# ------------------------------------------------------------------------------
+# Settings
+
+max_workers = int(os.environ.get('FOODSIGHT_PROCESS_WORKERS', 2))  # Processes per web worker
+max_queue = int(os.environ.get('FOODSIGHT_PROCESS_QUEUE', 2))  # Tasks per process
+task_timeout = float(os.environ.get('FOODSIGHT_PROCESS_TIMEOUT', 120))  # Seconds
+
+_executor = None
+_pid = None
+_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(max_workers, 1) * max_queue)
+# True in the pool processes
+_in_pool = False
+
+
+def _mark_pool_process():
+    global _in_pool
+    _in_pool = True
+
+
+def inline():
+    return _in_pool or max_workers == 0
+
+
+# Pool of the current process (a forked web worker starts its own one)
+def get_executor():
+    global _executor, _pid
+    with _lock:
+        if _executor is None or _pid != os.getpid():
+            _executor = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'),
+                                            initializer=_mark_pool_process)
+            _pid = os.getpid()
+        return _executor
+
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None and _pid == os.getpid():
+            _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+# ------------------------------------------------------------------------------
+# Tasks
+# Functions and arguments must be picklable: module-level functions of the utils package.
+
+# fn(*args, **kwargs) in a pool process
+def run(fn, *args, **kwargs):
+    if inline():
+        return fn(*args, **kwargs)
+    with _slots:
+        return get_executor().submit(fn, *args, **kwargs).result(timeout=task_timeout)
+
+
+# [fn(*items) for items in zip(*iterables)], spread over the pool processes
+def map(fn, *iterables):
+    if inline():
+        return [fn(*items) for items in zip(*iterables)]
+    executor = get_executor()
+    futures = []
+    try:
+        for items in zip(*iterables):
+            _slots.acquire()
+            future = executor.submit(fn, *items)
+            future.add_done_callback(lambda _: _slots.release())
+            futures.append(future)
+        return [future.result(timeout=task_timeout) for future in futures]
+    finally:
+        for future in futures:
+            future.cancel()